@@ -1,9 +1,44 @@
 from django.contrib import admin
 from Main.models import *
+from Main.authors import search_authors
+from Main.projections import list_projection
+from Main.search import matching_object_ids
 from tinymce.widgets import TinyMCE
 from django.contrib.contenttypes.admin import GenericTabularInline
 from django.db import models
 
+class FullTextSearchMixin:
+    """
+    Matches the search term against the full-text index instead of running
+    icontains over the HTML content column; search_fields still cover the
+    short columns.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results |= queryset.filter(pk__in=matching_object_ids(queryset.model, search_term))
+        return results, may_have_duplicates
+
+class ProjectedModelAdmin(admin.ModelAdmin):
+    """
+    Changelists and related-object selects load list projections: the text
+    and HTML columns not in list_display are deferred.
+    """
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if match and match.url_name and match.url_name.endswith('_changelist'):
+            queryset = list_projection(queryset, keep=self.get_list_display(request))
+        return queryset
+
+    def get_field_queryset(self, db, db_field, request):
+        queryset = super().get_field_queryset(db, db_field, request)
+        if queryset is None:
+            queryset = db_field.remote_field.model._default_manager.using(db).all()
+        return list_projection(queryset)
+
 # Inline Classes
 class ArticleInline(admin.StackedInline):
     model = Article
@@ -126,7 +161,7 @@ class ReferenceInline(GenericTabularInline):
 
 # Admin Classes
 @admin.register(Profile)
-class ProfileAdmin(admin.ModelAdmin):
+class ProfileAdmin(ProjectedModelAdmin):
     list_display = ('user', 'academic_degree', 'university', 'email_confirmed')
     search_fields = ('user__username', 'academic_degree', 'university')
     list_filter = ('email_confirmed', 'created_at')
@@ -147,16 +182,17 @@ class ProfileAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Keyword)
-class KeywordAdmin(admin.ModelAdmin):
+class KeywordAdmin(ProjectedModelAdmin):
     list_display = ('term', 'slug')
     search_fields = ('term', 'slug')
     prepopulated_fields = {'slug': ('term',)}
     ordering = ('term',)
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(ProjectedModelAdmin):
     list_display = ('last_name', 'first_name', 'orcid_id', 'affiliation', 'user')
-    search_fields = ('last_name', 'first_name', 'orcid_id', 'affiliation', 'user__username')
+    # Names and ORCIDs are searched by get_search_results() through search_authors()
+    search_fields = ('affiliation', 'user__username')
     list_filter = ('affiliation',)
     ordering = ('last_name', 'first_name')
     fieldsets = (
@@ -172,8 +208,15 @@ class AuthorAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # ORCID and name searches use the indexed orcid_id/name_key columns
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term.strip():
+            results |= search_authors(search_term, queryset)
+        return results, may_have_duplicates
+
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(ProjectedModelAdmin):
     list_display = ('title', 'type', 'status', 'progress', 'visibility', 'owner', 'created_at')
     list_filter = ('type', 'status', 'visibility', 'created_at')
     search_fields = ('title', 'owner__username', 'description')
@@ -207,7 +250,7 @@ class ProjectAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Article)
-class ArticleAdmin(admin.ModelAdmin):
+class ArticleAdmin(ProjectedModelAdmin):
     list_display = ('title', 'article_type', 'journal', 'is_published', 'citation_count', 'aricale_status')
     list_filter = ('article_type', 'is_published', 'aricale_status')
     search_fields = ('title', 'journal', 'doi', 'keywords__term')
@@ -235,10 +278,10 @@ class ArticleAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ArticleSection)
-class ArticleSectionAdmin(admin.ModelAdmin):
+class ArticleSectionAdmin(FullTextSearchMixin, ProjectedModelAdmin):
     list_display = ('article', 'section_type', 'title', 'position', 'word_count')
     list_filter = ('section_type',)
-    search_fields = ('article__title', 'title', 'content')
+    search_fields = ('article__title', 'title')
     ordering = ('article', 'position')
     list_select_related = ('article',)
     formfield_overrides = {
@@ -246,7 +289,7 @@ class ArticleSectionAdmin(admin.ModelAdmin):
     }
 
 @admin.register(ArticleTemplate)
-class ArticleTemplateAdmin(admin.ModelAdmin):
+class ArticleTemplateAdmin(ProjectedModelAdmin):
     list_display = ('name', 'article_type', 'discipline', 'journal', 'is_default')
     list_filter = ('article_type', 'is_default')
     search_fields = ('name', 'description', 'discipline', 'journal')
@@ -263,7 +306,7 @@ class ArticleTemplateAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ArticleTemplateSection)
-class ArticleTemplateSectionAdmin(admin.ModelAdmin):
+class ArticleTemplateSectionAdmin(ProjectedModelAdmin):
     list_display = ('section_type', 'title', 'required', 'default_position', 'word_count_guide')
     list_filter = ('required', 'section_type')
     search_fields = ('title', 'description', 'example')
@@ -279,7 +322,7 @@ class ArticleTemplateSectionAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ResearchProject)
-class ResearchProjectAdmin(admin.ModelAdmin):
+class ResearchProjectAdmin(ProjectedModelAdmin):
     list_display = ('project', 'title', 'organization', 'supervisor', 'research_project_status')
     list_filter = ('research_project_status', 'organization')
     search_fields = ('project__title', 'title', 'organization', 'supervisor', 'research_code')
@@ -301,10 +344,10 @@ class ResearchProjectAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ResearchProjectSection)
-class ResearchProjectSectionAdmin(admin.ModelAdmin):
+class ResearchProjectSectionAdmin(FullTextSearchMixin, ProjectedModelAdmin):
     list_display = ('research_project', 'section_type', 'title', 'position', 'word_count')
     list_filter = ('section_type',)
-    search_fields = ('research_project__title', 'title', 'content')
+    search_fields = ('research_project__title', 'title')
     ordering = ('research_project', 'position')
     list_select_related = ('research_project',)
     formfield_overrides = {
@@ -312,7 +355,7 @@ class ResearchProjectSectionAdmin(admin.ModelAdmin):
     }
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(ProjectedModelAdmin):
     list_display = ('title', 'publisher', 'is_published', 'edition', 'copyright_year')
     list_filter = ('is_published', 'edition')
     search_fields = ('title', 'publisher', 'isbn', 'isbn_13')
@@ -339,13 +382,14 @@ class BookAdmin(admin.ModelAdmin):
     )
 
 @admin.register(BookChapter)
-class BookChapterAdmin(admin.ModelAdmin):
+class BookChapterAdmin(ProjectedModelAdmin):
     list_display = ('book', 'chapter_number', 'title', 'word_count', 'book_status')
     list_filter = ('book_status',)
     search_fields = ('book__title', 'title', 'summary')
     ordering = ('book', 'chapter_number')
     list_select_related = ('book',)
     inlines = [BookSectionInline, BookFigureInline, BookTableInline]
+    readonly_fields = ('word_count',)
     fieldsets = (
         ('Basic Information', {
             'fields': ('book', 'chapter_number', 'title', 'book_status')
@@ -357,10 +401,10 @@ class BookChapterAdmin(admin.ModelAdmin):
     )
 
 @admin.register(BookSection)
-class BookSectionAdmin(admin.ModelAdmin):
+class BookSectionAdmin(FullTextSearchMixin, ProjectedModelAdmin):
     list_display = ('chapter', 'section_type', 'title', 'position', 'word_count')
     list_filter = ('section_type',)
-    search_fields = ('chapter__title', 'title', 'content')
+    search_fields = ('chapter__title', 'title')
     ordering = ('chapter', 'position')
     list_select_related = ('chapter',)
     formfield_overrides = {
@@ -368,7 +412,7 @@ class BookSectionAdmin(admin.ModelAdmin):
     }
 
 @admin.register(BookFigure)
-class BookFigureAdmin(admin.ModelAdmin):
+class BookFigureAdmin(ProjectedModelAdmin):
     list_display = ('chapter', 'figure_number', 'title', 'position')
     search_fields = ('chapter__title', 'title', 'description', 'caption')
     ordering = ('chapter', 'figure_number')
@@ -388,7 +432,7 @@ class BookFigureAdmin(admin.ModelAdmin):
     )
 
 @admin.register(BookTable)
-class BookTableAdmin(admin.ModelAdmin):
+class BookTableAdmin(ProjectedModelAdmin):
     list_display = ('chapter', 'table_number', 'title', 'position')
     search_fields = ('chapter__title', 'title', 'content', 'caption')
     ordering = ('chapter', 'table_number')
@@ -411,7 +455,7 @@ class BookTableAdmin(admin.ModelAdmin):
     )
 
 @admin.register(TranslatedBook)
-class TranslatedBookAdmin(admin.ModelAdmin):
+class TranslatedBookAdmin(ProjectedModelAdmin):
     list_display = ('title', 'original_title', 'original_language', 'publisher', 'is_published')
     list_filter = ('original_language', 'is_published')
     search_fields = ('title', 'original_title', 'publisher', 'isbn', 'isbn_13')
@@ -438,7 +482,7 @@ class TranslatedBookAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ResearchProposal)
-class ResearchProposalAdmin(admin.ModelAdmin):
+class ResearchProposalAdmin(ProjectedModelAdmin):
     list_display = ('project', 'title', 'sponsor', 'budget', 'submission_status')
     list_filter = ('submission_status', 'sponsor')
     search_fields = ('project__title', 'title', 'sponsor', 'grant_number')
@@ -465,10 +509,10 @@ class ResearchProposalAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ResearchProposalSection)
-class ResearchProposalSectionAdmin(admin.ModelAdmin):
+class ResearchProposalSectionAdmin(FullTextSearchMixin, ProjectedModelAdmin):
     list_display = ('proposal', 'section_type', 'title', 'position', 'word_count')
     list_filter = ('section_type',)
-    search_fields = ('proposal__title', 'title', 'content')
+    search_fields = ('proposal__title', 'title')
     ordering = ('proposal', 'position')
     list_select_related = ('proposal',)
     formfield_overrides = {
@@ -476,7 +520,7 @@ class ResearchProposalSectionAdmin(admin.ModelAdmin):
     }
 
 @admin.register(Thesis)
-class ThesisAdmin(admin.ModelAdmin):
+class ThesisAdmin(ProjectedModelAdmin):
     list_display = ('project', 'title', 'student_name', 'degree_type', 'university', 'defense_date')
     list_filter = ('degree_type', 'university')
     search_fields = ('project__title', 'title', 'student_name', 'student_id', 'supervisor__last_name')
@@ -510,10 +554,10 @@ class ThesisAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ThesisSection)
-class ThesisSectionAdmin(admin.ModelAdmin):
+class ThesisSectionAdmin(FullTextSearchMixin, ProjectedModelAdmin):
     list_display = ('thesis', 'section_type', 'title', 'position', 'word_count')
     list_filter = ('section_type',)
-    search_fields = ('thesis__title', 'title', 'content')
+    search_fields = ('thesis__title', 'title')
     ordering = ('thesis', 'position')
     list_select_related = ('thesis',)
     formfield_overrides = {
@@ -521,7 +565,7 @@ class ThesisSectionAdmin(admin.ModelAdmin):
     }
 
 @admin.register(ThesisChapter)
-class ThesisChapterAdmin(admin.ModelAdmin):
+class ThesisChapterAdmin(ProjectedModelAdmin):
     list_display = ('thesis', 'chapter_number', 'title', 'word_count', 'thesis_status')
     list_filter = ('thesis_status',)
     search_fields = ('thesis__title', 'title', 'summary')
@@ -538,7 +582,7 @@ class ThesisChapterAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ProjectedModelAdmin):
     list_display = ('title', 'project', 'due_date', 'priority', 'completed', 'assigned_to')
     list_filter = ('completed', 'priority', 'due_date')
     search_fields = ('title', 'project__title', 'assigned_to__username')
@@ -558,7 +602,7 @@ class TaskAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ProjectComment)
-class ProjectCommentAdmin(admin.ModelAdmin):
+class ProjectCommentAdmin(ProjectedModelAdmin):
     list_display = ('project', 'author', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('project__title', 'author__username', 'content')
@@ -567,7 +611,7 @@ class ProjectCommentAdmin(admin.ModelAdmin):
 
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(ProjectedModelAdmin):
     list_display = ('user', 'notification_type', 'is_read', 'created_at')
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('user__username', 'message')
@@ -576,7 +620,7 @@ class NotificationAdmin(admin.ModelAdmin):
     
 
 @admin.register(Webhook)
-class WebhookAdmin(admin.ModelAdmin):
+class WebhookAdmin(ProjectedModelAdmin):
     list_display = ('name', 'user', 'target_url', 'is_active', 'created_at')
     list_filter = ('is_active', 'created_at')
     search_fields = ('name', 'target_url', 'user__username')
@@ -592,7 +636,7 @@ class WebhookAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Reference)
-class ReferenceAdmin(admin.ModelAdmin):
+class ReferenceAdmin(ProjectedModelAdmin):
     list_display = ('get_cited_object', 'get_citing_object', 'created_at')
     list_filter = ('cited_content_type', 'citing_content_type')
     search_fields = ('cited_object_id', 'citing_object_id')
@@ -609,7 +653,7 @@ class ReferenceAdmin(admin.ModelAdmin):
 
 # Template Admin Models
 @admin.register(ResearchProjectTemplate)
-class ResearchProjectTemplateAdmin(admin.ModelAdmin):
+class ResearchProjectTemplateAdmin(ProjectedModelAdmin):
     list_display = ('name', 'disciplines', 'is_default')
     list_filter = ('is_default',)
     search_fields = ('name', 'description', 'disciplines')
@@ -617,14 +661,14 @@ class ResearchProjectTemplateAdmin(admin.ModelAdmin):
     inlines = [ResearchProjectTemplateSectionInline]
 
 @admin.register(ResearchProjectTemplateSection)
-class ResearchProjectTemplateSectionAdmin(admin.ModelAdmin):
+class ResearchProjectTemplateSectionAdmin(ProjectedModelAdmin):
     list_display = ('section_type', 'title', 'required', 'default_position')
     list_filter = ('required', 'section_type')
     search_fields = ('title', 'description', 'example')
     ordering = ('default_position',)
 
 @admin.register(ResearchProposalTemplate)
-class ResearchProposalTemplateAdmin(admin.ModelAdmin):
+class ResearchProposalTemplateAdmin(ProjectedModelAdmin):
     list_display = ('name', 'disciplines', 'funding_agency', 'is_default')
     list_filter = ('is_default', 'funding_agency')
     search_fields = ('name', 'description', 'disciplines')
@@ -632,14 +676,14 @@ class ResearchProposalTemplateAdmin(admin.ModelAdmin):
     inlines = [ResearchProposalTemplateSectionInline]
 
 @admin.register(ResearchProposalTemplateSection)
-class ResearchProposalTemplateSectionAdmin(admin.ModelAdmin):
+class ResearchProposalTemplateSectionAdmin(ProjectedModelAdmin):
     list_display = ('section_type', 'title', 'required', 'default_position', 'word_limit')
     list_filter = ('required', 'section_type')
     search_fields = ('title', 'description', 'example')
     ordering = ('default_position',)
 
 @admin.register(ThesisTemplate)
-class ThesisTemplateAdmin(admin.ModelAdmin):
+class ThesisTemplateAdmin(ProjectedModelAdmin):
     list_display = ('name', 'university', 'department', 'degree_type', 'is_default')
     list_filter = ('is_default', 'degree_type', 'university')
     search_fields = ('name', 'description', 'university', 'department')
@@ -647,8 +691,43 @@ class ThesisTemplateAdmin(admin.ModelAdmin):
     inlines = [ThesisTemplateSectionInline]
 
 @admin.register(ThesisTemplateSection)
-class ThesisTemplateSectionAdmin(admin.ModelAdmin):
+class ThesisTemplateSectionAdmin(ProjectedModelAdmin):
     list_display = ('section_type', 'title', 'required', 'default_position', 'word_limit')
     list_filter = ('required', 'section_type')
     search_fields = ('title', 'description', 'example')
-    ordering = ('default_position',)
\ No newline at end of file
+    ordering = ('default_position',)
+
+
+@admin.register(TranslationMemory)
+class TranslationMemoryAdmin(ProjectedModelAdmin):
+    list_display = ('text_hash', 'source_lang', 'target_lang', 'hit_count', 'created_at', 'last_used_at')
+    list_filter = ('source_lang', 'target_lang')
+    search_fields = ('text_hash',)
+    readonly_fields = ('created_at',)
+
+@admin.register(CrossrefWork)
+class CrossrefWorkAdmin(ProjectedModelAdmin):
+    list_display = ('doi', 'status_code', 'etag', 'fetched_at')
+    list_filter = ('status_code',)
+    search_fields = ('doi',)
+
+@admin.register(Job)
+class JobAdmin(ProjectedModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('kind', 'error')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+@admin.register(ProjectMembership)
+class ProjectMembershipAdmin(ProjectedModelAdmin):
+    # Rows are derived from Project.owner and Project.collaborators
+    list_display = ('project', 'user', 'role')
+    list_filter = ('role',)
+    search_fields = ('project__title', 'user__username')
+    list_select_related = ('project', 'user')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Main'
+
+    def ready(self):
+        # Connects the search index, fragment and template cache signal handlers
+        from Main import fragments, instantiation, search  # noqa: F401
@@ -0,0 +1,127 @@
+"""
+Author identity resolution for imports and searches.
+
+Person records (dicts with first_name, last_name, orcid_id and affiliation,
+as produced by Main.crossref.parse_work) are matched against existing
+Authors in one query, by ORCID first and then by the normalized name key;
+the missing ones are bulk-created. Both lookups use indexed columns. A
+name never matches across two different ORCIDs: namesakes with their own
+ORCIDs (common among the authors of one large paper) stay distinct.
+"""
+import re
+
+from django.db.models import Q
+
+from Main.models import Author
+from Main.text import normalize
+
+
+ORCID_RE = re.compile(r'(\d{4}-\d{4}-\d{4}-\d{3}[\dX])', re.IGNORECASE)
+
+
+def name_key(first_name, last_name):
+    """Key used to match an author by name"""
+    return Author.make_name_key(first_name, last_name)
+
+
+def _lookup(people):
+    orcids = {person['orcid_id'] for person in people if person.get('orcid_id')}
+    keys = {name_key(person['first_name'], person['last_name']) for person in people}
+    return Author.objects.filter(Q(orcid_id__in=orcids) | Q(name_key__in=keys))
+
+
+def _index(authors):
+    by_orcid = {}
+    by_name = {}
+    for author in sorted(authors, key=lambda author: author.pk):
+        if author.orcid_id:
+            by_orcid.setdefault(author.orcid_id, author)
+        by_name.setdefault(author.name_key, []).append(author)
+    return by_orcid, by_name
+
+
+def _match_all(people, by_orcid, by_name):
+    """
+    The Author of each person, or None. A person with an ORCID only matches
+    by name an author without one, and only if no other ORCID of people
+    claimed that author first.
+    """
+    claimed = {}
+    matches = []
+    for person in people:
+        orcid = person.get('orcid_id')
+        author = by_orcid.get(orcid) if orcid else None
+        if author is None:
+            for candidate in by_name.get(name_key(person['first_name'], person['last_name']), ()):
+                if not orcid or (not candidate.orcid_id and claimed.setdefault(candidate.pk, orcid) == orcid):
+                    author = candidate
+                    break
+        matches.append(author)
+    return matches
+
+
+def resolve_authors(people):
+    """
+    Returns the Author of each person record, in order.
+
+    Takes a constant number of queries regardless of the number of people:
+    one lookup, and for unknown people one bulk insert and one re-read
+    (MySQL does not return ids from bulk_create).
+    """
+    if not people:
+        return []
+
+    by_orcid, by_name = _index(_lookup(people))
+
+    missing = {}
+    for person, author in zip(people, _match_all(people, by_orcid, by_name)):
+        if author is None:
+            key = person.get('orcid_id') or name_key(person['first_name'], person['last_name'])
+            missing.setdefault(key, Author(
+                first_name=person['first_name'],
+                last_name=person['last_name'],
+                name_key=name_key(person['first_name'], person['last_name']),
+                orcid_id=person.get('orcid_id', ''),
+                affiliation=person.get('affiliation', ''),
+            ))
+
+    if missing:
+        Author.objects.bulk_create(missing.values(), ignore_conflicts=True)
+        by_orcid, by_name = _index(_lookup(people))
+
+    return _match_all(people, by_orcid, by_name)
+
+
+def find_author(orcid_id='', first_name='', last_name=''):
+    """Returns the Author with this ORCID, or else with this name (or None)"""
+    author = None
+    if orcid_id:
+        author = Author.objects.filter(orcid_id=orcid_id).first()
+    if author is None and last_name:
+        author = Author.objects.filter(name_key=name_key(first_name, last_name)).first()
+    return author
+
+
+def search_authors(term, queryset=None):
+    """
+    Filters authors by an ORCID or a name prefix using the indexed columns.
+
+    'Smith', 'smith j' and 'John Smith' all match John Smith; a term
+    containing an ORCID matches that ORCID exactly.
+    """
+    queryset = Author.objects.all() if queryset is None else queryset
+    match = ORCID_RE.search(term)
+    if match:
+        return queryset.filter(orcid_id=match.group(1).upper())
+
+    words = normalize(term).split()
+    if not words:
+        return queryset.none()
+    # 'last first...' and 'first... last' orders are both tried as key prefixes
+    prefixes = {name_key(' '.join(words[1:]), words[0]).rstrip('|')}
+    if len(words) > 1:
+        prefixes.add(name_key(' '.join(words[:-1]), words[-1]))
+    condition = Q()
+    for prefix in prefixes:
+        condition |= Q(name_key__startswith=prefix)
+    return queryset.filter(condition)
@@ -0,0 +1,455 @@
+"""
+Crossref lookups and DOI-based Article imports.
+
+Work records are cached per normalized DOI in an in-process LRU and in the
+CrossrefWork table, including 404s (negative caching), so re-imports and
+retries never hit the network while the cached entry is fresh. Stale
+entries are revalidated with their ETag.
+"""
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from Main.authors import resolve_authors
+from Main.models import Article, ArticleAuthorship, CrossrefWork, Reference
+from Main.search import build_search_document, index_documents
+
+
+logger = logging.getLogger(__name__)
+
+DOI_RE = re.compile(r'10\.\d{4,9}/[^\s"<>]+')
+
+
+def clean_doi(doi):
+    """حذف پیشوندهای غیرضروری از DOI"""
+    match = re.search(r'(10\.\d{4,9}/.+)', doi)
+    if match:
+        return match.group(1).strip()
+    return doi.strip()
+
+
+def validate_doi(doi):
+    """Raises ValidationError if a cleaned DOI does not fit Article.doi"""
+    max_length = Article._meta.get_field('doi').max_length
+    if len(doi) > max_length:
+        raise ValidationError(f"DOI طولانی‌تر از {max_length} نویسه است")
+
+
+def extract_dois(text):
+    """Returns the distinct DOIs of a pasted DOI list or reference list, in order"""
+    dois = []
+    for match in DOI_RE.finditer(text):
+        doi = match.group(0).rstrip('.,;:)]}').lower()
+        if doi not in dois:
+            dois.append(doi)
+    return dois
+
+
+CROSSREF_WORKS_URL = 'https://api.crossref.org/works/'
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _remember(work):
+    with _memory_lock:
+        _memory[work.doi] = work
+        _memory.move_to_end(work.doi)
+        while len(_memory) > getattr(settings, 'CROSSREF_MEMORY_SIZE', 1024):
+            _memory.popitem(last=False)
+
+
+def _recall(doi):
+    with _memory_lock:
+        work = _memory.get(doi)
+        if work is not None:
+            _memory.move_to_end(doi)
+        return work
+
+
+def _is_fresh(work):
+    if work.is_found:
+        max_age = getattr(settings, 'CROSSREF_CACHE_TTL', 60 * 60 * 24 * 30)
+    else:
+        max_age = getattr(settings, 'CROSSREF_NEGATIVE_CACHE_TTL', 60 * 60 * 24)
+    return timezone.now() - work.fetched_at < timedelta(seconds=max_age)
+
+
+def request_work(doi, etag=''):
+    """Requests a work from the Crossref API; returns (status_code, message, etag)"""
+    headers = {'Accept': 'application/json'}
+    if etag:
+        headers['If-None-Match'] = etag
+    params = {}
+    mailto = getattr(settings, 'CROSSREF_MAILTO', '')
+    if mailto:
+        params['mailto'] = mailto
+
+    response = requests.get(
+        CROSSREF_WORKS_URL + quote(doi, safe='/'),
+        headers=headers,
+        params=params,
+        timeout=30,
+    )
+    if response.status_code == 304:
+        return 304, None, etag
+    if response.status_code == 404:
+        return 404, None, ''
+    response.raise_for_status()
+
+    work = response.json()
+    if not work or 'message' not in work:
+        raise ValidationError("پاسخ نامعتبر از Crossref دریافت شد")
+    return 200, work['message'], response.headers.get('ETag', '')
+
+
+def _request_outcome(args):
+    try:
+        return request_work(*args)
+    except Exception as e:
+        logger.warning(f"خطا در دریافت DOI {args[0]} از Crossref: {str(e)}")
+        return e
+
+
+def fetch_works(dois, max_workers=None):
+    """
+    Returns ({doi: message}, {doi: error}) for normalized DOIs.
+
+    The message is None for DOIs Crossref does not know. Only DOIs without a
+    fresh cache entry are requested, concurrently and outside any
+    transaction; their results are written back with a single upsert.
+    """
+    works = {}
+    pending = []
+    for doi in dois:
+        work = _recall(doi)
+        if work is not None and _is_fresh(work):
+            works[doi] = work
+        else:
+            pending.append(doi)
+
+    stale = []
+    if pending:
+        cached = {work.doi: work for work in CrossrefWork.objects.filter(doi__in=pending)}
+        for doi in pending:
+            work = cached.get(doi)
+            if work is not None and _is_fresh(work):
+                _remember(work)
+                works[doi] = work
+            else:
+                stale.append((doi, work))
+
+    errors = {}
+    if stale:
+        workers = max_workers or getattr(settings, 'CROSSREF_MAX_WORKERS', 8)
+        requests_args = [(doi, work.etag if work else '') for doi, work in stale]
+        with ThreadPoolExecutor(max_workers=min(workers, len(stale))) as pool:
+            outcomes = list(pool.map(_request_outcome, requests_args))
+
+        now = timezone.now()
+        fetched = []
+        for (doi, previous), outcome in zip(stale, outcomes):
+            if isinstance(outcome, Exception):
+                errors[doi] = str(outcome)
+                continue
+            status_code, message, etag = outcome
+            if status_code == 304:
+                # Not modified: the cached record is still valid
+                status_code, message = previous.status_code, previous.message
+            work = CrossrefWork(
+                doi=doi, status_code=status_code, message=message, etag=etag, fetched_at=now
+            )
+            fetched.append(work)
+            works[doi] = work
+            _remember(work)
+
+        if fetched:
+            CrossrefWork.objects.bulk_create(
+                fetched,
+                update_conflicts=True,
+                unique_fields=['doi'],
+                update_fields=['status_code', 'message', 'etag', 'fetched_at'],
+            )
+
+    return {doi: work.message if work.is_found else None for doi, work in works.items()}, errors
+
+
+class CrossrefUnavailable(Exception):
+    """Crossref could not be reached or answered with an error; worth retrying"""
+
+
+def fetch_work(doi):
+    """
+    Fetches the Crossref work record ('message') of a DOI. Raises
+    ValidationError if Crossref does not know it and CrossrefUnavailable
+    if the request failed.
+    """
+    doi = clean_doi(doi).lower()
+    works, errors = fetch_works([doi])
+    if doi in errors:
+        raise CrossrefUnavailable(errors[doi])
+    if works[doi] is None:
+        raise ValidationError("این DOI در Crossref یافت نشد")
+    return works[doi]
+
+
+def parse_work(doi, data):
+    """Converts a Crossref work record into Article field values and author records"""
+    title = str((data.get('title') or [''])[0]) or 'بدون عنوان'
+
+    # پردازش تاریخ انتشار
+    pub_date = data.get('published', {}).get('date-parts', [[None]])[0]
+    publish_date = None
+    if pub_date and len(pub_date) >= 1:
+        try:
+            year = int(pub_date[0])
+            publish_date = datetime(year, 1, 1).date()
+        except (ValueError, TypeError):
+            pass
+
+    authors = []
+    for order, author_data in enumerate(data.get('author', []), start=1):
+        given_name = (author_data.get('given') or '').strip()[:100]
+        family_name = (author_data.get('family') or '').strip()[:100]
+        if not given_name or not family_name:
+            continue
+
+        # پردازش ORCID
+        orcid = author_data.get('ORCID', '')
+        if orcid:
+            orcid = orcid.split('/')[-1][:19]
+
+        authors.append({
+            'order': order,
+            'first_name': given_name,
+            'last_name': family_name,
+            'orcid_id': orcid,
+            'affiliation': ', '.join(
+                (aff.get('name') or '')[:100]
+                for aff in author_data.get('affiliation', [])
+            )[:200],
+        })
+
+    return {
+        'article': {
+            'title': title[:500],
+            'journal': (data.get('container-title') or [''])[0][:200],
+            'volume': (data.get('volume') or '')[:50],
+            'issue': (data.get('issue') or '')[:50],
+            'pages': (data.get('page') or '')[:50],
+            'doi': doi.lower().strip(),
+            'publish_date': publish_date,
+            'aricale_status': 'published',
+        },
+        'authors': authors,
+    }
+
+
+def create_article_from_doi(doi):
+    """ایجاد یا بازیابی مقاله بر اساس DOI"""
+    doi = clean_doi(doi)
+    validate_doi(doi)
+
+    # بررسی وجود مقاله در دیتابیس
+    existing_article = Article.objects.filter(doi__iexact=doi).first()
+    if existing_article:
+        return existing_article
+
+    # دریافت داده از Crossref
+    record = parse_work(doi, fetch_work(doi))
+
+    with transaction.atomic():
+        # ایجاد مقاله جدید
+        article = Article.objects.create(**record['article'])
+
+        # افزودن نویسندگان با تعداد ثابت کوئری (مستقل از تعداد نویسندگان)
+        _bulk_create_authorships({article.doi: record}, {article.doi: article})
+
+    return article
+
+
+def _bulk_create_authorships(records, articles):
+    """Links the authors of each record to its article with one bulk insert"""
+    pairs = [
+        (articles[doi], person)
+        for doi, record in records.items() if doi in articles
+        for person in record['authors']
+    ]
+    authors = resolve_authors([person for _, person in pairs])
+    ArticleAuthorship.objects.bulk_create([
+        ArticleAuthorship(
+            article=article,
+            author=author,
+            authorship_order=person['order'],
+            is_corresponding=person['order'] == 1,
+        )
+        for (article, person), author in zip(pairs, authors) if author is not None
+    ], ignore_conflicts=True)
+
+
+def _lock_references(citing_obj):
+    """
+    Locks the row of citing_obj until the end of the transaction, so the
+    references it cites are only checked and written by one import at a
+    time.
+    """
+    list(type(citing_obj)._default_manager.select_for_update().filter(pk=citing_obj.pk).values_list('pk'))
+
+
+def _bulk_create_references(citing_obj, articles):
+    """
+    Cites articles from citing_obj; returns the ids of the newly cited
+    articles. Must run in a transaction: under the lock of citing_obj no
+    concurrent import can insert one of them between the check and the
+    insert, so the ids returned (and counted) are the rows inserted.
+    """
+    _lock_references(citing_obj)
+    citing_type = ContentType.objects.get_for_model(citing_obj)
+    article_type = ContentType.objects.get_for_model(Article)
+    existing = set(Reference.objects.filter(
+        citing_content_type=citing_type,
+        citing_object_id=citing_obj.pk,
+        cited_content_type=article_type,
+        cited_object_id__in=[article.pk for article in articles],
+    ).values_list('cited_object_id', flat=True))
+
+    new_ids = [article.pk for article in articles if article.pk not in existing]
+    Reference.objects.bulk_create([
+        Reference(
+            citing_content_type=citing_type,
+            citing_object_id=citing_obj.pk,
+            cited_content_type=article_type,
+            cited_object_id=article_id,
+        )
+        for article_id in new_ids
+    ], ignore_conflicts=True)
+    # bulk_create sends no signals, so bump the counters here
+    Reference.adjust_citation_counts(article_type.id, new_ids, 1)
+    return set(new_ids)
+
+
+def import_dois(dois, citing_obj=None, max_workers=None):
+    """
+    Imports many DOIs at once, optionally citing them from citing_obj.
+
+    Existing articles are found in one query, missing DOIs are resolved
+    through fetch_works outside any transaction, and the new Articles,
+    Authors, ArticleAuthorships and References are bulk-created afterwards.
+    Returns one result dict per distinct DOI, in input order.
+    """
+    dois = list(dict.fromkeys(clean_doi(doi).lower() for doi in dois if doi.strip()))
+    errors = {}
+    for doi in dois:
+        try:
+            validate_doi(doi)
+        except ValidationError as e:
+            errors[doi] = e.messages[0]
+    valid = [doi for doi in dois if doi not in errors]
+    articles = {article.doi.lower(): article for article in Article.objects.filter(doi__in=valid)}
+
+    missing = [doi for doi in valid if doi not in articles]
+    records = {}
+    if missing:
+        works, fetch_errors = fetch_works(missing, max_workers=max_workers)
+        errors.update(fetch_errors)
+        for doi, message in works.items():
+            if message is None:
+                errors[doi] = "این DOI در Crossref یافت نشد"
+                continue
+            try:
+                records[doi] = parse_work(doi, message)
+            except Exception as e:
+                errors[doi] = str(e)
+
+    referenced = set()
+    with transaction.atomic():
+        if records:
+            Article.objects.bulk_create(
+                [Article(**record['article']) for record in records.values()],
+                ignore_conflicts=True,
+            )
+            for article in Article.objects.filter(doi__in=list(records)):
+                articles[article.doi.lower()] = article
+            _bulk_create_authorships(records, articles)
+            # bulk_create sends no post_save, so index the new articles here
+            index_documents([build_search_document(articles[doi]) for doi in records if doi in articles])
+
+        if citing_obj is not None:
+            referenced = _bulk_create_references(
+                citing_obj, [articles[doi] for doi in dois if doi in articles]
+            )
+
+    results = []
+    for doi in dois:
+        article = articles.get(doi)
+        if article is None:
+            results.append({'doi': doi, 'status': 'error', 'error': errors.get(doi, '')})
+            continue
+        results.append({
+            'doi': doi,
+            'status': 'created' if doi in records else 'existing',
+            'article_id': article.pk,
+            'title': article.title,
+            'referenced': article.pk in referenced,
+        })
+    return results
+
+
+def add_doi_reference(citing_obj, doi):
+    """
+    Resolves a DOI to an Article and cites it from citing_obj.
+
+    The Crossref lookup runs before the Reference is created with a single
+    get_or_create. Returns the JSON-ready result reported to the client.
+    """
+    cited_article = create_article_from_doi(doi)
+
+    citing_type = ContentType.objects.get_for_model(citing_obj)
+    article_type = ContentType.objects.get_for_model(Article)
+    # The unique constraint makes this race-free: a concurrent insert of the
+    # same reference ends up in the get branch instead of a duplicate row.
+    # The lock keeps it from racing a batch import too (see import_dois)
+    with transaction.atomic():
+        _lock_references(citing_obj)
+        reference, created = Reference.objects.get_or_create(
+            citing_content_type=citing_type,
+            citing_object_id=citing_obj.pk,
+            cited_content_type=article_type,
+            cited_object_id=cited_article.id
+        )
+    if not created:
+        return {
+            'success': False,
+            'error': 'این منبع قبلاً به پروژه اضافه شده است.'
+        }
+
+    logger.info(
+        f"ارجاع جدید ایجاد شد: {citing_type.model} {citing_obj.pk} به مقاله {cited_article.id}"
+    )
+
+    return {
+        'success': True,
+        'reference_id': reference.id,
+        'cited_article': {
+            'id': cited_article.id,
+            'title': cited_article.title,
+            'authors': cited_article.get_authors_display(),
+            'doi': cited_article.doi
+        },
+        'citing_object': {
+            'type': citing_type.model,
+            'id': citing_obj.pk,
+            'title': str(citing_obj)
+        }
+    }
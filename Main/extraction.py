@@ -0,0 +1,125 @@
+"""
+HTML-to-text extraction for section content.
+
+Content is parsed once with lxml's event-driven HTML parser: text inside
+script, style and similar elements is dropped, entities are decoded and
+block elements become word boundaries (inline ones do not, so
+'wo<b>rd</b>' stays one word). The text is normalized with Main.text and
+the word count, character count and reading time come from the same
+pass. Results are cached by content hash, so saving unchanged content or
+indexing it after a save never parses it twice.
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from lxml import etree
+
+from Main.text import normalize, tokenize
+
+
+TextStats = namedtuple('TextStats', ['text', 'words', 'characters', 'reading_minutes'])
+
+EMPTY_STATS = TextStats('', 0, 0, 0)
+
+_SKIPPED_TAGS = frozenset({'script', 'style', 'noscript', 'template', 'head', 'iframe', 'object', 'svg'})
+_BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'caption', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'td', 'tfoot',
+    'th', 'thead', 'tr', 'ul',
+})
+
+
+class _TextCollector:
+    """lxml parser target collecting the visible text"""
+
+    def __init__(self):
+        self.parts = []
+        self.skipping = 0
+
+    def start(self, tag, attrib):
+        if tag in _SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def end(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def close(self):
+        return ''.join(self.parts)
+
+
+def _parse(content):
+    parser = etree.HTMLParser(target=_TextCollector(), remove_comments=True, remove_pis=True)
+    parser.feed(content)
+    return parser.close()
+
+
+def _stats(content):
+    text = normalize(_parse(content))
+    words = len(tokenize(text))
+    words_per_minute = getattr(settings, 'READING_WORDS_PER_MINUTE', 200)
+    return TextStats(
+        text=text,
+        words=words,
+        characters=len(text),
+        reading_minutes=math.ceil(words / words_per_minute),
+    )
+
+
+class _StatsCache:
+    """Thread-safe LRU of TextStats keyed by content digest"""
+
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            stats = self._items.get(key)
+            if stats is not None:
+                self._items.move_to_end(key)
+            return stats
+
+    def set(self, key, stats):
+        with self._lock:
+            self._items[key] = stats
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_cache = _StatsCache(getattr(settings, 'TEXT_EXTRACTION_CACHE_SIZE', 1024))
+
+
+def extract(content):
+    """Returns TextStats(text, words, characters, reading_minutes) of an HTML fragment"""
+    if not content or not content.strip():
+        return EMPTY_STATS
+    key = hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+    stats = _cache.get(key)
+    if stats is None:
+        stats = _stats(content)
+        _cache.set(key, stats)
+    return stats
+
+
+def count_words(content):
+    """Number of words in an HTML fragment"""
+    return extract(content).words
@@ -1,5 +1,6 @@
 from django import forms
 from Main.models import *
+from Main.projections import ListProjectionFormMixin, list_projection
 from django.contrib import messages
 from django.shortcuts import redirect
 from datetime import date
@@ -146,7 +147,7 @@ class ProjectForm(forms.ModelForm):
         return cleaned_data
 
 
-class ResearchProjectForm(forms.ModelForm):
+class ResearchProjectForm(ListProjectionFormMixin, forms.ModelForm):
 
     class Meta:
         model = ResearchProject
@@ -202,7 +203,7 @@ class ResearchProjectForm(forms.ModelForm):
             if not self.instance.template:
                 self.fields['use_template'].initial = False
                 self.fields['template'] = forms.ModelChoiceField(
-                    queryset=ResearchProjectTemplate.objects.all(),
+                    queryset=list_projection(ResearchProjectTemplate.objects.all()),
                     widget=forms.Select(attrs={'class': 'form-control'}),
                     label='قالب طرح',
                     required=False
@@ -222,7 +223,7 @@ class ResearchProjectForm(forms.ModelForm):
 
 
 
-class ArticleForm(forms.ModelForm):
+class ArticleForm(ListProjectionFormMixin, forms.ModelForm):
     class Meta:
         model = Article
         fields = [
@@ -0,0 +1,65 @@
+"""
+Cached HTML fragments of document sections.
+
+A fragment (e.g. the rendered sections of a research project with the
+cited articles' sections) is cached under a key built from the id and
+updated_at of every document it shows. updated_at is a column: it moves
+when the document is saved (auto_now) and when one of its sections is
+saved or deleted (touch_documents() below), so every worker process
+derives the same key from the rows it has already loaded. A fragment is
+never served stale, whichever process cached it, and a hit needs no
+section queries.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from Main.wordcount import SECTION_MODELS
+
+
+def fragment_key(name, documents):
+    """Cache key of fragment name showing documents (model instances), in order"""
+    digest = hashlib.blake2b(digest_size=16)
+    for document in documents:
+        updated_at = getattr(document, 'updated_at', None)
+        version = updated_at.isoformat() if updated_at else ''
+        digest.update(f'{document._meta.label_lower}:{document.pk}:{version};'.encode())
+    return f'fragment:{name}:{digest.hexdigest()}'
+
+
+def cached_fragment(key, render):
+    """The HTML cached under key, rendered with render() on a miss"""
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, getattr(settings, 'FRAGMENT_CACHE_TTL', 60 * 60 * 24))
+    return mark_safe(html)
+
+
+def touch_documents(model, pks):
+    """Moves updated_at of the model rows pks, so the fragments showing them are re-rendered"""
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        model._default_manager.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+def touch_section_parents(model, sections):
+    """touch_documents() for the parents of sections, all of section model"""
+    parent = model._meta.get_field(model.word_count_parent)
+    touch_documents(parent.related_model, [getattr(section, parent.attname) for section in sections])
+
+
+def _touch_on_change(sender, instance, **kwargs):
+    _, old_parent_id = getattr(instance, '_stored_word_count', (None, None))
+    parent = sender._meta.get_field(sender.word_count_parent)
+    touch_documents(parent.related_model, [getattr(instance, parent.attname), old_parent_id])
+
+
+# Connected per model: a receiver without a sender disables fast deletes
+for _name in SECTION_MODELS:
+    post_save.connect(_touch_on_change, sender=f'Main.{_name}', dispatch_uid=f'fragment_section_save_{_name}')
+    post_delete.connect(_touch_on_change, sender=f'Main.{_name}', dispatch_uid=f'fragment_section_delete_{_name}')
@@ -0,0 +1,139 @@
+"""
+Creating document sections from templates.
+
+Article, ResearchProject, ResearchProposal and Thesis templates all list
+sections with a type, title, description and default position. A
+template's sections are cached under its id and updated_at, which moves
+whenever one of its sections is saved, deleted, added or removed, so
+every worker process derives the same key and never serves a stale list.
+The sections of any number of documents are inserted with a single
+bulk_create.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.utils import timezone
+
+from Main.models import (
+    Article, ArticleSection, ArticleTemplate, ArticleTemplateSection,
+    ResearchProject, ResearchProjectSection, ResearchProjectTemplate, ResearchProjectTemplateSection,
+    ResearchProposal, ResearchProposalSection, ResearchProposalTemplate, ResearchProposalTemplateSection,
+    Thesis, ThesisSection, ThesisTemplate, ThesisTemplateSection,
+)
+from Main.search import build_search_document, index_documents
+
+
+# Document model -> (template model, section model, section field pointing at the document)
+TEMPLATED_MODELS = {
+    Article: (ArticleTemplate, ArticleSection, 'article'),
+    ResearchProject: (ResearchProjectTemplate, ResearchProjectSection, 'research_project'),
+    ResearchProposal: (ResearchProposalTemplate, ResearchProposalSection, 'proposal'),
+    Thesis: (ThesisTemplate, ThesisSection, 'thesis'),
+}
+
+# Template model -> its section model (linked through Template.sections)
+TEMPLATE_SECTION_MODELS = {
+    ArticleTemplate: ArticleTemplateSection,
+    ResearchProjectTemplate: ResearchProjectTemplateSection,
+    ResearchProposalTemplate: ResearchProposalTemplateSection,
+    ThesisTemplate: ThesisTemplateSection,
+}
+
+
+def template_sections(template_model, template_id):
+    """
+    The (section_type, title, default_position, description) rows of a
+    template in position order. Raises template_model.DoesNotExist.
+    """
+    updated_at = template_model.objects.values_list('updated_at', flat=True).get(id=template_id)
+    key = f'template-sections:{template_model._meta.label_lower}:{template_id}:{updated_at.isoformat()}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(
+            TEMPLATE_SECTION_MODELS[template_model].objects.filter(templates=template_id)
+            .order_by('default_position')
+            .values_list('section_type', 'title', 'default_position', 'description')
+        )
+        cache.set(key, rows, getattr(settings, 'TEMPLATE_SECTIONS_CACHE_TTL', 60 * 60))
+    return rows
+
+
+def touch_templates(template_model, pks):
+    """Moves updated_at of the template rows pks, so their cached sections are read again"""
+    pks = {pk for pk in pks if pk is not None}
+    if pks:
+        template_model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+def _touch_on_change(template_model):
+    def on_section_change(sender, instance, **kwargs):
+        # pre_delete: the section's links to its templates are deleted with it
+        touch_templates(template_model, instance.templates.values_list('pk', flat=True))
+
+    def on_link_change(sender, instance, action, reverse, pk_set, **kwargs):
+        if not reverse:
+            # template.sections changed
+            if action.startswith('post_'):
+                touch_templates(template_model, [instance.pk])
+        elif action == 'pre_clear':
+            # section.templates.clear() sends no pk_set
+            on_section_change(sender, instance)
+        elif action in ('post_add', 'post_remove'):
+            touch_templates(template_model, pk_set)
+    return on_section_change, on_link_change
+
+
+for _template_model, _section_model in TEMPLATE_SECTION_MODELS.items():
+    _on_section_change, _on_link_change = _touch_on_change(_template_model)
+    _uid = f'touch_{_template_model.__name__}'
+    post_save.connect(_on_section_change, sender=_section_model, weak=False, dispatch_uid=f'{_uid}_section_save')
+    pre_delete.connect(_on_section_change, sender=_section_model, weak=False, dispatch_uid=f'{_uid}_section_delete')
+    m2m_changed.connect(
+        _on_link_change, sender=_template_model.sections.through, weak=False, dispatch_uid=f'{_uid}_sections'
+    )
+
+
+def instantiate_template(documents, template_id):
+    """
+    Sets the template of documents (all of one model; unsaved ones are
+    saved) and creates every template section for each of them in one
+    INSERT, e.g. a whole cohort of theses. Returns the documents.
+    """
+    if not documents:
+        return documents
+    document_model = type(documents[0])
+    template_model, section_model, parent_field = TEMPLATED_MODELS[document_model]
+    rows = template_sections(template_model, template_id)
+
+    with transaction.atomic():
+        for document in documents:
+            if document.pk is None:
+                document.template_id = template_id
+                document.save()
+        # Also moves updated_at, as saving the new sections one by one would (see Main.fragments)
+        now = timezone.now()
+        document_model.objects.filter(pk__in=[document.pk for document in documents]).update(
+            template_id=template_id, updated_at=now
+        )
+        for document in documents:
+            document.template_id = template_id
+            document.updated_at = now
+
+        # Template sections have no content, so there are no word counts to propagate
+        section_model.objects.bulk_create([
+            section_model(
+                **{parent_field: document},
+                section_type=section_type,
+                title=title,
+                position=position,
+                guidance=description,
+            )
+            for document in documents
+            for section_type, title, position, description in rows
+        ])
+
+        # bulk_create sends no post_save; the new sections are indexed here
+        sections = section_model.objects.filter(**{f'{parent_field}__in': documents}).select_related(parent_field)
+        index_documents([build_search_document(section) for section in sections])
+    return documents
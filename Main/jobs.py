@@ -0,0 +1,130 @@
+"""
+Database-backed job queue.
+
+Views enqueue work with enqueue() and return immediately; the run_jobs
+management command claims queued jobs and runs the handler registered for
+their kind. No external broker is needed.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from Main.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def register(kind):
+    """Registers the decorated function as the handler of a job kind"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, user=None, max_attempts=3):
+    """Creates a queued job and returns it"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        payload=payload,
+        created_by=user if user is not None and user.is_authenticated else None,
+        max_attempts=max_attempts,
+    )
+
+
+def claim_next():
+    """Atomically marks the oldest runnable job as running and returns it (or None)"""
+    now = timezone.now()
+    candidates = Job.objects.filter(status='queued', run_after__lte=now).order_by('id')
+    for job_id in candidates.values_list('id', flat=True)[:10]:
+        # The conditional update only succeeds for one worker
+        claimed = Job.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """
+    Runs a claimed job and records its result. A ValidationError fails the
+    job at once; any other error schedules a retry with backoff.
+    """
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+        job.result = handler(job)
+        job.status = 'done'
+        job.error = ''
+    except ValidationError as e:
+        # Permanent (e.g. a DOI Crossref does not know): a retry would fail the same way
+        logger.warning(f"Job {job.pk} ({job.kind}) failed: {'; '.join(e.messages)}")
+        job.error = '; '.join(e.messages)
+        job.status = 'failed'
+    except Exception as e:
+        logger.warning(f"Job {job.pk} ({job.kind}) failed: {str(e)}")
+        job.error = str(e)
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=30 * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+    if job.is_finished:
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'run_after', 'finished_at'])
+    return job
+
+
+def requeue_stale(timeout=None):
+    """Puts jobs left running by a crashed worker back in the queue"""
+    timeout = timeout or getattr(settings, 'JOB_RUNNING_TIMEOUT', 600)
+    return Job.objects.filter(
+        status='running',
+        started_at__lt=timezone.now() - timedelta(seconds=timeout),
+    ).update(status='queued', run_after=timezone.now())
+
+
+def run_worker(once=False, sleep=1.0):
+    """Processes jobs until interrupted; with once=True stops when the queue is empty"""
+    processed = 0
+    requeue_stale()
+    while True:
+        close_old_connections()
+        job = claim_next()
+        if job is None:
+            if once:
+                return processed
+            time.sleep(sleep)
+            requeue_stale()
+            continue
+        run_job(job)
+        processed += 1
+
+
+## Handlers ##
+
+@register('resolve_doi')
+def resolve_doi(job):
+    """Creates the Article of a DOI and cites it from the object in the payload"""
+    from Main.crossref import add_doi_reference
+
+    payload = job.payload
+    citing_type = ContentType.objects.get_for_id(payload['citing_content_type_id'])
+    citing_obj = citing_type.get_object_for_this_type(pk=payload['citing_object_id'])
+    return add_doi_reference(citing_obj, payload['doi'])
@@ -0,0 +1,21 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+
+from Main.models import SearchDocument
+from Main.search import SEARCHABLE_MODELS, index_queryset
+
+
+class Command(BaseCommand):
+    help = 'Re-indexes every searchable object and drops rows of deleted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in SEARCHABLE_MODELS:
+            indexed = index_queryset(model._default_manager.all(), batch_size=options['batch_size'])
+            stale, _ = SearchDocument.objects.filter(
+                content_type=ContentType.objects.get_for_model(model),
+            ).exclude(object_id__in=model._default_manager.values('pk')).delete()
+            self.stdout.write(f'{model.__name__}: {indexed} indexed, {stale} removed')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Main.models import ArticleSection, BookSection, ResearchProjectSection, ResearchProposalSection, ThesisSection
+from Main.extraction import count_words
+from Main.wordcount import recompute_word_counts
+
+
+SECTION_MODELS = (ArticleSection, BookSection, ResearchProjectSection, ResearchProposalSection, ThesisSection)
+
+
+class Command(BaseCommand):
+    help = 'Recomputes chapter, document and project word-count totals from the sections'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sections', action='store_true',
+            help='Recount every section from its content first',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['sections']:
+            for model in SECTION_MODELS:
+                changed = []
+                for section in model.objects.only('pk', 'content', 'word_count').iterator(chunk_size=options['batch_size']):
+                    count = count_words(section.content)
+                    if section.word_count != count:
+                        section.word_count = count
+                        changed.append(section)
+                # bulk_update skips save(), the totals are rebuilt below
+                model.objects.bulk_update(changed, ['word_count'], batch_size=options['batch_size'])
+                self.stdout.write(f'{model.__name__}: {len(changed)} section(s) recounted')
+
+        with transaction.atomic():
+            recompute_word_counts()
+        self.stdout.write(self.style.SUCCESS('Word-count totals recomputed'))
@@ -0,0 +1,43 @@
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from Main.models import Reference, has_citation_count
+
+
+class Command(BaseCommand):
+    help = 'Recomputes materialized citation counts from the Reference table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        fixed = 0
+        for model in apps.get_app_config('Main').get_models():
+            if not has_citation_count(model):
+                continue
+            content_type = ContentType.objects.get_for_model(model)
+            counts = dict(
+                Reference.objects.filter(cited_content_type=content_type)
+                .values_list('cited_object_id')
+                .annotate(total=Count('id'))
+                .order_by()
+            )
+
+            drifted = []
+            for obj in model._default_manager.only('pk', 'citation_count').iterator():
+                expected = counts.get(obj.pk, 0)
+                if obj.citation_count != expected:
+                    obj.citation_count = expected
+                    drifted.append(obj)
+
+            if drifted and not options['dry_run']:
+                model._default_manager.bulk_update(drifted, ['citation_count'], batch_size=options['batch_size'])
+            if drifted:
+                self.stdout.write(f'{model.__name__}: {len(drifted)} count(s) out of date')
+            fixed += len(drifted)
+
+        verb = 'found' if options['dry_run'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS(f'{fixed} citation count(s) {verb}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from Main.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (DOI resolution, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        processed = run_worker(once=options['once'], sleep=options['sleep'])
+        self.stdout.write(self.style.SUCCESS(f'{processed} job(s) processed'))
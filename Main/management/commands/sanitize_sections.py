@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from Main.models import ArticleSection, BookSection, ResearchProjectSection, ResearchProposalSection, ThesisSection
+from Main.sanitize import sanitize_sections
+
+
+SECTION_MODELS = (ArticleSection, BookSection, ResearchProjectSection, ResearchProposalSection, ThesisSection)
+
+
+class Command(BaseCommand):
+    help = 'Rewrites the sanitized rendition (clean_content) of every section from its content'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in SECTION_MODELS:
+            changed = sanitize_sections(model, batch_size=options['batch_size'])
+            self.stdout.write(f'{model.__name__}: {changed} section(s) sanitized')
+        self.stdout.write(self.style.SUCCESS('Section content sanitized'))
@@ -0,0 +1,78 @@
+"""
+ProjectMembership rows kept in sync with Project.owner and
+Project.collaborators.
+
+sync_memberships() rebuilds the rows of any number of projects with a
+fixed number of queries; it runs after a project is saved with a new
+owner, after collaborators change from either side of the M2M, and from
+ProjectQuerySet.bulk_create().
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+
+def sync_memberships(project_ids):
+    """Makes the memberships of projects match their owner and collaborators"""
+    project_ids = set(project_ids)
+    if not project_ids:
+        return
+    Project = apps.get_model('Main', 'Project')
+    ProjectMembership = apps.get_model('Main', 'ProjectMembership')
+
+    desired = {
+        (owner_id, project_id): 'owner'
+        for project_id, owner_id in Project.objects.filter(pk__in=project_ids).values_list('pk', 'owner_id')
+    }
+    collaborators = Project.collaborators.through.objects.filter(project_id__in=project_ids)
+    for project_id, user_id in collaborators.values_list('project_id', 'user_id'):
+        desired.setdefault((user_id, project_id), 'collaborator')
+
+    existing = {
+        (membership.user_id, membership.project_id): membership
+        for membership in ProjectMembership.objects.filter(project_id__in=project_ids)
+    }
+    stale = [membership.pk for key, membership in existing.items() if key not in desired]
+    changed = []
+    for key, role in desired.items():
+        membership = existing.get(key)
+        if membership is not None and membership.role != role:
+            membership.role = role
+            changed.append(membership)
+    new = [
+        ProjectMembership(user_id=user_id, project_id=project_id, role=role)
+        for (user_id, project_id), role in desired.items()
+        if (user_id, project_id) not in existing
+    ]
+
+    with transaction.atomic():
+        if stale:
+            ProjectMembership.objects.filter(pk__in=stale).delete()
+        ProjectMembership.objects.bulk_update(changed, ['role'])
+        ProjectMembership.objects.bulk_create(new, ignore_conflicts=True)
+
+
+@receiver(post_save, sender='Main.Project')
+def sync_owner_membership(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    owner_synced = apps.get_model('Main', 'ProjectMembership').objects.filter(
+        project=instance, user_id=instance.owner_id, role='owner'
+    )
+    if created or not owner_synced.exists():
+        sync_memberships([instance.pk])
+
+
+@receiver(m2m_changed, sender='Main.Project_collaborators')
+def sync_collaborator_memberships(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # user.collaborated_projects.clear() sends no pk_set; remember the projects
+        instance._cleared_membership_ids = list(instance.collaborated_projects.values_list('pk', flat=True))
+    elif action.startswith('post_'):
+        if not reverse:
+            sync_memberships([instance.pk])
+        elif action == 'post_clear':
+            sync_memberships(getattr(instance, '_cleared_membership_ids', ()))
+        else:
+            sync_memberships(pk_set)
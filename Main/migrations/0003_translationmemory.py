@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 10:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0002_alter_articlesection_section_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationMemory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text_hash', models.CharField(max_length=64, verbose_name='Text Hash')),
+                ('source_lang', models.CharField(default='auto', max_length=10, verbose_name='Source Language')),
+                ('target_lang', models.CharField(max_length=10, verbose_name='Target Language')),
+                ('source_text', models.TextField(verbose_name='Source Text')),
+                ('translation', models.TextField(verbose_name='Translation')),
+                ('hit_count', models.PositiveIntegerField(default=0, verbose_name='Hit Count')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Last Used At')),
+            ],
+            options={
+                'verbose_name': 'Translation Memory',
+                'verbose_name_plural': 'Translation Memories',
+                'indexes': [models.Index(fields=['last_used_at'], name='translation_last_used_idx')],
+                'unique_together': {('text_hash', 'source_lang', 'target_lang')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 10:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0003_translationmemory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrossrefWork',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doi', models.CharField(max_length=255, unique=True, verbose_name='DOI')),
+                ('status_code', models.PositiveSmallIntegerField(default=200, verbose_name='HTTP Status')),
+                ('message', models.JSONField(blank=True, null=True, verbose_name='Work Record')),
+                ('etag', models.CharField(blank=True, max_length=255, verbose_name='ETag')),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fetched At')),
+            ],
+            options={
+                'verbose_name': 'Crossref Work',
+                'verbose_name_plural': 'Crossref Works',
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 10:50
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normalize(value):
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return ' '.join(value.casefold().split())
+
+
+def populate_name_key(apps, schema_editor):
+    Author = apps.get_model('Main', 'Author')
+    authors = list(Author.objects.only('id', 'first_name', 'last_name'))
+    for author in authors:
+        author.name_key = f"{_normalize(author.last_name)}|{_normalize(author.first_name)}"[:202]
+    Author.objects.bulk_update(authors, ['name_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0005_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=202, verbose_name='Normalized Name'),
+        ),
+        migrations.AlterField(
+            model_name='author',
+            name='orcid_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Format: XXXX-XXXX-XXXX-XXXX', max_length=19, verbose_name='ORCID ID'),
+        ),
+        migrations.RunPython(populate_name_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+def remove_duplicate_references(apps, schema_editor):
+    Reference = apps.get_model('Main', 'Reference')
+    seen = set()
+    duplicates = []
+    for reference in Reference.objects.order_by('id').iterator():
+        key = (
+            reference.citing_content_type_id, reference.citing_object_id,
+            reference.cited_content_type_id, reference.cited_object_id,
+        )
+        if key in seen:
+            duplicates.append(reference.id)
+        else:
+            seen.add(key)
+    Reference.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0006_author_name_key'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_references, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reference',
+            index=models.Index(fields=['cited_content_type', 'cited_object_id'], name='reference_cited_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reference',
+            constraint=models.UniqueConstraint(fields=('citing_content_type', 'citing_object_id', 'cited_content_type', 'cited_object_id'), name='unique_reference'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 10:54
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_citation_counts(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Reference = apps.get_model('Main', 'Reference')
+    for model_name in ('article', 'book', 'researchproject', 'researchproposal', 'thesis'):
+        content_type = ContentType.objects.filter(app_label='Main', model=model_name).first()
+        if content_type is None:
+            continue
+        model = apps.get_model('Main', model_name)
+        counts = (
+            Reference.objects.filter(cited_content_type=content_type)
+            .values_list('cited_object_id')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for object_id, total in counts:
+            model.objects.filter(pk=object_id).update(citation_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0007_reference_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='citation_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Citation Count'),
+        ),
+        migrations.AddField(
+            model_name='researchproject',
+            name='citation_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Citation Count'),
+        ),
+        migrations.AddField(
+            model_name='researchproposal',
+            name='citation_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Citation Count'),
+        ),
+        migrations.AddField(
+            model_name='thesis',
+            name='citation_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Citation Count'),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='citation_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Citation Count'),
+        ),
+        migrations.RunPython(populate_citation_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,212 @@
+# Generated by Django 5.2 on 2026-10-18 10:56
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+from lxml import etree
+
+
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE "Main_searchdocument_fts" USING fts5(
+        title, body, content='Main_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER "Main_searchdocument_fts_ai" AFTER INSERT ON "Main_searchdocument" BEGIN
+        INSERT INTO "Main_searchdocument_fts" (rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER "Main_searchdocument_fts_ad" AFTER DELETE ON "Main_searchdocument" BEGIN
+        INSERT INTO "Main_searchdocument_fts" ("Main_searchdocument_fts", rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER "Main_searchdocument_fts_au" AFTER UPDATE ON "Main_searchdocument" BEGIN
+        INSERT INTO "Main_searchdocument_fts" ("Main_searchdocument_fts", rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO "Main_searchdocument_fts" (rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS "Main_searchdocument_fts_au"',
+    'DROP TRIGGER IF EXISTS "Main_searchdocument_fts_ad"',
+    'DROP TRIGGER IF EXISTS "Main_searchdocument_fts_ai"',
+    'DROP TABLE IF EXISTS "Main_searchdocument_fts"',
+]
+
+MYSQL_INDEX = ['ALTER TABLE `Main_searchdocument` ADD FULLTEXT INDEX `searchdocument_fulltext` (`title`, `body`)']
+
+MYSQL_DROP = ['ALTER TABLE `Main_searchdocument` DROP INDEX `searchdocument_fulltext`']
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_INDEX, 'mysql': MYSQL_INDEX})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP, 'mysql': MYSQL_DROP})
+
+
+# Frozen copies of Main.search, Main.extraction and Main.text as of this
+# migration: a migration must not depend on the live modules.
+
+# Searchable model -> paths from an instance to the document it belongs to
+SEARCHABLE_MODELS = {
+    'Article': (),
+    'Book': (),
+    'TranslatedBook': (),
+    'ResearchProject': (),
+    'ResearchProposal': (),
+    'Thesis': (),
+    'ArticleSection': ('article',),
+    'BookSection': ('chapter__book', 'chapter__translated_book'),
+    'ResearchProjectSection': ('research_project',),
+    'ResearchProposalSection': ('proposal',),
+    'ThesisSection': ('thesis',),
+}
+
+TRANSLATE_TABLE = str.maketrans({
+    '\u064a': '\u06cc', '\u0649': '\u06cc', '\u0643': '\u06a9',
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{
+        char: None for char in (
+            [chr(code) for code in range(0x064b, 0x0660)]
+            + ['\u0670', '\u0640', '\u00ad', '\u061c', '\u200b', '\u200d', '\u200e', '\u200f', '\ufeff']
+            + [chr(code) for code in range(0x202a, 0x202f)]
+            + [chr(code) for code in range(0x2066, 0x206a)]
+        )
+    },
+})
+
+SKIPPED_TAGS = frozenset({'script', 'style', 'noscript', 'template', 'head', 'iframe', 'object', 'svg'})
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'caption', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'td', 'tfoot',
+    'th', 'thead', 'tr', 'ul',
+})
+
+
+def normalize(text):
+    if not text:
+        return ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKC', text).translate(TRANSLATE_TABLE)
+        if '\u200c' in text:
+            text = re.sub(r'(?<!\w)\u200c|\u200c(?!\w)', '', re.sub(r'\u200c{2,}', '\u200c', text))
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class TextCollector:
+
+    def __init__(self):
+        self.parts = []
+        self.skipping = 0
+
+    def start(self, tag, attrib):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def end(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def close(self):
+        return ''.join(self.parts)
+
+
+def extract_text(content):
+    if not content or not content.strip():
+        return ''
+    parser = etree.HTMLParser(target=TextCollector(), remove_comments=True, remove_pis=True)
+    parser.feed(content)
+    return normalize(parser.close())
+
+
+def document_of(instance, paths):
+    for path in paths:
+        document = instance
+        for name in path.split('__'):
+            document = getattr(document, name)
+        if document is not None:
+            return document
+    return None if paths else instance
+
+
+def index_existing_objects(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    SearchDocument = apps.get_model('Main', 'SearchDocument')
+    for name, paths in SEARCHABLE_MODELS.items():
+        queryset = apps.get_model('Main', name).objects.select_related(*paths)
+        if not queryset.exists():
+            continue
+        content_type, _ = ContentType.objects.get_or_create(app_label='Main', model=name.lower())
+        rows = []
+        for instance in queryset.iterator(chunk_size=500):
+            document = document_of(instance, paths)
+            if document is None:
+                continue
+            if document is instance:
+                title, body = instance.title, ''
+            else:
+                title = instance.title or instance.get_section_type_display()
+                body = extract_text(instance.content)
+            rows.append(SearchDocument(
+                content_type=content_type,
+                object_id=instance.pk,
+                document_type=document._meta.model_name,
+                document_id=document.pk,
+                project_id=document.project_id,
+                title=normalize(title)[:500],
+                body=body,
+            ))
+            if len(rows) >= 500:
+                SearchDocument.objects.bulk_create(rows)
+                rows = []
+        SearchDocument.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0008_citation_counts'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('document_type', models.CharField(max_length=100)),
+                ('document_id', models.PositiveIntegerField()),
+                ('title', models.CharField(blank=True, max_length=500)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Main.project')),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(index_existing_objects, migrations.RunPython.noop),
+    ]
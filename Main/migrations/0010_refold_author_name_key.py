@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-18 10:58
+
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+# Frozen copy of Main.text.fold as of this migration: a migration must not
+# depend on the live modules.
+
+TRANSLATE_TABLE = str.maketrans({
+    '\u064a': '\u06cc', '\u0649': '\u06cc', '\u0643': '\u06a9',
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{
+        char: None for char in (
+            [chr(code) for code in range(0x064b, 0x0660)]
+            + ['\u0670', '\u0640', '\u00ad', '\u061c', '\u200b', '\u200d', '\u200e', '\u200f', '\ufeff']
+            + [chr(code) for code in range(0x202a, 0x202f)]
+            + [chr(code) for code in range(0x2066, 0x206a)]
+        )
+    },
+})
+
+
+def fold(text):
+    if not text:
+        return ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+        text = unicodedata.normalize('NFKC', text).translate(TRANSLATE_TABLE)
+        if '\u200c' in text:
+            text = re.sub(r'(?<!\w)\u200c|\u200c(?!\w)', '', re.sub(r'\u200c{2,}', '\u200c', text))
+    return re.sub(r'\s+', ' ', text).strip().casefold()
+
+
+def refold_name_key(apps, schema_editor):
+    Author = apps.get_model('Main', 'Author')
+    authors = list(Author.objects.only('id', 'first_name', 'last_name'))
+    for author in authors:
+        author.name_key = f"{fold(author.last_name)}|{fold(author.first_name)}"[:202]
+    Author.objects.bulk_update(authors, ['name_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0009_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(refold_name_key, migrations.RunPython.noop),
+    ]
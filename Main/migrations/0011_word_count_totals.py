@@ -0,0 +1,90 @@
+# Generated by Django 5.2 on 2026-10-18 11:01
+
+from django.db import migrations, models
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+# Frozen copy of Main.wordcount.recompute_word_counts as of this
+# migration: a migration must not depend on the live modules.
+
+def total(model, parent_field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{parent_field: OuterRef('pk')})
+            .order_by()
+            .values(parent_field)
+            .annotate(total=Sum('word_count'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def populate_word_counts(apps, schema_editor):
+    def model(name):
+        return apps.get_model('Main', name)
+
+    model('BookChapter').objects.update(word_count=total(model('BookSection'), 'chapter'))
+    model('Book').objects.update(word_count=total(model('BookChapter'), 'book'))
+    model('TranslatedBook').objects.update(word_count=total(model('BookChapter'), 'translated_book'))
+    model('Article').objects.update(word_count=total(model('ArticleSection'), 'article'))
+    model('ResearchProject').objects.update(word_count=total(model('ResearchProjectSection'), 'research_project'))
+    model('ResearchProposal').objects.update(word_count=total(model('ResearchProposalSection'), 'proposal'))
+    model('Thesis').objects.update(word_count=total(model('ThesisSection'), 'thesis'))
+    project_total = Value(0)
+    for name in ('Article', 'Book', 'TranslatedBook', 'ResearchProject', 'ResearchProposal', 'Thesis'):
+        project_total = project_total + total(model(name), 'project')
+    model('Project').objects.update(word_count=project_total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0010_refold_author_name_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+        migrations.AddField(
+            model_name='researchproject',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+        migrations.AddField(
+            model_name='researchproposal',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+        migrations.AddField(
+            model_name='thesis',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+        migrations.AddField(
+            model_name='translatedbook',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+        migrations.AlterField(
+            model_name='bookchapter',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count'),
+        ),
+        migrations.RunPython(populate_word_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-18 11:07
+
+from django.db import migrations, models
+from django.db.models import IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    BookChapter = apps.get_model('Main', 'BookChapter')
+
+    def next_number(model_name, number_field):
+        return Coalesce(
+            Subquery(
+                apps.get_model('Main', model_name).objects.filter(chapter=OuterRef('pk'))
+                .order_by()
+                .values('chapter')
+                .annotate(last=Max(number_field))
+                .values('last'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ) + 1
+
+    BookChapter.objects.update(
+        next_figure_number=next_number('BookFigure', 'figure_number'),
+        next_table_number=next_number('BookTable', 'table_number'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0011_word_count_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookchapter',
+            name='next_figure_number',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Next Figure Number'),
+        ),
+        migrations.AddField(
+            model_name='bookchapter',
+            name='next_table_number',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Next Table Number'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
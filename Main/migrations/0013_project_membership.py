@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 11:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_memberships(apps, schema_editor):
+    # The table is new: every owner and collaborator becomes a row
+    Project = apps.get_model('Main', 'Project')
+    ProjectMembership = apps.get_model('Main', 'ProjectMembership')
+    project_ids = list(Project.objects.values_list('pk', flat=True))
+    for start in range(0, len(project_ids), 1000):
+        batch = project_ids[start:start + 1000]
+        roles = {
+            (owner_id, project_id): 'owner'
+            for project_id, owner_id in Project.objects.filter(pk__in=batch).values_list('pk', 'owner_id')
+        }
+        collaborators = Project.collaborators.through.objects.filter(project_id__in=batch)
+        for project_id, user_id in collaborators.values_list('project_id', 'user_id'):
+            roles.setdefault((user_id, project_id), 'collaborator')
+        ProjectMembership.objects.bulk_create([
+            ProjectMembership(user_id=user_id, project_id=project_id, role=role)
+            for (user_id, project_id), role in roles.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0012_chapter_number_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'Owner'), ('collaborator', 'Collaborator')], max_length=20, verbose_name='Role')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='Main.project', verbose_name='Project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_memberships', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Project Membership',
+                'verbose_name_plural': 'Project Memberships',
+                'constraints': [models.UniqueConstraint(fields=('user', 'project'), name='unique_project_membership')],
+            },
+        ),
+        migrations.RunPython(populate_memberships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,165 @@
+# Generated by Django 5.2 on 2026-10-18 11:19
+
+import html
+import re
+
+from django.db import migrations, models
+from lxml import etree
+from lxml import html as lxml_html
+
+
+# Frozen copy of Main.sanitize as of this migration: a migration must not
+# depend on the live modules.
+
+ALLOWED_TAGS = frozenset({
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'cite', 'code', 'col', 'colgroup', 'dd', 'del',
+    'div', 'dl', 'dt', 'em', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i',
+    'img', 'ins', 'li', 'mark', 'ol', 'p', 'pre', 'q', 's', 'small', 'span', 'strike', 'strong', 'sub',
+    'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+})
+
+DROPPED_TAGS = frozenset({
+    'button', 'embed', 'form', 'frame', 'frameset', 'head', 'iframe', 'input', 'link', 'math', 'meta',
+    'noscript', 'object', 'script', 'select', 'style', 'svg', 'template', 'textarea', 'title',
+})
+
+ALLOWED_ATTRIBUTES = {
+    '*': frozenset({'dir', 'lang', 'style', 'title'}),
+    'a': frozenset({'href', 'target'}),
+    'img': frozenset({'alt', 'height', 'src', 'width'}),
+    'ol': frozenset({'start', 'type'}),
+    'td': frozenset({'colspan', 'rowspan'}),
+    'th': frozenset({'colspan', 'rowspan', 'scope'}),
+    'col': frozenset({'span'}),
+    'colgroup': frozenset({'span'}),
+}
+
+URL_ATTRIBUTES = frozenset({'href', 'src'})
+ALLOWED_SCHEMES = frozenset({'http', 'https', 'mailto'})
+
+ALLOWED_STYLES = frozenset({
+    'background-color', 'color', 'direction', 'font-style', 'font-weight', 'margin-left', 'padding-left',
+    'text-align', 'text-decoration', 'vertical-align',
+})
+
+PARSER = lxml_html.HTMLParser(remove_comments=True, remove_pis=True)
+XML_DECLARATION_RE = re.compile(r'^<\?xml[^>]*\?>', re.IGNORECASE)
+SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.\-]*):')
+UNSAFE_STYLE_RE = re.compile(r'url\s*\(|expression\s*\(|[\\<>]', re.IGNORECASE)
+CONTROL_RE = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def safe_url(url, tag):
+    match = SCHEME_RE.match(CONTROL_RE.sub('', url).lower())
+    if match is None:
+        return True
+    if tag == 'img' and url.strip().lower().startswith('data:image/'):
+        return True
+    return match.group(1) in ALLOWED_SCHEMES
+
+
+def clean_style(style):
+    declarations = []
+    for declaration in style.split(';'):
+        name, _, value = declaration.partition(':')
+        name, value = name.strip().lower(), value.strip()
+        if name in ALLOWED_STYLES and value and not UNSAFE_STYLE_RE.search(value):
+            declarations.append(f'{name}: {value}')
+    return '; '.join(declarations)
+
+
+def clean_attributes(element, tag):
+    allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, frozenset())
+    for name in list(element.attrib):
+        value = element.attrib[name]
+        if name == 'style':
+            value = clean_style(value)
+        if name not in allowed or not value or (name in URL_ATTRIBUTES and not safe_url(value, tag)):
+            del element.attrib[name]
+        else:
+            element.attrib[name] = value
+    if tag == 'a' and element.get('target'):
+        element.set('target', '_blank')
+        element.set('rel', 'noopener noreferrer')
+
+
+def clean(parent):
+    for element in list(parent):
+        if not isinstance(element.tag, str):
+            element.drop_tree()
+            continue
+        tag = element.tag.lower()
+        if tag in DROPPED_TAGS:
+            element.drop_tree()
+            continue
+        clean(element)
+        if tag in ALLOWED_TAGS:
+            clean_attributes(element, tag)
+        else:
+            element.drop_tag()
+
+
+def sanitize_html(content):
+    if not content or not content.strip():
+        return ''
+    try:
+        document = lxml_html.document_fromstring(XML_DECLARATION_RE.sub('', content), parser=PARSER)
+    except etree.ParserError:
+        return ''
+    body = document.find('body')
+    if body is None:
+        return ''
+    clean(body)
+    parts = [html.escape(body.text or '', quote=False)]
+    parts += [lxml_html.tostring(element, encoding='unicode') for element in body]
+    return ''.join(parts).strip()
+
+
+def populate_clean_content(apps, schema_editor):
+    for name in ('ArticleSection', 'BookSection', 'ResearchProjectSection', 'ResearchProposalSection', 'ThesisSection'):
+        model = apps.get_model('Main', name)
+        last_pk = 0
+        while True:
+            batch = list(model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'content')[:500])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for section in batch:
+                section.clean_content = sanitize_html(section.content)
+            model.objects.bulk_update(batch, ['clean_content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0014_project_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articlesection',
+            name='clean_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='Clean Content'),
+        ),
+        migrations.AddField(
+            model_name='booksection',
+            name='clean_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='Clean Content'),
+        ),
+        migrations.AddField(
+            model_name='researchprojectsection',
+            name='clean_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='Clean Content'),
+        ),
+        migrations.AddField(
+            model_name='researchproposalsection',
+            name='clean_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='Clean Content'),
+        ),
+        migrations.AddField(
+            model_name='thesissection',
+            name='clean_content',
+            field=models.TextField(blank=True, editable=False, verbose_name='Clean Content'),
+        ),
+        migrations.RunPython(populate_clean_content, migrations.RunPython.noop),
+    ]
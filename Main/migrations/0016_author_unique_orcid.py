@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 11:26
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0015_section_clean_content'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='author',
+            unique_together={('first_name', 'last_name', 'email', 'orcid_id')},
+        ),
+    ]
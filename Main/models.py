@@ -4,16 +4,22 @@ from django.urls import reverse
 from tinymce.models import HTMLField
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 import reversion
 from django.contrib.contenttypes.models import ContentType
 from django.core.validators import MinValueValidator
 from django.utils.functional import cached_property
-from django.utils.text import slugify
-from django.db.models import Q
+from django.db.models import Exists, F, OuterRef, Q
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-import re
+from Main.extraction import count_words
+from Main.membership import sync_memberships
+from Main.numbering import NumberedModelMixin, NumberedQuerySet
+from Main.permissions import project_access
+from Main.sanitize import sanitize_html
+from Main.slugs import assign_slugs, save_with_slug
+from Main.text import fold
+from Main.wordcount import SectionWordCountMixin, WordCountTotalMixin
 
 ## User Models ##
 class Profile(models.Model):
@@ -92,9 +98,17 @@ class Author(models.Model):
     orcid_id = models.CharField(
         max_length=19, 
         blank=True, 
+        db_index=True,
         verbose_name='ORCID ID',
         help_text='Format: XXXX-XXXX-XXXX-XXXX'
     )
+    name_key = models.CharField(
+        max_length=202,
+        blank=True,
+        db_index=True,
+        editable=False,
+        verbose_name='Normalized Name'
+    )
     
     # Academic information
     affiliation = models.CharField(max_length=200, blank=True, verbose_name='Affiliation')
@@ -116,11 +130,20 @@ class Author(models.Model):
         verbose_name = 'Author'
         verbose_name_plural = 'Authors'
         ordering = ['last_name', 'first_name']
-        unique_together = ['first_name', 'last_name', 'email']
+        unique_together = ['first_name', 'last_name', 'email', 'orcid_id']
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def save(self, *args, **kwargs):
+        self.name_key = self.make_name_key(self.first_name, self.last_name)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def make_name_key(first_name, last_name):
+        """Folded (see Main.text.fold) 'last|first' key used to match and search authors"""
+        return f"{fold(last_name)}|{fold(first_name)}"[:202]
+
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
     full_name.short_description = 'Full Name'
@@ -131,7 +154,29 @@ class Author(models.Model):
 
 
 
-class Project(models.Model):
+class ProjectQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # save() is skipped, so slugs are assigned here in one query
+        objs = super().bulk_create(assign_slugs(list(objs)), *args, **kwargs)
+        # and post_save is not sent; the slugs find the new rows even where no pks are returned
+        sync_memberships(self.filter(slug__in=[obj.slug for obj in objs]).values_list('pk', flat=True))
+        return objs
+
+    def member_of(self, user):
+        """Projects user owns or collaborates on: one join on ProjectMembership, no DISTINCT"""
+        return self.filter(memberships__user=user)
+
+    def visible_to(self, user):
+        """Public projects plus the ones user is a member of, checked with an indexed EXISTS"""
+        public = Q(visibility='public')
+        if not user.is_authenticated:
+            return self.filter(public)
+        return self.filter(public | Exists(
+            ProjectMembership.objects.filter(user=user, project=OuterRef('pk'))
+        ))
+
+
+class Project(WordCountTotalMixin, models.Model):
     """
     """
     # Project owner (researcher/student)
@@ -220,10 +265,19 @@ class Project(models.Model):
         help_text='Projects related to this one'
     )
 
+    # Total of the documents' sections, kept by Main.wordcount
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count')
+
+    objects = ProjectQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Project'
         verbose_name_plural = 'Projects'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination order of the project list
+            models.Index(fields=['created_at', 'id'], name='project_created_idx'),
+        ]
         permissions = [
             ('can_invite_collaborators', 'Can invite collaborators'),
             ('can_change_visibility', 'Can change project visibility'),
@@ -233,14 +287,10 @@ class Project(models.Model):
         return f"{self.title} ({self.get_type_display()})"
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            self.slug = base_slug
-            counter = 1
-            while Project.objects.filter(slug=self.slug).exists():
-                self.slug = f"{base_slug}-{counter}"
-                counter += 1
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        # One query for the next free suffix, retried if a concurrent save takes it
+        save_with_slug(self, lambda: super(Project, self).save(*args, **kwargs))
 
     def get_absolute_url(self):
         return reverse('project_detail', kwargs={'slug': self.slug})
@@ -258,18 +308,11 @@ class Project(models.Model):
         return self.visibility == 'team'
 
     def can_view(self, user):
-        if self.is_public:
-            return True
-        if not user.is_authenticated:
-            return False
-        if user == self.owner or user in self.collaborators.all():
-            return True
-        return False
+        # Set lookups on the user's memoized collaborations, see Main.permissions
+        return project_access(user).can_view(self)
 
     def can_edit(self, user):
-        if not user.is_authenticated:
-            return False
-        return user == self.owner or user.has_perm('projects.change_project')
+        return project_access(user).can_edit(self)
 
     def get_progress_class(self):
         if self.progress == 0:
@@ -277,9 +320,44 @@ class Project(models.Model):
         elif self.progress == 100:
             return 'success'
         return 'warning'
-    
 
 
+class ProjectMembership(models.Model):
+    """
+    One row per user with access to a project (the owner and the
+    collaborators), kept in sync by Main.membership so visibility filters
+    are an indexed lookup instead of an OR over owner and the M2M table.
+    """
+    ROLES = (
+        ('owner', 'Owner'),
+        ('collaborator', 'Collaborator'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='project_memberships',
+        verbose_name='User'
+    )
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='memberships',
+        verbose_name='Project'
+    )
+    role = models.CharField(max_length=20, choices=ROLES, verbose_name='Role')
+
+    class Meta:
+        verbose_name = 'Project Membership'
+        verbose_name_plural = 'Project Memberships'
+        constraints = [
+            # Also the (user, project) index used by visible_to()
+            models.UniqueConstraint(fields=['user', 'project'], name='unique_project_membership'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} ({self.get_role_display()}) in {self.project}"
+
 
 @reversion.register()
 class Task(models.Model):
@@ -374,7 +452,7 @@ class ProjectComment(models.Model):
 ## Article Models ##
 
 @reversion.register()
-class Article(models.Model):
+class Article(WordCountTotalMixin, models.Model):
     """
     Enhanced Article model with comprehensive academic fields
     """
@@ -437,7 +515,7 @@ class Article(models.Model):
     publish_date = models.DateField(verbose_name='Publish Date', null=True, blank=True)
     
     # Citation metrics
-    citation_count = models.PositiveIntegerField(default=0, verbose_name='Citation Count')
+    citation_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name='Citation Count')
     download_count = models.PositiveIntegerField(default=0, verbose_name='Download Count')
     view_count = models.PositiveIntegerField(default=0, verbose_name='View Count')
     
@@ -467,6 +545,9 @@ class Article(models.Model):
         on_delete=models.SET_NULL,
         verbose_name='Article Template'
     )
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count')
+    # Moved by every save of the document or its sections (see Main.fragments)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     references = GenericRelation('Reference', content_type_field='cited_content_type', object_id_field='cited_object_id', related_query_name='articles')
     class Meta:
         verbose_name = 'Article'
@@ -478,7 +559,11 @@ class Article(models.Model):
 
     def get_authors_display(self):
         """Returns formatted string of authors"""
-        return ", ".join([author.full_name() for author in self.authors.all().order_by('articleauthorship__authorship_order')])
+        if 'articleauthorship_set' in getattr(self, '_prefetched_objects_cache', {}):
+            authors = [authorship.author for authorship in self.articleauthorship_set.all()]
+        else:
+            authors = self.authors.all().order_by('articleauthorship__authorship_order')
+        return ", ".join([author.full_name() for author in authors])
 
     def get_citation(self, style='apa'):
         """Generates citation in specified style"""
@@ -507,19 +592,9 @@ class Article(models.Model):
         return reverse('article_detail', kwargs={'slug': self.slug})
 
     def create_from_template(self, template_id):
-        """Create article sections from a template"""
-        template = ArticleTemplate.objects.get(id=template_id)
-        self.template = template
-        self.save()
-        
-        for section in template.sections.all().order_by('default_position'):
-            ArticleSection.objects.create(
-                article=self,
-                section_type=section.section_type,
-                title=section.title,
-                position=section.default_position,
-                guidance=section.description
-            )
+        """Create article sections from a template (one INSERT for all sections, see Main.instantiation)"""
+        from Main.instantiation import instantiate_template
+        instantiate_template([self], template_id)
 
 class ArticleAuthorship(models.Model):
     """
@@ -567,10 +642,13 @@ class ArticleAuthorship(models.Model):
         return f"{self.author.full_name()} in {self.article.title}"
 
 @reversion.register()
-class ArticleSection(models.Model):
+class ArticleSection(SectionWordCountMixin, models.Model):
     """
     Enhanced model for article sections with versioning
     """
+    word_count_parent = 'article'
+    word_count_containers = (('Article', 'pk'), ('Project', 'articles'))
+
     SECTION_TYPES = (
         # Common sections
         ('abstract', 'Abstract'),
@@ -621,6 +699,8 @@ class ArticleSection(models.Model):
         verbose_name='Section Title'
     )
     content = HTMLField(verbose_name='Content', blank=True)
+    # Sanitized rendition of content, written on save by Main.sanitize
+    clean_content = models.TextField(blank=True, editable=False, verbose_name='Clean Content')
     position = models.PositiveIntegerField(
         default=0,
         verbose_name='Position in Article'
@@ -643,9 +723,10 @@ class ArticleSection(models.Model):
         return f"{self.get_section_type_display()} - {self.article.title}"
 
     def save(self, *args, **kwargs):
-        # Calculate word count
-        if self.content:
-            self.word_count = len(re.sub(r'<[^>]+>', '', self.content).split())
+        # Calculate word count; the change is propagated to the containers
+        self.word_count = count_words(self.content)
+        # Sanitize once here so pages render clean_content without parsing
+        self.clean_content = sanitize_html(self.content)
         super().save(*args, **kwargs)
 
 class ArticleTemplate(models.Model):
@@ -681,6 +762,8 @@ class ArticleTemplate(models.Model):
         related_name='templates',
         verbose_name='Sections'
     )
+    # Moved by every change to the template's sections (see Main.instantiation)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
     class Meta:
         verbose_name = 'Article Template'
@@ -748,7 +831,7 @@ class ArticleTemplateSection(models.Model):
 
 # ## Research Project Models ##
 @reversion.register()
-class ResearchProject(models.Model):
+class ResearchProject(WordCountTotalMixin, models.Model):
     """
     Enhanced Research Project model
     """
@@ -814,6 +897,10 @@ class ResearchProject(models.Model):
         on_delete=models.SET_NULL,
         verbose_name='Project Template'
     )
+    citation_count = models.PositiveIntegerField(default=0, db_index=True, editable=False, verbose_name='Citation Count')
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count')
+    # Moved by every save of the document or its sections (see Main.fragments)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     references = GenericRelation('Reference', content_type_field='cited_content_type', object_id_field='cited_object_id', related_query_name='researchproject')
 
     def get_sections(self):
@@ -826,19 +913,9 @@ class ResearchProject(models.Model):
         return self.project.owner if self.project else None
 
     def create_from_template(self, template_id):
-        """Create project sections from a template"""
-        template = ResearchProjectTemplate.objects.get(id=template_id)
-        self.template = template
-        self.save()
-        
-        for section in template.sections.all().order_by('default_position'):
-            ResearchProjectSection.objects.create(
-                research_project=self,
-                section_type=section.section_type,
-                title=section.title,
-                position=section.default_position,
-                guidance=section.description
-            )
+        """Create project sections from a template (one INSERT for all sections, see Main.instantiation)"""
+        from Main.instantiation import instantiate_template
+        instantiate_template([self], template_id)
 
     class Meta:
         verbose_name = 'Research Project'
@@ -848,10 +925,13 @@ class ResearchProject(models.Model):
         return f"Research Project: {self.project.title}"
 
 @reversion.register()
-class ResearchProjectSection(models.Model):
+class ResearchProjectSection(SectionWordCountMixin, models.Model):
     """
     Enhanced Research Project Section model
     """
+    word_count_parent = 'research_project'
+    word_count_containers = (('ResearchProject', 'pk'), ('Project', 'researchproject'))
+
     SECTION_TYPES = (
         ('subject', 'Subject'),
         ('stimuli', 'Stimuli'),
@@ -879,6 +959,8 @@ class ResearchProjectSection(models.Model):
         verbose_name='Section Title'
     )
     content = HTMLField(verbose_name='Content', blank=True)
+    # Sanitized rendition of content, written on save by Main.sanitize
+    clean_content = models.TextField(blank=True, editable=False, verbose_name='Clean Content')
     position = models.PositiveIntegerField(
         default=0,
         verbose_name='Position in Project'
@@ -901,9 +983,10 @@ class ResearchProjectSection(models.Model):
         return f"{self.get_section_type_display()} - {self.research_project}"
 
     def save(self, *args, **kwargs):
-        # Calculate word count
-        if self.content:
-            self.word_count = len(re.sub(r'<[^>]+>', '', self.content).split())
+        # Calculate word count; the change is propagated to the containers
+        self.word_count = count_words(self.content)
+        # Sanitize once here so pages render clean_content without parsing
+        self.clean_content = sanitize_html(self.content)
         super().save(*args, **kwargs)
 
 class ResearchProjectTemplate(models.Model):
@@ -927,6 +1010,8 @@ class ResearchProjectTemplate(models.Model):
         related_name='templates',
         verbose_name='Sections'
     )
+    # Moved by every change to the template's sections (see Main.instantiation)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
     class Meta:
         verbose_name = 'Research Project Template'
@@ -987,7 +1072,7 @@ class ResearchProjectTemplateSection(models.Model):
 ## Book Models ##
 
 @reversion.register()
-class Book(models.Model):
+class Book(WordCountTotalMixin, models.Model):
     """
     Enhanced Book model with comprehensive publishing fields
     """
@@ -1037,6 +1122,10 @@ class Book(models.Model):
         blank=True,
         verbose_name='Copyright Year'
     )
+    citation_count = models.PositiveIntegerField(default=0, db_index=True, editable=False, verbose_name='Citation Count')
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count')
+    # Moved by every save of the document or its sections (see Main.fragments)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     references = GenericRelation('Reference', content_type_field='cited_content_type', object_id_field='cited_object_id', related_query_name='book')
     class Meta:
         verbose_name = 'Book'
@@ -1109,7 +1198,7 @@ class BookAuthorship(models.Model):
         return f"{self.author.full_name()} ({self.get_role_display()}) in {self.book.title}"
 
 @reversion.register()
-class BookChapter(models.Model):
+class BookChapter(WordCountTotalMixin, models.Model):
     """
     Enhanced Book Chapter model with versioning
     """
@@ -1133,7 +1222,15 @@ class BookChapter(models.Model):
     chapter_number = models.PositiveIntegerField(verbose_name='Chapter Number')
     title = models.CharField(max_length=200, verbose_name='Chapter Title')
     summary = models.TextField(blank=True, verbose_name='Chapter Summary')
-    word_count = models.PositiveIntegerField(default=0, verbose_name='Word Count')
+    # Total of the sections, kept by Main.wordcount
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count')
+    # Moved by every save of the document or its sections (see Main.fragments)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    # Next free figure and table numbers, kept by Main.numbering
+    next_figure_number = models.PositiveIntegerField(default=1, editable=False, verbose_name='Next Figure Number')
+    next_table_number = models.PositiveIntegerField(default=1, editable=False, verbose_name='Next Table Number')
+    # Columns only ever changed by F() updates, never written back by save()
+    delta_fields = ('word_count', 'next_figure_number', 'next_table_number')
     book_status = models.CharField(
         max_length=20,
         choices=(
@@ -1160,20 +1257,23 @@ class BookChapter(models.Model):
         book_title = self.book.title if self.book else self.translated_book.title
         return f"Chapter {self.chapter_number}: {self.title} ({book_title})"
 
-    def save(self, *args, **kwargs):
-        # Calculate word count from sections
-        if self.sections.exists():
-            self.word_count = sum(section.word_count for section in self.sections.all())
-        super().save(*args, **kwargs)
-
     def get_absolute_url(self):
         return reverse('chapter_detail', kwargs={'pk': self.pk})
 
 @reversion.register()
-class BookSection(models.Model):
+class BookSection(SectionWordCountMixin, models.Model):
     """
     Enhanced Book Section model with versioning
     """
+    word_count_parent = 'chapter'
+    word_count_containers = (
+        ('BookChapter', 'pk'),
+        ('Book', 'chapters'),
+        ('TranslatedBook', 'chapters'),
+        ('Project', 'books__chapters'),
+        ('Project', 'translatebooks__chapters'),
+    )
+
     SECTION_TYPES = (
         ('text', 'Text'),
         ('figure', 'Figure'),
@@ -1204,6 +1304,8 @@ class BookSection(models.Model):
         verbose_name='Section Title'
     )
     content = HTMLField(verbose_name='Content', blank=True)
+    # Sanitized rendition of content, written on save by Main.sanitize
+    clean_content = models.TextField(blank=True, editable=False, verbose_name='Clean Content')
     position = models.PositiveIntegerField(
         default=0,
         verbose_name='Position in Chapter'
@@ -1226,16 +1328,18 @@ class BookSection(models.Model):
         return f"{self.get_section_type_display()} - {self.chapter.title}"
 
     def save(self, *args, **kwargs):
-        # Calculate word count
-        if self.content:
-            self.word_count = len(re.sub(r'<[^>]+>', '', self.content).split())
+        # Calculate word count; the change is propagated to the containers
+        self.word_count = count_words(self.content)
+        # Sanitize once here so pages render clean_content without parsing
+        self.clean_content = sanitize_html(self.content)
         super().save(*args, **kwargs)
-        
-        # Update chapter word count
-        self.chapter.save()
+
+class BookItemQuerySet(NumberedQuerySet, models.QuerySet):
+    pass
+
 
 @reversion.register()
-class BookFigure(models.Model):
+class BookFigure(NumberedModelMixin, models.Model):
     """
     Enhanced Book Figure model with versioning
     """
@@ -1276,18 +1380,16 @@ class BookFigure(models.Model):
         verbose_name_plural = 'Book Figures'
         ordering = ['position']
 
+    number_field = 'figure_number'
+    counter_field = 'next_figure_number'
+    objects = BookItemQuerySet.as_manager()
+
     def __str__(self):
         return f"Figure {self.figure_number}: {self.title} ({self.chapter.title})"
 
-    def save(self, *args, **kwargs):
-        if not self.figure_number:
-            # Auto-assign figure number
-            last_figure = BookFigure.objects.filter(chapter=self.chapter).order_by('-figure_number').first()
-            self.figure_number = last_figure.figure_number + 1 if last_figure else 1
-        super().save(*args, **kwargs)
 
 @reversion.register()
-class BookTable(models.Model):
+class BookTable(NumberedModelMixin, models.Model):
     """
     Enhanced Book Table model with versioning
     """
@@ -1320,18 +1422,16 @@ class BookTable(models.Model):
         verbose_name_plural = 'Book Tables'
         ordering = ['position']
 
+    number_field = 'table_number'
+    counter_field = 'next_table_number'
+    objects = BookItemQuerySet.as_manager()
+
     def __str__(self):
         return f"Table {self.table_number}: {self.title} ({self.chapter.title})"
 
-    def save(self, *args, **kwargs):
-        if not self.table_number:
-            # Auto-assign table number
-            last_table = BookTable.objects.filter(chapter=self.chapter).order_by('-table_number').first()
-            self.table_number = last_table.table_number + 1 if last_table else 1
-        super().save(*args, **kwargs)
 
 @reversion.register()
-class TranslatedBook(models.Model):
+class TranslatedBook(WordCountTotalMixin, models.Model):
     """
     Enhanced Translated Book model
     """
@@ -1384,6 +1484,9 @@ class TranslatedBook(models.Model):
         default=0.0,
         verbose_name='Royalty Percentage'
     )
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count')
+    # Moved by every save of the document or its sections (see Main.fragments)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
 
     class Meta:
         verbose_name = 'Translated Book'
@@ -1454,7 +1557,7 @@ class TranslationAuthorship(models.Model):
 ## Research Proposal Models ##
 
 @reversion.register()
-class ResearchProposal(models.Model):
+class ResearchProposal(WordCountTotalMixin, models.Model):
     """
     Enhanced Research Proposal model
     """
@@ -1533,6 +1636,10 @@ class ResearchProposal(models.Model):
         on_delete=models.SET_NULL,
         verbose_name='Proposal Template'
     )
+    citation_count = models.PositiveIntegerField(default=0, db_index=True, editable=False, verbose_name='Citation Count')
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count')
+    # Moved by every save of the document or its sections (see Main.fragments)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     references = GenericRelation('Reference', content_type_field='cited_content_type', object_id_field='cited_object_id', related_query_name='researchproposal')
 
     def get_sections(self):
@@ -1540,19 +1647,9 @@ class ResearchProposal(models.Model):
         return self.sections.all().order_by('position')
 
     def create_from_template(self, template_id):
-        """Create proposal sections from a template"""
-        template = ResearchProposalTemplate.objects.get(id=template_id)
-        self.template = template
-        self.save()
-        
-        for section in template.sections.all().order_by('default_position'):
-            ResearchProposalSection.objects.create(
-                proposal=self,
-                section_type=section.section_type,
-                title=section.title,
-                position=section.default_position,
-                guidance=section.description
-            )
+        """Create proposal sections from a template (one INSERT for all sections, see Main.instantiation)"""
+        from Main.instantiation import instantiate_template
+        instantiate_template([self], template_id)
 
     class Meta:
         verbose_name = 'Research Proposal'
@@ -1562,10 +1659,13 @@ class ResearchProposal(models.Model):
         return f"Research Proposal: {self.title}"
 
 @reversion.register()
-class ResearchProposalSection(models.Model):
+class ResearchProposalSection(SectionWordCountMixin, models.Model):
     """
     Enhanced Research Proposal Section model
     """
+    word_count_parent = 'proposal'
+    word_count_containers = (('ResearchProposal', 'pk'), ('Project', 'researchproposal'))
+
     SECTION_TYPES = (
         ('title', 'Title Page'),
         ('abstract', 'Abstract'),
@@ -1604,6 +1704,8 @@ class ResearchProposalSection(models.Model):
         verbose_name='Section Title'
     )
     content = HTMLField(verbose_name='Content', blank=True)
+    # Sanitized rendition of content, written on save by Main.sanitize
+    clean_content = models.TextField(blank=True, editable=False, verbose_name='Clean Content')
     position = models.PositiveIntegerField(
         default=0,
         verbose_name='Position in Proposal'
@@ -1626,9 +1728,10 @@ class ResearchProposalSection(models.Model):
         return f"{self.get_section_type_display()} - {self.proposal.title}"
 
     def save(self, *args, **kwargs):
-        # Calculate word count
-        if self.content:
-            self.word_count = len(re.sub(r'<[^>]+>', '', self.content).split())
+        # Calculate word count; the change is propagated to the containers
+        self.word_count = count_words(self.content)
+        # Sanitize once here so pages render clean_content without parsing
+        self.clean_content = sanitize_html(self.content)
         super().save(*args, **kwargs)
 
 class ResearchProposalTemplate(models.Model):
@@ -1657,6 +1760,8 @@ class ResearchProposalTemplate(models.Model):
         related_name='templates',
         verbose_name='Sections'
     )
+    # Moved by every change to the template's sections (see Main.instantiation)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
     class Meta:
         verbose_name = 'Research Proposal Template'
@@ -1719,7 +1824,7 @@ class ResearchProposalTemplateSection(models.Model):
 
 
 @reversion.register()
-class Thesis(models.Model):
+class Thesis(WordCountTotalMixin, models.Model):
     """
     Enhanced Thesis model with comprehensive academic fields
     """
@@ -1783,6 +1888,10 @@ class Thesis(models.Model):
         on_delete=models.SET_NULL,
         verbose_name='Thesis Template'
     )
+    citation_count = models.PositiveIntegerField(default=0, db_index=True, editable=False, verbose_name='Citation Count')
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Word Count')
+    # Moved by every save of the document or its sections (see Main.fragments)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     references = GenericRelation('Reference', content_type_field='cited_content_type', object_id_field='cited_object_id', related_query_name='thesis')
     def get_sections(self):
         """Returns all sections ordered by their position"""
@@ -1793,19 +1902,9 @@ class Thesis(models.Model):
         return self.chapters.all().order_by('chapter_number')
 
     def create_from_template(self, template_id):
-        """Create thesis sections from a template"""
-        template = ThesisTemplate.objects.get(id=template_id)
-        self.template = template
-        self.save()
-        
-        for section in template.sections.all().order_by('default_position'):
-            ThesisSection.objects.create(
-                thesis=self,
-                section_type=section.section_type,
-                title=section.title,
-                position=section.default_position,
-                guidance=section.description
-            )
+        """Create thesis sections from a template (one INSERT for all sections, see Main.instantiation)"""
+        from Main.instantiation import instantiate_template
+        instantiate_template([self], template_id)
 
     class Meta:
         verbose_name = 'Thesis'
@@ -1815,10 +1914,13 @@ class Thesis(models.Model):
         return f"Thesis: {self.title}"
 
 @reversion.register()
-class ThesisSection(models.Model):
+class ThesisSection(SectionWordCountMixin, models.Model):
     """
     Enhanced Thesis Section model
     """
+    word_count_parent = 'thesis'
+    word_count_containers = (('Thesis', 'pk'), ('Project', 'thesis'))
+
     SECTION_TYPES = (
         ('approval', 'Approval Page'),
         ('dedication', 'Dedication'),
@@ -1857,6 +1959,8 @@ class ThesisSection(models.Model):
         verbose_name='Section Title'
     )
     content = HTMLField(verbose_name='Content', blank=True)
+    # Sanitized rendition of content, written on save by Main.sanitize
+    clean_content = models.TextField(blank=True, editable=False, verbose_name='Clean Content')
     position = models.PositiveIntegerField(
         default=0,
         verbose_name='Position in Thesis'
@@ -1879,9 +1983,10 @@ class ThesisSection(models.Model):
         return f"{self.get_section_type_display()} - {self.thesis.title}"
 
     def save(self, *args, **kwargs):
-        # Calculate word count
-        if self.content:
-            self.word_count = len(re.sub(r'<[^>]+>', '', self.content).split())
+        # Calculate word count; the change is propagated to the containers
+        self.word_count = count_words(self.content)
+        # Sanitize once here so pages render clean_content without parsing
+        self.clean_content = sanitize_html(self.content)
         super().save(*args, **kwargs)
 
 @reversion.register()
@@ -1919,12 +2024,6 @@ class ThesisChapter(models.Model):
     def __str__(self):
         return f"Chapter {self.chapter_number}: {self.title}"
 
-    def save(self, *args, **kwargs):
-        # Calculate word count from sections
-        if self.sections.exists():
-            self.word_count = sum(section.word_count for section in self.sections.all())
-        super().save(*args, **kwargs)
-
 class ThesisTemplate(models.Model):
     """
     Enhanced Thesis Template model
@@ -1949,6 +2048,8 @@ class ThesisTemplate(models.Model):
         related_name='templates',
         verbose_name='Sections'
     )
+    # Moved by every change to the template's sections (see Main.instantiation)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
     class Meta:
         verbose_name = 'Thesis Template'
@@ -2087,4 +2188,168 @@ class Reference(models.Model):
     citing_object_id = models.PositiveIntegerField()
     citing_object = GenericForeignKey('citing_content_type', 'citing_object_id')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
-    
\ No newline at end of file
+
+    class Meta:
+        # The unique constraint's index also serves lookups by citing object
+        indexes = [
+            models.Index(fields=['cited_content_type', 'cited_object_id'], name='reference_cited_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['citing_content_type', 'citing_object_id', 'cited_content_type', 'cited_object_id'],
+                name='unique_reference',
+            ),
+        ]
+
+    @staticmethod
+    def adjust_citation_counts(content_type_id, object_ids, delta):
+        """Adds delta to citation_count of the cited objects with one UPDATE"""
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None or not has_citation_count(model):
+            return
+        queryset = model._default_manager.filter(pk__in=object_ids)
+        if delta < 0:
+            # Never go below zero when the counter has drifted
+            queryset = queryset.filter(citation_count__gte=-delta)
+        queryset.update(citation_count=F('citation_count') + delta)
+
+
+def has_citation_count(model):
+    """Whether model keeps a materialized citation_count"""
+    return any(field.name == 'citation_count' for field in model._meta.concrete_fields)
+
+
+@receiver(post_save, sender=Reference)
+def increment_citation_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Reference.adjust_citation_counts(instance.cited_content_type_id, [instance.cited_object_id], 1)
+
+
+@receiver(post_delete, sender=Reference)
+def decrement_citation_count(sender, instance, **kwargs):
+    Reference.adjust_citation_counts(instance.cited_content_type_id, [instance.cited_object_id], -1)
+
+    
+## Job Queue Models ##
+class Job(models.Model):
+    """
+    Background job stored in the database and executed by the run_jobs command
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=50, verbose_name='Job Type')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Payload')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', verbose_name='Status')
+    result = models.JSONField(null=True, blank=True, verbose_name='Result')
+    error = models.TextField(blank=True, verbose_name='Error')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name='Max Attempts')
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Created By'
+    )
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Run After')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Started At')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Finished At')
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk}: {self.kind} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+## Crossref Models ##
+class CrossrefWork(models.Model):
+    """
+    Cached Crossref work record (or cached 404) for a normalized DOI
+    """
+    doi = models.CharField(max_length=255, unique=True, verbose_name='DOI')
+    status_code = models.PositiveSmallIntegerField(default=200, verbose_name='HTTP Status')
+    message = models.JSONField(null=True, blank=True, verbose_name='Work Record')
+    etag = models.CharField(max_length=255, blank=True, verbose_name='ETag')
+    fetched_at = models.DateTimeField(default=timezone.now, verbose_name='Fetched At')
+
+    class Meta:
+        verbose_name = 'Crossref Work'
+        verbose_name_plural = 'Crossref Works'
+
+    def __str__(self):
+        return f"{self.doi} ({self.status_code})"
+
+    @property
+    def is_found(self):
+        return self.status_code == 200
+
+## Translation Models ##
+class TranslationMemory(models.Model):
+    """
+    Cached translation of a single text chunk, keyed by normalized-text hash
+    """
+    text_hash = models.CharField(max_length=64, verbose_name='Text Hash')
+    source_lang = models.CharField(max_length=10, default='auto', verbose_name='Source Language')
+    target_lang = models.CharField(max_length=10, verbose_name='Target Language')
+    source_text = models.TextField(verbose_name='Source Text')
+    translation = models.TextField(verbose_name='Translation')
+    hit_count = models.PositiveIntegerField(default=0, verbose_name='Hit Count')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    last_used_at = models.DateTimeField(default=timezone.now, verbose_name='Last Used At')
+
+    class Meta:
+        verbose_name = 'Translation Memory'
+        verbose_name_plural = 'Translation Memories'
+        unique_together = ('text_hash', 'source_lang', 'target_lang')
+        indexes = [
+            models.Index(fields=['last_used_at'], name='translation_last_used_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source_lang}->{self.target_lang}: {self.source_text[:50]}"
+
+
+## Search Models ##
+class SearchDocument(models.Model):
+    """
+    Stripped text of a searchable object (a document or one of its sections).
+
+    The title and body columns carry a FULLTEXT index on MySQL and an FTS5
+    shadow table on SQLite (see Main.search); rows are kept up to date on save.
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    # The document (article, thesis, ...) a section belongs to, for links
+    document_type = models.CharField(max_length=100)
+    document_id = models.PositiveIntegerField()
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    title = models.CharField(max_length=500, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Search Document'
+        verbose_name_plural = 'Search Documents'
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return self.title or f'{self.document_type} {self.document_id}'
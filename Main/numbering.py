@@ -0,0 +1,114 @@
+"""
+Figure and table numbering within book chapters.
+
+Each chapter keeps the next free figure and table number in a counter
+column. Numbers are taken by incrementing the counter with an F() update
+inside a transaction, which row-locks the chapter, so concurrent uploads
+never get the same number, and a batch of figures costs one counter
+update per chapter instead of one MAX query per figure. Gaps left by
+deleted or moved figures are closed by renumber_chapters().
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+
+class NumberedModelMixin:
+    """
+    For chapter items numbered per chapter. number_field is the item's
+    number column and counter_field the chapter column holding the next
+    free number.
+    """
+    number_field = None
+    counter_field = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_number = (instance.__dict__.get(cls.number_field), instance.__dict__.get('chapter_id'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        number = getattr(self, self.number_field)
+        if not number:
+            setattr(self, self.number_field, allocate_numbers(type(self), self.chapter_id)[0])
+        elif (number, self.chapter_id) != getattr(self, '_stored_number', None):
+            # A new item or a changed number or chapter; plain edits skip the counter
+            reserve_number(type(self), self.chapter_id, number)
+        super().save(*args, **kwargs)
+        self._stored_number = (getattr(self, self.number_field), self.chapter_id)
+
+
+class NumberedQuerySet:
+    """QuerySet mixin numbering unnumbered items in bulk_create()"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # save() is skipped, so numbers are allocated here, one UPDATE per chapter
+        return super().bulk_create(assign_numbers(list(objs)), *args, **kwargs)
+
+
+def _chapters(model):
+    return model._meta.get_field('chapter').related_model._default_manager
+
+
+def allocate_numbers(model, chapter_id, count=1):
+    """Reserves count consecutive numbers of model in a chapter; returns them as a range"""
+    counter = model.counter_field
+    chapters = _chapters(model).filter(pk=chapter_id)
+    with transaction.atomic():
+        chapters.update(**{counter: F(counter) + count})
+        end = chapters.values_list(counter, flat=True).get()
+    return range(end - count, end)
+
+
+def reserve_number(model, chapter_id, number):
+    """Moves the chapter counter past an explicitly given number"""
+    counter = model.counter_field
+    _chapters(model).filter(pk=chapter_id, **{f'{counter}__lte': number}).update(**{counter: number + 1})
+
+
+def assign_numbers(items):
+    """
+    Numbers every item without a number, e.g. a batch of uploaded figures,
+    with one UPDATE per chapter. Returns the items.
+    """
+    pending = defaultdict(list)
+    for item in items:
+        if not getattr(item, item.number_field):
+            pending[item.chapter_id].append(item)
+    for chapter_id, chapter_items in pending.items():
+        model = type(chapter_items[0])
+        for item, number in zip(chapter_items, allocate_numbers(model, chapter_id, len(chapter_items))):
+            setattr(item, model.number_field, number)
+    return items
+
+
+def renumber_chapters(chapters, models):
+    """
+    Renumbers the items of models (e.g. BookFigure and BookTable) in each
+    of chapters from 1 in position order and resets the chapter counters,
+    with one bulk_update per model. Used after items are moved between or
+    deleted from chapters of a book.
+    """
+    with transaction.atomic():
+        chapters = list(chapters.select_for_update().order_by('chapter_number', 'pk'))
+        for model in models:
+            number, counter = model.number_field, model.counter_field
+            last = defaultdict(int)
+            changed = []
+            items = (
+                model._default_manager.filter(chapter__in=chapters)
+                .order_by('chapter_id', 'position', number, 'pk')
+                .only('pk', 'chapter', number)
+            )
+            for item in items:
+                last[item.chapter_id] += 1
+                if getattr(item, number) != last[item.chapter_id]:
+                    setattr(item, number, last[item.chapter_id])
+                    changed.append(item)
+            model._default_manager.bulk_update(changed, [number], batch_size=500)
+            for chapter in chapters:
+                setattr(chapter, counter, last[chapter.pk] + 1)
+        _chapters(models[0]).bulk_update(chapters, [model.counter_field for model in models], batch_size=500)
+    return chapters
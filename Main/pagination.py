@@ -0,0 +1,129 @@
+"""
+Keyset (cursor) pagination for list views.
+
+A page is the first rows after the last row of the previous page in a
+fixed, unique ordering (e.g. newest first by created_at then id), so page
+100 costs the same index range scan as page 1 and no COUNT is run. The
+cursor is the ordering values of that last row, base64-encoded. Totals are
+optional and capped: counting stops at count_limit rows.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, total=None, total_is_exact=True):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.total = total
+        self.total_is_exact = total_is_exact
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _fields(model, ordering):
+    return [(model._meta.get_field(name.lstrip('-')), name.startswith('-')) for name in ordering]
+
+
+def encode_cursor(obj, ordering):
+    values = [field.value_to_string(obj) for field, _ in _fields(type(obj), ordering)]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """The ordering values stored in cursor; raises InvalidCursor"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        fields = _fields(model, ordering)
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise InvalidCursor(cursor)
+        return [field.to_python(value) for (field, _), value in zip(fields, values)]
+    except (binascii.Error, UnicodeDecodeError, ValueError, ValidationError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def _after(model, ordering, values):
+    """Q for the rows after values: (a, b) > (va, vb) spelled out for mixed directions"""
+    condition = Q()
+    equal = {}
+    for (field, descending), value in zip(_fields(model, ordering), values):
+        condition |= Q(**equal, **{f'{field.attname}__{"lt" if descending else "gt"}': value})
+        equal[field.attname] = value
+    return condition
+
+
+def paginate_by_cursor(queryset, ordering, cursor=None, per_page=20, count_limit=None):
+    """
+    Returns the CursorPage of queryset after cursor. ordering must end with
+    a unique field (e.g. '-created_at', '-id'). With count_limit, the page
+    also carries the total number of rows, counted up to count_limit.
+    """
+    queryset = queryset.order_by(*ordering)
+    total, total_is_exact = None, True
+    if count_limit:
+        total = queryset.order_by()[:count_limit + 1].count()
+        total_is_exact = total <= count_limit
+        total = min(total, count_limit)
+    if cursor:
+        queryset = queryset.filter(_after(queryset.model, ordering, decode_cursor(cursor, queryset.model, ordering)))
+    rows = list(queryset[:per_page + 1])
+    next_cursor = encode_cursor(rows[per_page - 1], ordering) if len(rows) > per_page else None
+    return CursorPage(rows[:per_page], next_cursor, total, total_is_exact)
+
+
+class CursorPaginationMixin:
+    """
+    ListView mixin replacing offset pagination with cursor pagination (the
+    ?cursor= parameter). With ?format=json the page is returned as JSON
+    built from json_fields.
+    """
+    cursor_ordering = ('-created_at', '-id')
+    cursor_param = 'cursor'
+    cursor_count_limit = None
+    paginate_by = 20
+    json_fields = ('id',)
+
+    def paginate_queryset(self, queryset, page_size):
+        try:
+            page = paginate_by_cursor(
+                queryset,
+                self.cursor_ordering,
+                cursor=self.request.GET.get(self.cursor_param),
+                per_page=page_size,
+                count_limit=self.cursor_count_limit,
+            )
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return None, page, page.object_list, page.has_next() or self.cursor_param in self.request.GET
+
+    def get_json_item(self, obj):
+        return {field: getattr(obj, field) for field in self.json_fields}
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') != 'json':
+            return super().render_to_response(context, **response_kwargs)
+        page = context['page_obj']
+        data = {
+            'results': [self.get_json_item(obj) for obj in page.object_list],
+            'next_cursor': page.next_cursor,
+        }
+        if page.total is not None:
+            data['total'] = page.total
+            data['total_is_exact'] = page.total_is_exact
+        return JsonResponse(data)
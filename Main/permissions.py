@@ -0,0 +1,58 @@
+"""
+Project permission checks without per-object queries.
+
+Ownership is a column on the project, so only collaboration needs the
+database: the ids of the projects a user is a member of are read from
+ProjectMembership (kept in sync by Main.membership) with one query and
+memoized on the user object, which is request.user for the length of a
+request. can_view()/can_edit() on any number of projects are then set
+lookups.
+
+Nothing is cached across requests: a per-process cache would keep
+granting access on the other workers after a collaborator is removed.
+"""
+from django.apps import apps
+
+
+class ProjectAccess:
+    """Answers can_view/can_edit of one user for any number of projects"""
+
+    def __init__(self, user, member_ids=frozenset()):
+        self.user = user
+        self.member_ids = member_ids
+
+    def is_member(self, project):
+        return project.owner_id == self.user.pk or project.pk in self.member_ids
+
+    def can_view(self, project):
+        if project.is_public:
+            return True
+        if not self.user.is_authenticated:
+            return False
+        return self.is_member(project)
+
+    def can_edit(self, project):
+        if not self.user.is_authenticated:
+            return False
+        return project.owner_id == self.user.pk or self.user.has_perm('projects.change_project')
+
+    def viewable(self, projects):
+        """The projects of an iterable the user may view"""
+        return [project for project in projects if self.can_view(project)]
+
+
+def _load_member_ids(user):
+    memberships = apps.get_model('Main', 'ProjectMembership').objects.filter(user_id=user.pk)
+    return frozenset(memberships.values_list('project_id', flat=True))
+
+
+def project_access(user):
+    """The user's ProjectAccess, loaded at most once per user object"""
+    access = getattr(user, '_project_access', None)
+    if access is None:
+        if user.is_authenticated:
+            access = ProjectAccess(user, _load_member_ids(user))
+        else:
+            access = ProjectAccess(user)
+        user._project_access = access
+    return access
@@ -0,0 +1,62 @@
+"""
+List projections: the columns a list actually needs.
+
+Lists (list views, the dashboard, admin changelists, select widgets) show
+titles, types and dates, never section content, descriptions, abstracts
+or guidance. list_projection() defers every text and JSON column of a
+model, which covers every HTMLField, except those declared in
+LIST_KEPT_FIELDS because __str__ uses them.
+"""
+from django.db import models
+
+
+HEAVY_FIELD_TYPES = (models.TextField, models.JSONField)
+
+# Model name -> text fields a list still needs (used by __str__)
+LIST_KEPT_FIELDS = {
+    'Notification': ('message',),
+    'TranslationMemory': ('source_text',),
+}
+
+
+def heavy_fields(model, keep=()):
+    """Names of the text and JSON columns of model a list can do without"""
+    keep = set(keep) | set(LIST_KEPT_FIELDS.get(model.__name__, ()))
+    return [
+        field.name for field in model._meta.concrete_fields
+        if isinstance(field, HEAVY_FIELD_TYPES) and field.name not in keep
+    ]
+
+
+def list_projection(queryset, keep=(), related=()):
+    """
+    queryset without the heavy columns of its model, nor of the
+    select_related relations named in related. keep names fields still
+    needed, e.g. a TextField in list_display.
+    """
+    deferred = heavy_fields(queryset.model, keep)
+    for path in related:
+        model = queryset.model
+        for name in path.split('__'):
+            model = model._meta.get_field(name).related_model
+        deferred += [f'{path}__{name}' for name in heavy_fields(model)]
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+class ListProjectionMixin:
+    """ListView mixin applying list_projection() to get_queryset()"""
+    list_kept_fields = ()
+    list_related = ()
+
+    def get_queryset(self):
+        return list_projection(super().get_queryset(), self.list_kept_fields, self.list_related)
+
+
+class ListProjectionFormMixin:
+    """ModelForm mixin applying list_projection() to every model select"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            if hasattr(field, 'queryset'):
+                field.queryset = list_projection(field.queryset)
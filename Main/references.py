@@ -0,0 +1,80 @@
+"""
+Bulk loading of the objects on either side of References.
+
+Reference points at its cited and citing objects through GenericForeignKeys,
+so touching ref.cited_object in a loop costs one query per reference. Here
+references are grouped by content type and each type's objects are fetched
+with a single in_bulk, together with their sections (and, for articles,
+their authors) in one more query per relation.
+"""
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Prefetch
+
+from Main.models import Article, ArticleAuthorship
+
+
+def _prefetches(model, with_sections):
+    lookups = []
+    if with_sections and hasattr(model, 'get_sections'):
+        section_model = model._meta.get_field('sections').related_model
+        lookups.append(Prefetch('sections', queryset=section_model.objects.order_by('position')))
+    if model is Article:
+        lookups.append(Prefetch(
+            'articleauthorship_set',
+            queryset=ArticleAuthorship.objects.select_related('author').order_by('authorship_order'),
+        ))
+    return lookups
+
+
+def resolve_objects(pairs, with_sections=False):
+    """
+    Returns {(content_type_id, object_id): object} for (content_type_id, object_id)
+    pairs, with one in_bulk per content type. Missing objects are left out.
+    """
+    ids_by_type = defaultdict(set)
+    for content_type_id, object_id in pairs:
+        ids_by_type[content_type_id].add(object_id)
+
+    objects = {}
+    for content_type_id, ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        queryset = model._default_manager.prefetch_related(*_prefetches(model, with_sections))
+        for pk, obj in queryset.in_bulk(ids).items():
+            objects[(content_type_id, pk)] = obj
+    return objects
+
+
+def load_references(references, side, with_sections=False):
+    """
+    Returns one dict per reference describing the object on the given side
+    ('cited' or 'citing'): id, object, type, created_at and, when
+    with_sections is set, the object's sections ordered by position.
+    References whose object no longer exists are skipped.
+    """
+    references = list(references)
+    type_field = f'{side}_content_type_id'
+    id_field = f'{side}_object_id'
+    objects = resolve_objects(
+        [(getattr(ref, type_field), getattr(ref, id_field)) for ref in references],
+        with_sections=with_sections,
+    )
+
+    loaded = []
+    for ref in references:
+        obj = objects.get((getattr(ref, type_field), getattr(ref, id_field)))
+        if obj is None:
+            continue
+        item = {
+            'id': ref.id,
+            'object': obj,
+            'type': obj._meta.verbose_name,
+            'created_at': ref.created_at,
+        }
+        if with_sections:
+            item['sections'] = list(obj.sections.all()) if hasattr(obj, 'get_sections') else []
+        loaded.append(item)
+    return loaded
@@ -0,0 +1,163 @@
+"""
+Allowlist HTML sanitizing for TinyMCE content.
+
+Section content is parsed once with lxml when it is saved: malformed
+markup is repaired by the parser, script-like elements are removed with
+their content, unknown tags are unwrapped (their text is kept), and only
+allowlisted attributes, URL schemes and inline styles survive. The result
+is stored next to the source (clean_content) so pages render it without
+parsing anything. sanitize_html() is idempotent, so re-running the
+backfill over clean rows changes nothing.
+"""
+import html
+import re
+
+from lxml import etree
+from lxml import html as lxml_html
+
+from Main.fragments import touch_section_parents
+
+
+ALLOWED_TAGS = frozenset({
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'cite', 'code', 'col', 'colgroup', 'dd', 'del',
+    'div', 'dl', 'dt', 'em', 'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i',
+    'img', 'ins', 'li', 'mark', 'ol', 'p', 'pre', 'q', 's', 'small', 'span', 'strike', 'strong', 'sub',
+    'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+})
+
+# Removed together with their content
+DROPPED_TAGS = frozenset({
+    'button', 'embed', 'form', 'frame', 'frameset', 'head', 'iframe', 'input', 'link', 'math', 'meta',
+    'noscript', 'object', 'script', 'select', 'style', 'svg', 'template', 'textarea', 'title',
+})
+
+ALLOWED_ATTRIBUTES = {
+    '*': frozenset({'dir', 'lang', 'style', 'title'}),
+    'a': frozenset({'href', 'target'}),
+    'img': frozenset({'alt', 'height', 'src', 'width'}),
+    'ol': frozenset({'start', 'type'}),
+    'td': frozenset({'colspan', 'rowspan'}),
+    'th': frozenset({'colspan', 'rowspan', 'scope'}),
+    'col': frozenset({'span'}),
+    'colgroup': frozenset({'span'}),
+}
+
+URL_ATTRIBUTES = frozenset({'href', 'src'})
+ALLOWED_SCHEMES = frozenset({'http', 'https', 'mailto'})
+
+# Inline styles TinyMCE writes for alignment, direction and emphasis
+ALLOWED_STYLES = frozenset({
+    'background-color', 'color', 'direction', 'font-style', 'font-weight', 'margin-left', 'padding-left',
+    'text-align', 'text-decoration', 'vertical-align',
+})
+
+_PARSER = lxml_html.HTMLParser(remove_comments=True, remove_pis=True)
+# lxml refuses a str starting with an encoding declaration
+_XML_DECLARATION_RE = re.compile(r'^<\?xml[^>]*\?>', re.IGNORECASE)
+_SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.\-]*):')
+_UNSAFE_STYLE_RE = re.compile(r'url\s*\(|expression\s*\(|[\\<>]', re.IGNORECASE)
+_CONTROL_RE = re.compile(r'[\x00-\x20\x7f]+')
+
+
+def _safe_url(url, tag):
+    match = _SCHEME_RE.match(_CONTROL_RE.sub('', url).lower())
+    if match is None:
+        return True
+    if tag == 'img' and url.strip().lower().startswith('data:image/'):
+        # Images pasted into TinyMCE
+        return True
+    return match.group(1) in ALLOWED_SCHEMES
+
+
+def _clean_style(style):
+    declarations = []
+    for declaration in style.split(';'):
+        name, _, value = declaration.partition(':')
+        name, value = name.strip().lower(), value.strip()
+        if name in ALLOWED_STYLES and value and not _UNSAFE_STYLE_RE.search(value):
+            declarations.append(f'{name}: {value}')
+    return '; '.join(declarations)
+
+
+def _clean_attributes(element, tag):
+    allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, frozenset())
+    for name in list(element.attrib):
+        value = element.attrib[name]
+        if name == 'style':
+            value = _clean_style(value)
+        if name not in allowed or not value or (name in URL_ATTRIBUTES and not _safe_url(value, tag)):
+            del element.attrib[name]
+        else:
+            element.attrib[name] = value
+    if tag == 'a' and element.get('target'):
+        element.set('target', '_blank')
+        element.set('rel', 'noopener noreferrer')
+
+
+def _clean(parent):
+    for element in list(parent):
+        if not isinstance(element.tag, str):
+            element.drop_tree()
+            continue
+        tag = element.tag.lower()
+        if tag in DROPPED_TAGS:
+            element.drop_tree()
+            continue
+        _clean(element)
+        if tag in ALLOWED_TAGS:
+            _clean_attributes(element, tag)
+        else:
+            element.drop_tag()
+
+
+def sanitize_html(content):
+    """The allowlisted, well-formed rendition of an HTML fragment"""
+    if not content or not content.strip():
+        return ''
+    try:
+        document = lxml_html.document_fromstring(_XML_DECLARATION_RE.sub('', content), parser=_PARSER)
+    except etree.ParserError:
+        # Nothing but comments or processing instructions
+        return ''
+    body = document.find('body')
+    if body is None:
+        return ''
+    _clean(body)
+    parts = [html.escape(body.text or '', quote=False)]
+    parts += [lxml_html.tostring(element, encoding='unicode') for element in body]
+    return ''.join(parts).strip()
+
+
+def sanitize_sections(model, batch_size=500, touch_parents=True):
+    """
+    Stores clean_content of every section of model, in chunks of batch_size
+    rows ordered by pk. With touch_parents, updated_at of the documents whose
+    sections changed is moved so their cached fragments are re-rendered
+    (migrations, whose historical models have no updated_at yet, skip it).
+    Returns the number of rows that changed.
+    """
+    fields = ['pk', 'content', 'clean_content']
+    if touch_parents:
+        fields.append(model.word_count_parent)
+    changed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            model._default_manager.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only(*fields)[:batch_size]
+        )
+        if not batch:
+            return changed
+        last_pk = batch[-1].pk
+        stale = []
+        for section in batch:
+            clean = sanitize_html(section.content)
+            if section.clean_content != clean:
+                section.clean_content = clean
+                stale.append(section)
+        # bulk_update skips save(); word counts and the search index use the source
+        model._default_manager.bulk_update(stale, ['clean_content'])
+        if touch_parents:
+            touch_section_parents(model, stale)
+        changed += len(stale)
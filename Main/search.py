@@ -0,0 +1,259 @@
+"""
+Full-text search over documents and their sections.
+
+Every searchable object has one SearchDocument row holding its title and
+its HTML-stripped text, both normalized by Main.text so that Arabic and
+Persian spellings of a word match each other. MySQL searches the row
+through a FULLTEXT index and SQLite through an FTS5 table kept in sync by
+triggers (both created in migration 0009); other backends fall back to
+icontains. Rows are written on post_save and removed on post_delete, so
+the index never needs a full rebuild except after bulk writes (see the
+rebuild_search_index command).
+"""
+import html
+import re
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.urls import NoReverseMatch, reverse
+
+from Main.models import (
+    Article, ArticleSection, Book, BookSection, Project, ResearchProject,
+    ResearchProjectSection, ResearchProposal, ResearchProposalSection,
+    SearchDocument, Thesis, TranslatedBook, ThesisSection,
+)
+from Main.extraction import extract
+from Main.text import normalize, tokenize
+
+
+# Searchable model -> path from an instance to the document it belongs to;
+# a tuple lists alternative paths, the first one set wins
+SEARCHABLE_MODELS = {
+    Article: '',
+    Book: '',
+    TranslatedBook: '',
+    ResearchProject: '',
+    ResearchProposal: '',
+    Thesis: '',
+    ArticleSection: 'article',
+    BookSection: ('chapter__book', 'chapter__translated_book'),
+    ResearchProjectSection: 'research_project',
+    ResearchProposalSection: 'proposal',
+    ThesisSection: 'thesis',
+}
+
+# Detail page of each document type
+DOCUMENT_URLS = {
+    'article': 'article_detail',
+    'book': 'book_detail',
+    'translatedbook': 'translated_book_detail',
+    'researchproject': 'research_project_detail',
+    'researchproposal': 'research_proposal_detail',
+    'thesis': 'thesis_detail',
+}
+
+MAX_TERMS = 10
+SNIPPET_LENGTH = 200
+
+
+def _paths(model):
+    paths = SEARCHABLE_MODELS[model]
+    return (paths,) if isinstance(paths, str) else paths
+
+
+def _document(instance):
+    for path in _paths(type(instance)):
+        document = instance
+        for name in filter(None, path.split('__')):
+            document = getattr(document, name)
+        if document is not None:
+            return document
+    return None
+
+
+def build_search_document(instance):
+    """Returns the unsaved SearchDocument row of instance, None if it belongs to no document"""
+    document = _document(instance)
+    if document is None:
+        # e.g. a book section whose chapter has neither a book nor a translated book
+        return None
+    if document is instance:
+        title = instance.title
+        body = ''
+    else:
+        title = instance.title or instance.get_section_type_display()
+        body = extract(instance.content).text
+    return SearchDocument(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=instance.pk,
+        document_type=document._meta.model_name,
+        document_id=document.pk,
+        project_id=document.project_id,
+        title=normalize(title)[:500],
+        body=body,
+    )
+
+
+def index_documents(rows):
+    """Upserts SearchDocument rows in one statement"""
+    SearchDocument.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['content_type', 'object_id'],
+        update_fields=['document_type', 'document_id', 'project', 'title', 'body', 'updated_at'],
+    )
+
+
+def index_queryset(queryset, batch_size=500):
+    """Indexes every object of queryset in batches; returns the number indexed"""
+    paths = [path for path in _paths(queryset.model) if path]
+    if paths:
+        queryset = queryset.select_related(*paths)
+    batch = []
+    indexed = 0
+    for instance in queryset.iterator(chunk_size=batch_size):
+        row = build_search_document(instance)
+        if row is None:
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            index_documents(batch)
+            indexed += len(batch)
+            batch = []
+    if batch:
+        index_documents(batch)
+        indexed += len(batch)
+    return indexed
+
+
+def _index_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    row = build_search_document(instance)
+    if row is None:
+        _unindex_on_delete(sender, instance)
+    else:
+        index_documents([row])
+
+
+def _unindex_on_delete(sender, instance, **kwargs):
+    SearchDocument.objects.filter(
+        content_type=ContentType.objects.get_for_model(sender),
+        object_id=instance.pk,
+    ).delete()
+
+
+for _model in SEARCHABLE_MODELS:
+    post_save.connect(_index_on_save, sender=_model, dispatch_uid=f'search_index_{_model.__name__}')
+    post_delete.connect(_unindex_on_delete, sender=_model, dispatch_uid=f'search_unindex_{_model.__name__}')
+
+
+def query_terms(query):
+    """Splits a user query into at most MAX_TERMS normalized words"""
+    return tokenize(query)[:MAX_TERMS]
+
+
+def _match(queryset, terms):
+    """Filters queryset to rows matching any term and annotates a relevance score"""
+    table = connection.ops.quote_name(SearchDocument._meta.db_table)
+    if connection.vendor == 'mysql':
+        score = RawSQL(
+            f'MATCH ({table}.`title`, {table}.`body`) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+            [' '.join(terms)],
+        )
+        return queryset.annotate(score=score).filter(score__gt=0)
+
+    if connection.vendor == 'sqlite':
+        fts = connection.ops.quote_name(f'{SearchDocument._meta.db_table}_fts')
+        expression = ' OR '.join('"%s"' % term.replace('"', '""') for term in terms)
+        # bm25 is lower for better matches; titles weigh five times the body
+        score = RawSQL(
+            f'(SELECT -bm25({fts}, 5.0, 1.0) FROM {fts} WHERE {fts} MATCH %s AND {fts}.rowid = {table}."id")',
+            [expression],
+        )
+        matching = RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [expression])
+        return queryset.filter(id__in=matching).annotate(score=score)
+
+    condition = Q()
+    for term in terms:
+        condition |= Q(title__icontains=term) | Q(body__icontains=term)
+    return queryset.filter(condition).annotate(score=Value(1.0))
+
+
+def visible_documents(user):
+    """SearchDocuments of projects user may view, plus those outside any project"""
+    projects = Project.objects.visible_to(user)
+    return SearchDocument.objects.filter(Q(project__isnull=True) | Q(project__in=projects.values('pk')))
+
+
+def highlight(text, terms, length=SNIPPET_LENGTH):
+    """
+    Returns an HTML-escaped excerpt of text around the first matched term,
+    with every match wrapped in <mark>.
+    """
+    if not text:
+        return ''
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - length // 4) if first else 0
+    excerpt = text[start:start + length]
+
+    parts = []
+    position = 0
+    for match in pattern.finditer(excerpt):
+        parts.append(html.escape(excerpt[position:match.start()]))
+        parts.append(f'<mark>{html.escape(match.group())}</mark>')
+        position = match.end()
+    parts.append(html.escape(excerpt[position:]))
+
+    snippet = ''.join(parts)
+    if start > 0:
+        snippet = '…' + snippet
+    if start + length < len(text):
+        snippet += '…'
+    return snippet
+
+
+def _document_url(document_type, document_id):
+    try:
+        return reverse(DOCUMENT_URLS[document_type], kwargs={'pk': document_id})
+    except (KeyError, NoReverseMatch):
+        return None
+
+
+def search(query, user, limit=20):
+    """Returns ranked, highlighted results for query that user may see"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    rows = (
+        _match(visible_documents(user), terms)
+        .select_related('content_type')
+        .order_by('-score', '-updated_at')[:limit]
+    )
+    return [
+        {
+            'title': row.title,
+            'title_html': highlight(row.title, terms),
+            'snippet': highlight(row.body, terms),
+            'type': row.content_type.name,
+            'document_type': row.document_type,
+            'document_id': row.document_id,
+            'url': _document_url(row.document_type, row.document_id),
+            'score': round(float(row.score or 0), 4),
+        }
+        for row in rows
+    ]
+
+
+def matching_object_ids(model, query):
+    """Subquery of the ids of model instances matching query, for admin searches"""
+    terms = query_terms(query)
+    documents = SearchDocument.objects.filter(content_type=ContentType.objects.get_for_model(model))
+    if not terms:
+        return documents.none().values('object_id')
+    return _match(documents, terms).values('object_id')
@@ -0,0 +1,92 @@
+"""
+Unique slug allocation.
+
+The next free 'base-N' suffix is computed by the database in one query:
+a prefix range of the unique (hence indexed) slug column, reduced to the
+highest N with MAX(), instead of probing base-1, base-2, ... one query at
+a time or reading every slug sharing the prefix. Two concurrent saves can
+still pick the same slug; save_with_slug() retries on the IntegrityError
+the unique index raises.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Case, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Cast, Substr
+from django.utils.text import slugify
+
+
+SLUG_ATTEMPTS = 5
+
+
+def slug_base(text, max_length, fallback):
+    """slugify(text) cut to leave room for a '-N' suffix; fallback when empty"""
+    return (slugify(text) or fallback)[:max_length - 8].strip('-') or fallback
+
+
+def _next_suffixes(model, field, bases):
+    """{base: next free suffix (0 = the bare base)}, with one aggregate query"""
+    bases = list(bases)
+    condition = Q()
+    for base in bases:
+        condition |= Q(**{f'{field}__startswith': base})
+    # slugify() output has no regex metacharacters, so bases need no escaping
+    highest = model._default_manager.filter(condition).aggregate(**{
+        f'suffix_{i}': Max(Case(
+            When(**{field: base}, then=Value(0)),
+            When(
+                **{f'{field}__regex': f'^{base}-[0-9]+$'},
+                then=Cast(Substr(field, len(base) + 2), IntegerField()),
+            ),
+            output_field=IntegerField(),
+        ))
+        for i, base in enumerate(bases)
+    })
+    return {
+        base: 0 if highest[f'suffix_{i}'] is None else highest[f'suffix_{i}'] + 1
+        for i, base in enumerate(bases)
+    }
+
+
+def _slug(base, suffix):
+    return f'{base}-{suffix}' if suffix else base
+
+
+def allocate_slug(model, base, field='slug'):
+    """Returns the first free slug for base with a single query"""
+    return _slug(base, _next_suffixes(model, field, [base])[base])
+
+
+def assign_slugs(instances, source='title', field='slug', fallback=None):
+    """
+    Gives every instance without a slug a unique one, with one query for the
+    whole batch, e.g. before bulk_create(). Returns the instances.
+    """
+    pending = [instance for instance in instances if not getattr(instance, field)]
+    if not pending:
+        return instances
+    model = type(pending[0])
+    max_length = model._meta.get_field(field).max_length
+    fallback = fallback or model._meta.model_name
+    bases = [slug_base(getattr(instance, source), max_length, fallback) for instance in pending]
+    suffixes = _next_suffixes(model, field, set(bases))
+    for instance, base in zip(pending, bases):
+        setattr(instance, field, _slug(base, suffixes[base]))
+        suffixes[base] += 1
+    return instances
+
+
+def save_with_slug(instance, save, source='title', field='slug', fallback=None):
+    """
+    Allocates a slug and calls save(), retrying with a fresh slug when a
+    concurrent insert took it first.
+    """
+    for attempt in range(SLUG_ATTEMPTS):
+        assign_slugs([instance], source=source, field=field, fallback=fallback)
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            slug = getattr(instance, field)
+            taken = type(instance)._default_manager.filter(**{field: slug}).exists()
+            if not taken or attempt == SLUG_ATTEMPTS - 1:
+                raise
+            setattr(instance, field, '')
@@ -1,3 +1,1455 @@
-from django.test import TestCase
+import json
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from tinymce.models import HTMLField
+
+from Main.models import (
+    Article, ArticleAuthorship, ArticleSection, Author, Book, BookChapter, BookFigure, BookSection, BookTable,
+    CrossrefWork, Job, Project, ProjectMembership, Reference,
+    ResearchProject, ResearchProjectSection, ResearchProposal, SearchDocument, Thesis, ThesisSection,
+    ThesisTemplate, ThesisTemplateSection, TranslatedBook, TranslationMemory,
+)
+from Main import crossref, jobs, slugs
+from Main.authors import find_author, resolve_authors, search_authors
+from Main.crossref import fetch_works, import_dois
+from Main.fragments import fragment_key
+from Main.instantiation import instantiate_template
+from Main.numbering import renumber_chapters
+from Main.pagination import paginate_by_cursor
+from Main.permissions import project_access
+from Main.sanitize import sanitize_html
+from Main.search import build_search_document, search
+from Main.extraction import extract
+from Main.text import fold, normalize, tokenize
+from Main.translation import Chunk, TokenBucket, TranslationCache, split_into_chunks, translate_chunks, translation_cache
+from Main.views import ProjectListView, ResearchProjectDetailView
+
+
+User = get_user_model()
+
+
+class TranslationCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache = TranslationCache(ttl=3600, max_entries=1, lru_size=10, prune_interval=1000, hit_flush_interval=3600)
+
+    def test_lru_hits_are_recorded_and_keep_rows_alive(self):
+        self.cache.set_many([('hot', 'داغ')], 'en', 'fa')
+        self.cache.set_many([('cold', 'سرد')], 'en', 'fa')
+        for _ in range(3):
+            self.assertEqual(self.cache.get_many(['hot'], 'en', 'fa'), {0: 'داغ'})
+        # Served by the LRU, counted in memory until the next flush
+        self.assertEqual(TranslationMemory.objects.get(source_text='hot').hit_count, 0)
+
+        self.cache.prune()
+        self.assertEqual(list(TranslationMemory.objects.values_list('source_text', 'hit_count')), [('hot', 3)])
+
+    def test_expired_rows_are_neither_served_nor_kept(self):
+        self.cache.set_many([('old', 'کهنه')], 'en', 'fa')
+        TranslationMemory.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        self.cache.clear_local()
+        self.assertEqual(self.cache.get_many(['old'], 'en', 'fa'), {})
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertFalse(TranslationMemory.objects.exists())
+
+    @mock.patch('Main.views.GoogleTranslator')
+    def test_translate_text_serves_repeats_from_the_table(self, translator):
+        translator.return_value.translate.side_effect = lambda chunk: f'[{chunk}]'
+        translation_cache.clear_local()
+        text = 'First sentence.\n\nSecond sentence.'
+
+        response = self.client.post(reverse('translate_text'), {'text': text, 'target_lang': 'fa'})
+        self.assertEqual(response.json()['translation'], '[First sentence.]\n\n[Second sentence.]')
+        self.assertEqual([chunk['cache'] for chunk in response.json()['cache']], ['miss', 'miss'])
+
+        # Another process: nothing in its LRU, every chunk found in the table
+        translation_cache.clear_local()
+        response = self.client.post(reverse('translate_text'), {'text': text, 'target_lang': 'fa'})
+        self.assertEqual(response.json()['translation'], '[First sentence.]\n\n[Second sentence.]')
+        self.assertEqual([chunk['cache'] for chunk in response.json()['cache']], ['hit', 'hit'])
+        self.assertEqual(translator.return_value.translate.call_count, 2)
+        self.assertEqual(sorted(TranslationMemory.objects.values_list('hit_count', flat=True)), [1, 1])
+
+
+class ConcurrentTranslationTests(TestCase):
+
+    def setUp(self):
+        translation_cache.clear_local()
+
+    def test_token_bucket_paces_calls_after_the_burst(self):
+        bucket = TokenBucket(rate=20, capacity=2)
+        started = time.perf_counter()
+        bucket.acquire()
+        bucket.acquire()
+        self.assertLess(time.perf_counter() - started, 0.05)
+        for _ in range(4):
+            bucket.acquire()
+        # Four more tokens at 20 per second
+        self.assertGreaterEqual(time.perf_counter() - started, 0.18)
+
+    @mock.patch('Main.translation.provider_bucket', TokenBucket(rate=1000, capacity=100))
+    def test_results_come_back_in_chunk_order(self):
+        delays = {'one': 0.06, 'two': 0.03, 'three': 0}
+        calls = []
+        finished = []
+
+        def translate_chunk(chunk):
+            calls.append(chunk)
+            time.sleep(delays[chunk])
+            finished.append(chunk)
+            return chunk.upper()
+
+        results = translate_chunks(['one', 'two', 'three', 'one'], 'fa', translate_chunk, source='en')
+        self.assertEqual([result['translation'] for result in results], ['ONE', 'TWO', 'THREE', 'ONE'])
+        self.assertEqual([result['cache'] for result in results], ['miss'] * 4)
+        # Distinct misses only, translated concurrently: the first chunk finished last
+        self.assertEqual(sorted(calls), ['one', 'three', 'two'])
+        self.assertEqual(finished, ['three', 'two', 'one'])
+
+        results = translate_chunks(['two', 'one'], 'fa', translate_chunk, source='en')
+        self.assertEqual([(result['translation'], result['cache']) for result in results], [('TWO', 'hit'), ('ONE', 'hit')])
+        self.assertEqual(len(calls), 3)
+
+    @mock.patch('Main.translation.provider_bucket', TokenBucket(rate=1000, capacity=100))
+    def test_a_failed_chunk_does_not_discard_the_others(self):
+        def translate_chunk(chunk):
+            if chunk == 'bad':
+                raise ConnectionError('provider is down')
+            return chunk.upper()
+
+        with self.assertRaisesMessage(ConnectionError, 'provider is down'):
+            translate_chunks(['bad', 'one', 'two'], 'fa', translate_chunk, source='en')
+        # Both successful translations were cached; the provider is not called again
+        results = translate_chunks(['one', 'two'], 'fa', mock.Mock(side_effect=AssertionError), source='en')
+        self.assertEqual([(result['translation'], result['cache']) for result in results], [('ONE', 'hit'), ('TWO', 'hit')])
+
+
+class ChunkSplittingTests(SimpleTestCase):
+
+    def test_paragraphs_are_never_merged(self):
+        self.assertEqual(
+            split_into_chunks('One. Two.\n\nThree.'),
+            [Chunk('One. Two.', '\n\n'), Chunk('Three.', '')],
+        )
+
+    def test_long_paragraphs_split_after_persian_sentence_ends(self):
+        self.assertEqual(
+            split_into_chunks('<p>اول است. دوم است؟ سوم.</p><p>چهار</p>', limit=12),
+            [Chunk('<p>اول است.', ' '), Chunk('دوم است؟', ' '), Chunk('سوم.</p>', ''), Chunk('<p>چهار</p>', '')],
+        )
+
+    def test_words_and_tags_stay_whole(self):
+        chunks = split_into_chunks('<p>Hello <a href="http://example.com/very/long">link</a> world</p>', limit=10)
+        self.assertIn(Chunk('<a href="http://example.com/very/long">link</a>', ' '), chunks)
+        chunks = split_into_chunks('word ' * 30, limit=20)
+        self.assertTrue(all(len(chunk.text) <= 20 for chunk in chunks))
+        self.assertEqual({word for chunk in chunks for word in chunk.text.split()}, {'word'})
+        self.assertEqual(''.join(chunk.text + chunk.separator for chunk in chunks), 'word ' * 30)
+
+    def test_an_edit_only_changes_the_chunks_of_its_paragraph(self):
+        paragraphs = ['First paragraph here. ' * 30, 'Second one. ' * 30, 'Third and last. ' * 30]
+        before = split_into_chunks('\n\n'.join(paragraphs))
+        paragraphs[1] = 'Edited. ' + paragraphs[1]
+        after = split_into_chunks('\n\n'.join(paragraphs))
+        first, last = split_into_chunks(paragraphs[0]), split_into_chunks(paragraphs[2])
+        self.assertEqual(
+            [chunk.text for chunk in after[:len(first)]], [chunk.text for chunk in before[:len(first)]]
+        )
+        self.assertEqual(
+            [chunk.text for chunk in after[-len(last):]], [chunk.text for chunk in before[-len(last):]]
+        )
+
+
+def crossref_response(status_code, message=None, etag=''):
+    response = mock.Mock(status_code=status_code, headers={'ETag': etag} if etag else {})
+    response.json.return_value = {'status': 'ok', 'message': message}
+    return response
+
+
+def crossref_work(title, *authors):
+    return {
+        'title': [title],
+        'container-title': ['Journal of Sleep'],
+        'published': {'date-parts': [[2020, 5]]},
+        'author': [
+            {'given': given, 'family': family, 'ORCID': f'https://orcid.org/{orcid}' if orcid else ''}
+            for given, family, orcid in authors
+        ],
+    }
+
+
+class DOIImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        project = Project.objects.create(owner=cls.user, title='Research', type='research_project')
+        cls.research_project = ResearchProject.objects.create(project=project, title='Research', organization='Org')
+        cls.existing = Article.objects.create(title='Existing', doi='10.1000/existing')
+
+    def setUp(self):
+        crossref._memory.clear()
+        patcher = mock.patch('Main.crossref.requests.get', side_effect=self.get)
+        self.requests_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, url, headers, params, timeout):
+        if url.endswith('10.1000/new'):
+            return crossref_response(200, crossref_work(
+                'New work', ('Ann', 'Lee', '0000-0001-0000-0001'), ('Bo', 'Chen', ''),
+            ))
+        return crossref_response(404)
+
+    def test_import_creates_links_and_cites_in_bulk(self):
+        results = import_dois(
+            ['https://doi.org/10.1000/NEW', '10.1000/existing', '10.1000/missing', '10.1000/new'],
+            citing_obj=self.research_project,
+        )
+        self.assertEqual(
+            [(result['doi'], result['status']) for result in results],
+            [('10.1000/new', 'created'), ('10.1000/existing', 'existing'), ('10.1000/missing', 'error')],
+        )
+        self.assertEqual(self.requests_get.call_count, 2)
+
+        article = Article.objects.get(doi='10.1000/new')
+        self.assertEqual(article.title, 'New work')
+        self.assertEqual(
+            list(article.articleauthorship_set.order_by('authorship_order').values_list('author__last_name', flat=True)),
+            ['Lee', 'Chen'],
+        )
+        cited = Reference.objects.filter(citing_object_id=self.research_project.pk)
+        self.assertEqual(sorted(cited.values_list('cited_object_id', flat=True)), sorted([article.pk, self.existing.pk]))
+        self.assertEqual(Article.objects.get(pk=self.existing.pk).citation_count, 1)
+
+        # A second import finds both articles and the references in place
+        results = import_dois(['10.1000/new', '10.1000/existing'], citing_obj=self.research_project)
+        self.assertEqual([result['referenced'] for result in results], [False, False])
+        self.assertEqual(cited.count(), 2)
+
+    def test_overlong_dois_are_reported_without_failing_the_batch(self):
+        overlong = '10.1000/' + 'x' * 100
+        results = import_dois([overlong, '10.1000/new'], citing_obj=self.research_project)
+        self.assertEqual([result['status'] for result in results], ['error', 'created'])
+        self.assertIn('100', results[0]['error'])
+        # Never sent to Crossref
+        self.assertEqual(self.requests_get.call_count, 1)
+        self.assertEqual(Reference.objects.filter(citing_object_id=self.research_project.pk).count(), 1)
+
+    def test_batch_endpoint_extracts_dois_from_a_reference_list(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('add_references_with_dois', args=['researchproject', self.research_project.pk]),
+            {'dois': 'Lee, A. (2020). New work. https://doi.org/10.1000/new.\nSmith (2019) doi:10.1000/existing'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary'], {
+            'total': 2, 'created': 1, 'existing': 1, 'failed': 0, 'referenced': 2,
+        })
+
+
+class CrossrefCacheTests(TestCase):
+
+    def setUp(self):
+        crossref._memory.clear()
+
+    def age(self, doi, seconds):
+        CrossrefWork.objects.filter(doi=doi).update(fetched_at=timezone.now() - timedelta(seconds=seconds))
+        crossref._memory.clear()
+
+    @mock.patch('Main.crossref.requests.get', return_value=crossref_response(404))
+    def test_not_found_dois_are_cached(self, requests_get):
+        self.assertEqual(fetch_works(['10.1000/missing']), ({'10.1000/missing': None}, {}))
+        fetch_works(['10.1000/missing'])
+        # Another process finds the 404 in the table
+        crossref._memory.clear()
+        fetch_works(['10.1000/missing'])
+        self.assertEqual(requests_get.call_count, 1)
+
+        self.age('10.1000/missing', settings.CROSSREF_NEGATIVE_CACHE_TTL + 1)
+        fetch_works(['10.1000/missing'])
+        self.assertEqual(requests_get.call_count, 2)
+
+    @mock.patch('Main.crossref.requests.get')
+    def test_stale_records_are_revalidated_with_their_etag(self, requests_get):
+        requests_get.return_value = crossref_response(200, crossref_work('Cached'), etag='W/"v1"')
+        works, _ = fetch_works(['10.1000/work'])
+        self.assertEqual(works['10.1000/work']['title'], ['Cached'])
+
+        self.age('10.1000/work', settings.CROSSREF_CACHE_TTL + 1)
+        requests_get.return_value = crossref_response(304)
+        works, _ = fetch_works(['10.1000/work'])
+        self.assertEqual(requests_get.call_args.kwargs['headers']['If-None-Match'], 'W/"v1"')
+        self.assertEqual(works['10.1000/work']['title'], ['Cached'])
+        work = CrossrefWork.objects.get(doi='10.1000/work')
+        self.assertEqual((work.status_code, work.etag), (200, 'W/"v1"'))
+        self.assertLess(timezone.now() - work.fetched_at, timedelta(minutes=1))
+
+    @mock.patch('Main.crossref.requests.get', side_effect=ConnectionError('timed out'))
+    def test_failures_are_reported_and_not_cached(self, requests_get):
+        with self.assertLogs('Main.crossref', 'WARNING'):
+            self.assertEqual(fetch_works(['10.1000/work']), ({}, {'10.1000/work': 'timed out'}))
+        self.assertFalse(CrossrefWork.objects.exists())
+
+
+class JobQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        project = Project.objects.create(owner=cls.user, title='Research', type='research_project')
+        cls.research_project = ResearchProject.objects.create(project=project, title='Research', organization='Org')
+
+    def setUp(self):
+        crossref._memory.clear()
+
+    @mock.patch('Main.crossref.requests.get', return_value=crossref_response(200, crossref_work('Queued work')))
+    def test_doi_references_are_resolved_by_the_worker(self, requests_get):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('add_reference_with_doi', args=['researchproject', self.research_project.pk]),
+            {'doi': 'https://doi.org/10.1000/queued'},
+        )
+        self.assertEqual(response.status_code, 202)
+        # Crossref is only contacted by the worker
+        requests_get.assert_not_called()
+
+        self.assertEqual(jobs.run_worker(once=True), 1)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual((status['status'], status['attempts']), ('done', 1))
+        self.assertTrue(status['result']['success'])
+        self.assertTrue(Reference.objects.filter(
+            citing_object_id=self.research_project.pk,
+            cited_object_id=Article.objects.get(doi='10.1000/queued').pk,
+        ).exists())
+
+    def test_a_job_is_claimed_once(self):
+        with mock.patch.dict(jobs.HANDLERS, {'noop': lambda job: None}):
+            job = jobs.enqueue('noop', {})
+            self.assertEqual(jobs.claim_next(), job)
+            self.assertIsNone(jobs.claim_next())
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'running')
+
+    def test_failures_are_retried_with_backoff_then_fail(self):
+        def flaky(job):
+            raise ValueError('Crossref is down')
+
+        with mock.patch.dict(jobs.HANDLERS, {'flaky': flaky}), self.assertLogs('Main.jobs', 'WARNING'):
+            job = jobs.enqueue('flaky', {}, max_attempts=2)
+            job = jobs.run_job(jobs.claim_next())
+            self.assertEqual((job.status, job.error), ('queued', 'Crossref is down'))
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+            self.assertIsNone(jobs.claim_next())
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            job = jobs.run_job(jobs.claim_next())
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(Job.objects.get(pk=job.pk).finished_at)
+
+    @mock.patch('Main.crossref.requests.get', return_value=crossref_response(404))
+    def test_unknown_dois_fail_without_retries(self, requests_get):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('add_reference_with_doi', args=['researchproject', self.research_project.pk]),
+            {'doi': '10.1000/missing'},
+        )
+        with self.assertLogs('Main.jobs', 'WARNING'):
+            jobs.run_worker(once=True)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual((status['status'], status['attempts']), ('failed', 1))
+        self.assertEqual(status['error'], 'این DOI در Crossref یافت نشد')
+
+    @mock.patch('Main.crossref.requests.get', side_effect=ConnectionError('timed out'))
+    def test_unreachable_crossref_is_retried(self, requests_get):
+        job = jobs.enqueue('resolve_doi', {
+            'citing_content_type_id': ContentType.objects.get_for_model(ResearchProject).id,
+            'citing_object_id': self.research_project.pk,
+            'doi': '10.1000/queued',
+        })
+        with self.assertLogs('Main.crossref', 'WARNING'), self.assertLogs('Main.jobs', 'WARNING'):
+            job = jobs.run_job(jobs.claim_next())
+        self.assertEqual((job.status, job.error), ('queued', 'timed out'))
+
+    def test_jobs_of_a_crashed_worker_are_requeued(self):
+        with mock.patch.dict(jobs.HANDLERS, {'noop': lambda job: None}):
+            job = jobs.enqueue('noop', {})
+            jobs.claim_next()
+        self.assertEqual(jobs.requeue_stale(timeout=60), 0)
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(jobs.requeue_stale(timeout=60), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'queued')
+
+    def test_unknown_kinds_are_rejected(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('unknown', {})
+
+
+class AuthorResolutionTests(TestCase):
+
+    def person(self, first_name, last_name, orcid_id=''):
+        return {'first_name': first_name, 'last_name': last_name, 'orcid_id': orcid_id, 'affiliation': ''}
+
+    def test_orcid_wins_over_the_name_and_names_are_normalized(self):
+        by_orcid = Author.objects.create(first_name='Jane', last_name='Doe', orcid_id='0000-0003-0000-0003')
+        by_name = Author.objects.create(first_name='José', last_name='Müller')
+        authors = resolve_authors([
+            self.person('J.', 'Doe-Smith', '0000-0003-0000-0003'),
+            self.person('jose', 'MULLER'),
+            self.person('jose', 'MULLER'),
+        ])
+        self.assertEqual([author.pk for author in authors], [by_orcid.pk, by_name.pk, by_name.pk])
+
+    def test_a_large_author_list_takes_a_fixed_number_of_queries(self):
+        people = [self.person(f'First{i}', f'Last{i}', f'0000-0001-0000-{i:04d}') for i in range(300)]
+        Author.objects.create(first_name='First0', last_name='Last0', orcid_id='0000-0001-0000-0000')
+        with CaptureQueriesContext(connection) as queries:
+            authors = resolve_authors(people)
+        # Lookup and re-read; the insert of the 299 new authors is only
+        # split into several statements by SQLite's parameter limit
+        statements = [q['sql'].split()[0] for q in queries]
+        self.assertEqual(statements.count('SELECT'), 2)
+        self.assertEqual(set(statements), {'SELECT', 'INSERT'})
+        self.assertEqual([author.last_name for author in authors], [f'Last{i}' for i in range(300)])
+        self.assertEqual(Author.objects.count(), 300)
+
+    def test_namesakes_with_different_orcids_stay_distinct(self):
+        authors = resolve_authors([
+            self.person('J.', 'Wang', '0000-0001-0000-0001'),
+            self.person('J.', 'Wang', '0000-0002-0000-0002'),
+        ])
+        self.assertNotEqual(authors[0].pk, authors[1].pk)
+        self.assertEqual([author.orcid_id for author in authors], ['0000-0001-0000-0001', '0000-0002-0000-0002'])
+
+        again = resolve_authors([self.person('J.', 'Wang', '0000-0002-0000-0002')])
+        self.assertEqual(again[0].pk, authors[1].pk)
+        self.assertEqual(Author.objects.count(), 2)
+
+    def test_an_author_without_orcid_is_claimed_by_one_orcid_only(self):
+        existing = Author.objects.create(first_name='J.', last_name='Wang')
+        authors = resolve_authors([
+            self.person('J.', 'Wang', '0000-0001-0000-0001'),
+            self.person('J.', 'Wang', '0000-0002-0000-0002'),
+        ])
+        self.assertEqual(authors[0].pk, existing.pk)
+        self.assertNotEqual(authors[1].pk, existing.pk)
+
+
+class AuthorSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.smith = Author.objects.create(first_name='John', last_name='Smith', orcid_id='0000-0002-1825-0097')
+        cls.jones = Author.objects.create(
+            first_name='Ann', last_name='Jones', affiliation='University of Tehran',
+            user=User.objects.create_user('ajones', 'ann@example.com', 'password'),
+        )
+
+    def test_name_and_orcid_searches(self):
+        muller = Author.objects.create(first_name='José', last_name='Müller')
+        for term in ('Smith', 'smith j', 'John Smith', 'SMI'):
+            self.assertEqual(list(search_authors(term)), [self.smith], term)
+        self.assertEqual(list(search_authors('jose muller')), [muller])
+        self.assertEqual(list(search_authors('orcid 0000-0002-1825-0097')), [self.smith])
+        self.assertEqual(list(search_authors('  ')), [])
+
+    def test_migration_refolds_existing_name_keys(self):
+        muller = Author.objects.create(first_name='José', last_name='Müller')
+        Author.objects.update(name_key='')
+        import_module('Main.migrations.0010_refold_author_name_key').refold_name_key(apps, None)
+        self.assertEqual(list(search_authors('jose muller')), [muller])
+        self.assertEqual(list(search_authors('smith j')), [self.smith])
+
+    def test_searches_use_the_indexed_columns(self):
+        sql = str(search_authors('John Smith').query)
+        self.assertIn('name_key', sql)
+        self.assertNotIn('"first_name" LIKE', sql)
+        self.assertIn('"orcid_id" =', str(search_authors('0000-0002-1825-0097').query))
+
+    def test_find_author_tries_the_orcid_then_the_name(self):
+        self.assertEqual(find_author('0000-0002-1825-0097', 'Someone', 'Else'), self.smith)
+        self.assertEqual(find_author('', 'ann', 'JONES'), self.jones)
+        self.assertIsNone(find_author('0000-0009-0000-0009'))
+
+    def admin_search(self, term):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin:Main_author_changelist'), {'q': term})
+        return list(response.context['cl'].result_list)
+
+    def test_admin_searches_names_orcids_and_other_fields(self):
+        self.assertEqual(self.admin_search('smith j'), [self.smith])
+        self.assertEqual(self.admin_search('https://orcid.org/0000-0002-1825-0097'), [self.smith])
+        self.assertEqual(self.admin_search('Tehran'), [self.jones])
+        self.assertEqual(self.admin_search('ajones'), [self.jones])
+        self.assertEqual(self.admin_search('nobody'), [])
+
+
+class DashboardQueryTests(TestCase):
+    """The dashboard must load in a fixed number of queries"""
+
+    # session + user + projects + one prefetch per project type
+    QUERY_BUDGET = 9
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+
+    def create_projects(self, count):
+        for i in range(count):
+            for project_type, _ in Project.PROJECT_TYPES:
+                project = Project.objects.create(
+                    owner=self.user,
+                    title=f'{project_type} {self._count} {i}',
+                    type=project_type,
+                )
+                if project_type == 'article_writing':
+                    Article.objects.create(project=project, title='Article', doi=f'10.1000/{project.pk}')
+                elif project_type == 'book_writing':
+                    Book.objects.create(project=project, title='Book', publisher='Publisher')
+                elif project_type == 'book_translation':
+                    TranslatedBook.objects.create(
+                        project=project, title='Book', original_title='Book',
+                        original_language='en', publisher='Publisher', original_author='Author',
+                    )
+                elif project_type == 'research_proposal':
+                    ResearchProposal.objects.create(project=project, title='Proposal')
+                elif project_type == 'research_project':
+                    ResearchProject.objects.create(project=project, title='Research', organization='Org')
+                elif project_type == 'thesis':
+                    Thesis.objects.create(
+                        project=project, title='Thesis', student_name='Student',
+                        university='University', degree_type='master',
+                    )
+        self._count += 1
+
+    def setUp(self):
+        self._count = 0
+        self.client.force_login(self.user)
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self.create_projects(1)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+        self.create_projects(10)
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_projects_are_replaced_by_their_child_objects(self):
+        self.create_projects(1)
+        response = self.client.get(reverse('dashboard'))
+        project_dict = response.context['project_dict']
+        self.assertIsInstance(project_dict['research_projects'][0], ResearchProject)
+        self.assertIsInstance(project_dict['theses'][0], Thesis)
+        self.assertIsInstance(project_dict['articles'][0], Article)
+        self.assertEqual(sum(len(items) for items in project_dict.values()), 6)
+
+
+class ResearchProjectReferencesQueryTests(TestCase):
+    """References on the research project page are resolved in bulk"""
+
+    QUERY_BUDGET = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        project = Project.objects.create(owner=cls.user, title='Research', type='research_project')
+        cls.research_project = ResearchProject.objects.create(
+            project=project, title='Research', organization='Org',
+        )
+        ResearchProjectSection.objects.create(
+            research_project=cls.research_project, section_type='procedure', title='Procedure',
+        )
+
+        articles = Article.objects.bulk_create([
+            Article(title=f'Article {i}', doi=f'10.1000/{i}') for i in range(200)
+        ])
+        articles = list(Article.objects.order_by('pk'))
+        authors = Author.objects.bulk_create([
+            Author(first_name=f'First {i}', last_name=f'Last {i}') for i in range(200)
+        ])
+        authors = list(Author.objects.order_by('pk'))
+        ArticleAuthorship.objects.bulk_create([
+            ArticleAuthorship(article=article, author=author)
+            for article, author in zip(articles, authors)
+        ])
+        ArticleSection.objects.bulk_create([
+            ArticleSection(article=article, section_type='procedure', title='Procedure')
+            for article in articles
+        ])
+
+        research_project_type = ContentType.objects.get_for_model(ResearchProject)
+        article_type = ContentType.objects.get_for_model(Article)
+        Reference.objects.bulk_create([
+            Reference(
+                citing_content_type=research_project_type,
+                citing_object_id=cls.research_project.pk,
+                cited_content_type=article_type,
+                cited_object_id=article.pk,
+            )
+            for article in articles
+        ])
+        cls.first_article = articles[0]
+
+    def test_two_hundred_references_render_within_budget(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        # Render the template at its on-disk path
+        view = ResearchProjectDetailView.as_view(
+            template_name='Projects/ResearchProject/ResearchProject_detail.html',
+        )
+        with self.assertNumQueriesLessThan(self.QUERY_BUDGET):
+            response = view(request, pk=self.research_project.pk)
+            response.render()
+        self.assertEqual(response.status_code, 200)
+
+        references = response.context_data['citing_references']
+        self.assertEqual(len(references), 200)
+        first = next(ref for ref in references if ref['object'].pk == self.first_article.pk)
+        self.assertEqual(first['object'].get_authors_display(), 'First 0 Last 0')
+        self.assertContains(response, f'id="ref-content-{first["id"]}"')
+
+    def assertNumQueriesLessThan(self, limit):
+        return _QueryCountLessThan(self, limit)
+
+
+class _QueryCountLessThan(CaptureQueriesContext):
+    def __init__(self, test_case, limit):
+        super().__init__(connection)
+        self.test_case = test_case
+        self.limit = limit
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            self.test_case.assertLess(len(self), self.limit, '\n'.join(
+                query['sql'] for query in self.captured_queries
+            ))
+
+
+class ReferenceConstraintTests(TestCase):
+
+    def test_duplicate_reference_is_rejected(self):
+        article = Article.objects.create(title='Cited', doi='10.1000/cited')
+        citing = Article.objects.create(title='Citing', doi='10.1000/citing')
+        article_type = ContentType.objects.get_for_model(Article)
+        fields = {
+            'citing_content_type': article_type,
+            'citing_object_id': citing.pk,
+            'cited_content_type': article_type,
+            'cited_object_id': article.pk,
+        }
+        Reference.objects.create(**fields)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reference.objects.create(**fields)
+
+        reference, created = Reference.objects.get_or_create(**fields)
+        self.assertFalse(created)
+        self.assertEqual(Reference.objects.count(), 1)
+
+
+class CitationCountTests(TestCase):
+
+    def setUp(self):
+        self.article = Article.objects.create(title='Cited', doi='10.1000/cited')
+        self.citing = Article.objects.create(title='Citing', doi='10.1000/citing')
+        self.article_type = ContentType.objects.get_for_model(Article)
+
+    def cite(self, citing):
+        return Reference.objects.create(
+            citing_content_type=self.article_type,
+            citing_object_id=citing.pk,
+            cited_content_type=self.article_type,
+            cited_object_id=self.article.pk,
+        )
+
+    def test_counts_follow_reference_writes(self):
+        reference = self.cite(self.citing)
+        other = Article.objects.create(title='Other', doi='10.1000/other')
+        self.cite(other)
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.citation_count, 2)
+
+        reference.delete()
+        Reference.objects.filter(citing_object_id=other.pk).delete()
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.citation_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        self.cite(self.citing)
+        Article.objects.filter(pk=self.article.pk).update(citation_count=7)
+        call_command('reconcile_citations', stdout=StringIO())
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.citation_count, 1)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'password')
+        project = Project.objects.create(owner=cls.user, title='Research', type='research_project')
+        cls.research_project = ResearchProject.objects.create(
+            project=project, title='Sleep and memory', organization='Org',
+        )
+        cls.section = ResearchProjectSection.objects.create(
+            research_project=cls.research_project,
+            section_type='procedure',
+            title='Procedure',
+            content='<p>Participants slept in the <b>laboratory</b> for two nights.</p>',
+        )
+
+    def test_section_text_is_indexed_and_highlighted(self):
+        results = search('laboratory', self.user)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['document_type'], 'researchproject')
+        self.assertEqual(results[0]['document_id'], self.research_project.pk)
+        self.assertIn('<mark>laboratory</mark>', results[0]['snippet'])
+
+    def test_titles_rank_above_body_matches(self):
+        ResearchProjectSection.objects.create(
+            research_project=self.research_project, section_type='subject',
+            title='Memory consolidation', content='<p>Unrelated text.</p>',
+        )
+        ResearchProjectSection.objects.create(
+            research_project=self.research_project, section_type='equipment',
+            title='Equipment', content='<p>We measured memory once.</p>',
+        )
+        titles = [result['title'] for result in search('memory', self.user)]
+        self.assertEqual(titles[-1], 'Equipment')
+
+    def test_index_follows_edits_and_deletes(self):
+        self.section.content = '<p>Recordings used polysomnography.</p>'
+        self.section.save()
+        self.assertEqual(search('laboratory', self.user), [])
+        self.assertEqual(len(search('polysomnography', self.user)), 1)
+
+        self.section.delete()
+        self.assertEqual(search('polysomnography', self.user), [])
+
+    def test_private_projects_are_hidden_from_other_users(self):
+        self.assertEqual(search('laboratory', self.other), [])
+
+    def test_translated_book_sections_are_indexed(self):
+        project = Project.objects.create(owner=self.user, title='Translation', type='book_translation')
+        translated_book = TranslatedBook.objects.create(
+            project=project, title='Translated', original_title='Original',
+            original_language='en', publisher='Publisher', original_author='Author',
+        )
+        chapter = BookChapter.objects.create(translated_book=translated_book, chapter_number=1, title='One')
+        BookSection.objects.create(chapter=chapter, section_type='text', content='<p>Hippocampus replay.</p>')
+        results = search('hippocampus', self.user)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['document_type'], 'translatedbook')
+        self.assertEqual(results[0]['document_id'], translated_book.pk)
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search('hippocampus', self.user)), 1)
+
+    def test_sections_outside_any_document_are_not_indexed(self):
+        section = BookSection(chapter=BookChapter(chapter_number=1, title='Loose'), section_type='text')
+        self.assertIsNone(build_search_document(section))
+
+    def test_migration_indexes_existing_objects(self):
+        migration = import_module('Main.migrations.0009_search_document')
+        indexed = list(SearchDocument.objects.order_by('pk').values_list('document_type', 'document_id', 'title', 'body'))
+        SearchDocument.objects.all().delete()
+        migration.index_existing_objects(apps, None)
+        self.assertEqual(
+            list(SearchDocument.objects.order_by('pk').values_list('document_type', 'document_id', 'title', 'body')),
+            indexed,
+        )
+        self.assertEqual(len(search('laboratory', self.user)), 1)
+
+    def test_search_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search'), {'q': 'laboratory nights'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['query'], 'laboratory nights')
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(
+            data['results'][0]['url'],
+            reverse('research_project_detail', args=[self.research_project.pk]),
+        )
+
+
+class TextNormalizationTests(SimpleTestCase):
+
+    def test_arabic_and_persian_spellings_share_one_form(self):
+        # Arabic kaf/yeh, a kasra, a tatweel and Arabic-Indic digits
+        arabic = 'كِتاب عربيـ ٣٤'
+        persian = 'کتاب عربی ۳۴'
+        self.assertEqual(normalize(arabic), normalize(persian))
+        self.assertEqual(normalize(persian), 'کتاب عربی 34')
+
+    def test_zero_width_characters(self):
+        # Doubled and trailing ZWNJs, a zero width space and a RTL mark
+        text = 'می\u200c\u200cخواهم\u200c  \u200bرفت\u200f'
+        self.assertEqual(normalize(text), 'می\u200cخواهم رفت')
+        self.assertEqual(tokenize('می\u200cخواهم بروم.'), ['می\u200cخواهم', 'بروم'])
+
+    def test_presentation_forms_are_folded(self):
+        self.assertEqual(normalize('ﻛﺘﺎﺏ'), 'کتاب')
+
+    def test_fold_strips_case_and_accents(self):
+        self.assertEqual(fold('  José MÜLLER '), 'jose muller')
+        self.assertEqual(fold('علي'), fold('علی'))
+
+    def test_throughput(self):
+        paragraph = (
+            'پژوهش‌های اخیر نشان می‌دهد كه خواب در تثبیت حافظه نقش دارد (Walker, 2009). '
+            'در این مطالعه ۴۲ شرکت‌کننده به مدت ٢ شب در آزمایشگاه خوابیدند.\n'
+        )
+        text = paragraph * 5000  # about 1 MB
+        started = time.perf_counter()
+        normalized = normalize(text)
+        words = tokenize(text)
+        elapsed = time.perf_counter() - started
+        self.assertNotIn('ك', normalized)
+        self.assertGreater(len(words), 100000)
+        # Well under a second per megabyte on any development machine
+        self.assertLess(elapsed, 2.0)
+
+
+class TextExtractionTests(SimpleTestCase):
+
+    def test_visible_text_only(self):
+        stats = extract(
+            '<p>Hello&nbsp;wo<b>rld</b></p><script>var hidden = 1;</script>'
+            '<style>p { color: red }</style><!-- note --><ul><li>سلام\u200cعلیکم</li><li>دوستان</li></ul>'
+        )
+        self.assertEqual(stats.text, 'Hello world سلام\u200cعلیکم دوستان')
+        self.assertEqual(stats.words, 4)
+        self.assertEqual(stats.characters, len(stats.text))
+        self.assertEqual(stats.reading_minutes, 1)
+
+    def test_malformed_and_empty_content(self):
+        self.assertEqual(extract('<p>unclosed <b>tags & stray < signs').text, 'unclosed tags & stray < signs')
+        self.assertEqual(extract(''), ('', 0, 0, 0))
+        self.assertEqual(extract(None).words, 0)
+
+    def test_reading_time(self):
+        with self.settings(READING_WORDS_PER_MINUTE=100):
+            self.assertEqual(extract('<p>%s</p>' % ' '.join(['word'] * 250)).reading_minutes, 3)
+
+    def test_unchanged_content_is_parsed_once(self):
+        content = '<p>%s</p>' % 'cached text'
+        first = extract(content)
+        with mock.patch('Main.extraction._parse') as parse:
+            self.assertIs(extract(content), first)
+        parse.assert_not_called()
+
+
+class SanitizeHTMLTests(SimpleTestCase):
+
+    def test_scripts_handlers_and_unsafe_urls_are_removed(self):
+        self.assertEqual(
+            sanitize_html(
+                '<p onclick="x()" style="text-align: center; position: fixed">Hi<script>alert(1)</script></p>'
+                '<a href=" javascript:alert(1)">link</a><img src="data:image/png;base64,AA" onerror="x()">'
+            ),
+            '<p style="text-align: center">Hi</p><a>link</a><img src="data:image/png;base64,AA">',
+        )
+
+    def test_unknown_tags_are_unwrapped_and_markup_repaired(self):
+        self.assertEqual(
+            sanitize_html('<font color="red">کلمه</font> <p>one<b>two</p><a href="/x" target="t">x'),
+            'کلمه <p>one<b>two</b></p><a href="/x" target="_blank" rel="noopener noreferrer">x</a>',
+        )
+        self.assertEqual(sanitize_html('<!-- only a comment -->'), '')
+
+    def test_an_encoding_declaration_is_dropped(self):
+        self.assertEqual(
+            sanitize_html('<?xml version="1.0" encoding="utf-8"?><p>متن<script>x()</script></p>'),
+            '<p>متن</p>',
+        )
+
+    def test_sanitizing_is_idempotent(self):
+        content = '<div><p style="direction: rtl">متن <u>زیرخط</u></p><table><tr><td colspan="2">1</td></tr></table>'
+        clean = sanitize_html(content)
+        self.assertEqual(sanitize_html(clean), clean)
+
+
+class WordCountPropagationTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.project = Project.objects.create(owner=user, title='Book', type='book_writing')
+        self.book = Book.objects.create(project=self.project, title='Book', publisher='Publisher')
+        self.chapter = BookChapter.objects.create(book=self.book, chapter_number=1, title='One')
+        self.other_chapter = BookChapter.objects.create(book=self.book, chapter_number=2, title='Two')
+
+    def assertTotals(self, chapter, book, project):
+        self.assertEqual(
+            [
+                BookChapter.objects.get(pk=self.chapter.pk).word_count,
+                Book.objects.get(pk=self.book.pk).word_count,
+                Project.objects.get(pk=self.project.pk).word_count,
+            ],
+            [chapter, book, project],
+        )
+
+    def test_deltas_propagate_up_the_chain(self):
+        section = BookSection.objects.create(chapter=self.chapter, section_type='text', content='<p>one two three</p>')
+        BookSection.objects.create(chapter=self.other_chapter, section_type='text', content='<p>four five</p>')
+        self.assertTotals(3, 5, 5)
+
+        section = BookSection.objects.get(pk=section.pk)
+        section.content = '<p>one</p>'
+        section.save()
+        self.assertTotals(1, 3, 3)
+
+        section.chapter = self.other_chapter
+        section.save()
+        self.assertTotals(0, 3, 3)
+        self.assertEqual(BookChapter.objects.get(pk=self.other_chapter.pk).word_count, 3)
+
+        section.delete()
+        self.assertTotals(0, 2, 2)
+
+    def test_editing_a_section_does_not_reload_its_siblings(self):
+        for i in range(40):
+            BookSection.objects.create(chapter=self.chapter, section_type='text', content='<p>a b</p>')
+        section = BookSection.objects.filter(chapter=self.chapter).first()
+        section.content = '<p>a b c</p>'
+        with CaptureQueriesContext(connection) as queries:
+            section.save()
+        self.assertFalse([q for q in queries if 'FROM "Main_booksection"' in q['sql'] and q['sql'].startswith('SELECT')])
+        self.assertTotals(81, 81, 81)
+
+    def test_section_save_does_not_write_the_chapter_back(self):
+        section = BookSection.objects.create(chapter=self.chapter, section_type='text', content='<p>one</p>')
+        section = BookSection.objects.select_related('chapter').get(pk=section.pk)
+        BookChapter.objects.filter(pk=self.chapter.pk).update(title='Renamed')
+        section.content = '<p>one two</p>'
+        with CaptureQueriesContext(connection) as queries:
+            section.save()
+        # The word count delta and the fragment timestamp, never the whole row
+        chapter_updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "Main_bookchapter"')]
+        self.assertEqual(len(chapter_updates), 2)
+        self.assertFalse([sql for sql in chapter_updates if '"title"' in sql])
+        self.assertEqual(BookChapter.objects.get(pk=self.chapter.pk).title, 'Renamed')
+
+    def test_sections_store_a_clean_rendition(self):
+        section = BookSection.objects.create(
+            chapter=self.chapter, section_type='text', content='<p>one<script>x</script></p>'
+        )
+        BookSection.objects.filter(pk=section.pk).update(clean_content='')
+        self.assertEqual(BookSection.objects.get(pk=section.pk).clean_content, '')
+        call_command('sanitize_sections', batch_size=1, stdout=StringIO())
+        self.assertEqual(BookSection.objects.get(pk=section.pk).clean_content, '<p>one</p>')
+        BookSection.objects.filter(pk=section.pk).update(clean_content='')
+        import_module('Main.migrations.0015_section_clean_content').populate_clean_content(apps, None)
+        self.assertEqual(BookSection.objects.get(pk=section.pk).clean_content, '<p>one</p>')
+
+    def test_stale_container_save_keeps_the_total(self):
+        stale_book = Book.objects.get(pk=self.book.pk)
+        BookSection.objects.create(chapter=self.chapter, section_type='text', content='<p>one two</p>')
+        stale_book.title = 'Renamed'
+        stale_book.save()
+        self.assertTotals(2, 2, 2)
+
+    def test_saving_a_deferred_container_loads_nothing(self):
+        book = Book.objects.only('title', 'project').get(pk=self.book.pk)
+        book.title = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            book.save()
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT') and 'FROM "Main_book"' in q['sql']])
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "Main_book"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"publisher"', updates[0])
+        self.assertEqual(Book.objects.get(pk=self.book.pk).publisher, 'Publisher')
+
+    def test_recompute_repairs_drift(self):
+        BookSection.objects.create(chapter=self.chapter, section_type='text', content='<p>one two</p>')
+        Book.objects.filter(pk=self.book.pk).update(word_count=99)
+        Project.objects.filter(pk=self.project.pk).update(word_count=0)
+        call_command('recompute_word_counts', stdout=StringIO())
+        self.assertTotals(2, 2, 2)
+        Book.objects.filter(pk=self.book.pk).update(word_count=99)
+        import_module('Main.migrations.0011_word_count_totals').populate_word_counts(apps, None)
+        self.assertTotals(2, 2, 2)
+
+
+class TemplateInstantiationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.template = ThesisTemplate.objects.create(name='MSc', university='University', degree_type='masters')
+        self.template.sections.set([
+            ThesisTemplateSection.objects.create(
+                section_type='introduction', title=f'Section {i}', description='Guidance', default_position=i
+            )
+            for i in range(5)
+        ])
+
+    def _thesis(self, i=0):
+        return Thesis(title=f'Thesis {i}', student_name='Student', university='University', degree_type='masters')
+
+    def test_sections_of_a_cohort_are_inserted_at_once(self):
+        instantiate_template([self._thesis()], self.template.id)  # warms the template cache
+        theses = [self._thesis(i) for i in range(1, 11)]
+        with CaptureQueriesContext(connection) as queries:
+            instantiate_template(theses, self.template.id)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "Main_thesissection"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ThesisSection.objects.filter(thesis__in=theses).count(), 50)
+        self.assertEqual(
+            list(theses[0].sections.values_list('title', 'position', 'guidance')),
+            [(f'Section {i}', i, 'Guidance') for i in range(5)],
+        )
+        self.assertTrue(all(thesis.template_id == self.template.id for thesis in Thesis.objects.all()))
+
+    def test_editing_a_template_section_invalidates_the_cache(self):
+        thesis = Thesis.objects.create(
+            title='Thesis', student_name='Student', university='University', degree_type='masters'
+        )
+        instantiate_template([self._thesis()], self.template.id)
+        section = self.template.sections.get(default_position=0)
+        section.title = 'Renamed'
+        section.save()
+        thesis.create_from_template(self.template.id)
+        self.assertTrue(thesis.sections.filter(title='Renamed').exists())
+
+        self.template.sections.remove(section)
+        self.assertEqual(self.template.sections.count(), 4)
+        other = self._thesis()
+        instantiate_template([other], self.template.id)
+        self.assertEqual(other.sections.count(), 4)
+
+        self.template.sections.get(default_position=1).templates.clear()
+        other = self._thesis()
+        instantiate_template([other], self.template.id)
+        self.assertEqual(other.sections.count(), 3)
+
+    def test_the_cache_key_follows_the_template_row(self):
+        instantiate_template([self._thesis()], self.template.id)
+        # What a section save in another process leaves behind; this process's cache is untouched
+        ThesisTemplateSection.objects.filter(default_position=0).update(title='Renamed')
+        ThesisTemplate.objects.filter(pk=self.template.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+        other = self._thesis(1)
+        instantiate_template([other], self.template.id)
+        self.assertTrue(other.sections.filter(title='Renamed').exists())
+
+    def test_instantiation_moves_the_documents_updated_at(self):
+        thesis = Thesis.objects.create(
+            title='Thesis', student_name='Student', university='University', degree_type='masters'
+        )
+        created = thesis.updated_at
+        instantiate_template([thesis], self.template.id)
+        self.assertGreater(thesis.updated_at, created)
+        self.assertEqual(Thesis.objects.get(pk=thesis.pk).updated_at, thesis.updated_at)
+
+    def test_missing_template(self):
+        with self.assertRaises(ThesisTemplate.DoesNotExist):
+            instantiate_template([self._thesis()], self.template.id + 1)
+        self.assertFalse(Thesis.objects.exists())
+
+
+class FigureNumberingTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        project = Project.objects.create(owner=user, title='Book', type='book_writing')
+        self.book = Book.objects.create(project=project, title='Book', publisher='Publisher')
+        self.chapter = BookChapter.objects.create(book=self.book, chapter_number=1, title='One')
+        self.other_chapter = BookChapter.objects.create(book=self.book, chapter_number=2, title='Two')
+
+    def _figure(self, chapter, position=0, number=None):
+        return BookFigure(chapter=chapter, title='Figure', image='figure.png', position=position, figure_number=number)
+
+    def test_numbers_are_sequential_per_chapter(self):
+        for i in range(3):
+            self._figure(self.chapter).save()
+        self._figure(self.other_chapter).save()
+        BookTable.objects.create(chapter=self.chapter, title='Table', table_number=0)
+        self.assertEqual(list(self.chapter.figures.values_list('figure_number', flat=True)), [1, 2, 3])
+        self.assertEqual(list(self.other_chapter.figures.values_list('figure_number', flat=True)), [1])
+        self.assertEqual(self.chapter.tables.get().table_number, 1)
+
+    def test_bulk_create_allocates_once_per_chapter(self):
+        figures = [self._figure(self.chapter) for _ in range(20)] + [self._figure(self.other_chapter)]
+        with CaptureQueriesContext(connection) as queries:
+            BookFigure.objects.bulk_create(figures)
+        updates = [q for q in queries if q['sql'].startswith('UPDATE "Main_bookchapter"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(sorted(self.chapter.figures.values_list('figure_number', flat=True)), list(range(1, 21)))
+        self._figure(self.other_chapter).save()
+        self.assertEqual(sorted(self.other_chapter.figures.values_list('figure_number', flat=True)), [1, 2])
+
+    def test_explicit_numbers_and_stale_chapters_keep_the_counter(self):
+        stale_chapter = BookChapter.objects.get(pk=self.chapter.pk)
+        self._figure(self.chapter, number=7).save()
+        stale_chapter.title = 'Renamed'
+        stale_chapter.save()
+        figure = self._figure(self.chapter)
+        figure.save()
+        self.assertEqual(figure.figure_number, 8)
+
+    def test_edits_leave_the_counter_alone(self):
+        self._figure(self.chapter).save()
+        figure = BookFigure.objects.get(chapter=self.chapter)
+        figure.title = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            figure.save()
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "Main_bookchapter"')])
+
+        figure.figure_number = 5
+        figure.save()
+        figure = self._figure(self.chapter)
+        figure.save()
+        self.assertEqual(figure.figure_number, 6)
+
+    def test_renumber_closes_gaps(self):
+        BookFigure.objects.bulk_create([self._figure(self.chapter, position=i) for i in range(4)])
+        BookFigure.objects.filter(figure_number=2).delete()
+        BookFigure.objects.filter(figure_number=4).update(chapter=self.other_chapter)
+        with CaptureQueriesContext(connection) as queries:
+            renumber_chapters(self.book.chapters.all(), [BookFigure, BookTable])
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('UPDATE "Main_bookfigure"')]), 1)
+        self.assertEqual(list(self.chapter.figures.values_list('figure_number', flat=True)), [1, 2])
+        self.assertEqual(list(self.other_chapter.figures.values_list('figure_number', flat=True)), [1])
+        figure = self._figure(self.chapter)
+        figure.save()
+        self.assertEqual(figure.figure_number, 3)
+
+
+class FastDeleteTests(TestCase):
+    """Signal receivers are connected per model, so other models keep fast deletes"""
+
+    def test_queryset_delete_is_one_statement(self):
+        TranslationMemory.objects.bulk_create([
+            TranslationMemory(text_hash=str(i), target_lang='fa', source_text='text', translation='متن')
+            for i in range(100)
+        ])
+        with self.assertNumQueries(1):
+            TranslationMemory.objects.all().delete()
+
+
+class ProjectAccessTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.user = User.objects.create_user('user', 'user@example.com', 'password')
+        self.projects = [
+            Project.objects.create(owner=self.owner, title=f'Project {i}', type='thesis') for i in range(10)
+        ]
+        self.projects[0].collaborators.add(self.user)
+
+    def test_checks_cost_one_query_per_user(self):
+        projects = list(Project.objects.all())
+        with self.assertNumQueries(2):
+            self.assertEqual([p.can_view(self.user) for p in projects].count(True), 1)
+            self.assertEqual([p.can_view(self.owner) for p in projects].count(True), 10)
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            # A new request reads the memberships again
+            self.assertEqual(len(project_access(user).viewable(projects)), 1)
+        self.assertFalse(projects[0].can_edit(self.user))
+        self.assertTrue(projects[0].can_edit(self.owner))
+        self.assertFalse(projects[0].can_view(AnonymousUser()))
+
+    def test_collaborator_changes_apply_to_the_next_request(self):
+        self.assertFalse(self.projects[1].can_view(User.objects.get(pk=self.user.pk)))
+        self.projects[1].collaborators.add(self.user)
+        self.assertTrue(self.projects[1].can_view(User.objects.get(pk=self.user.pk)))
+
+        self.user.collaborated_projects.remove(self.projects[1])
+        self.assertFalse(self.projects[1].can_view(User.objects.get(pk=self.user.pk)))
+
+        self.projects[0].collaborators.clear()
+        self.assertFalse(self.projects[0].can_view(User.objects.get(pk=self.user.pk)))
+
+
+class SectionFragmentCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        project = Project.objects.create(owner=user, title='Research', type='research_project', visibility='public')
+        self.research_project = ResearchProject.objects.create(project=project, title='Research', organization='Org')
+        self.section = ResearchProjectSection.objects.create(
+            research_project=self.research_project, section_type='procedure', title='Procedure', content='<p>Own</p>',
+        )
+        article = Article.objects.create(title='Cited', doi='10.1000/cited')
+        self.cited_section = ArticleSection.objects.create(
+            article=article, section_type='procedure', title='Procedure', content='<p>Cited text</p>',
+        )
+        Reference.objects.create(
+            citing_content_type=ContentType.objects.get_for_model(ResearchProject),
+            citing_object_id=self.research_project.pk,
+            cited_content_type=ContentType.objects.get_for_model(Article),
+            cited_object_id=article.pk,
+        )
+        self.view = ResearchProjectDetailView.as_view(
+            template_name='Projects/ResearchProject/ResearchProject_detail.html',
+        )
+
+    def render(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(request, pk=self.research_project.pk)
+            response.render()
+        section_queries = [q for q in queries if 'section"' in q['sql'] and q['sql'].startswith('SELECT')]
+        return response.content.decode(), section_queries
+
+    def test_second_render_needs_no_section_queries(self):
+        html, section_queries = self.render()
+        self.assertIn('Own', html)
+        self.assertIn('Cited text', html)
+        self.assertTrue(section_queries)
+
+        html, section_queries = self.render()
+        self.assertIn('Cited text', html)
+        self.assertEqual(section_queries, [])
+
+    def test_section_changes_invalidate_the_fragment(self):
+        self.render()
+        self.cited_section.content = '<p>Revised text</p>'
+        self.cited_section.save()
+        self.assertIn('Revised text', self.render()[0])
+
+        self.section.delete()
+        self.assertNotIn('Own', self.render()[0])
+
+    def test_sanitize_backfill_invalidates_the_fragment(self):
+        self.render()
+        # A row written without signals, e.g. by an allowlist change
+        ArticleSection.objects.filter(pk=self.cited_section.pk).update(content='<p>Backfilled</p>')
+        self.assertNotIn('Backfilled', self.render()[0])
+        call_command('sanitize_sections', stdout=StringIO())
+        self.assertIn('Backfilled', self.render()[0])
+
+    def test_keys_come_from_the_rows_not_the_cache(self):
+        # Another worker process loads the same rows, hence derives the same key
+        def key():
+            return fragment_key('sections', [ResearchProject.objects.get(pk=self.research_project.pk)])
+
+        before = key()
+        cache.clear()
+        self.assertEqual(key(), before)
+        self.section.save()
+        self.assertNotEqual(key(), before)
+
+
+class ProjectMembershipTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.user = User.objects.create_user('user', 'user@example.com', 'password')
+        self.project = Project.objects.create(owner=self.owner, title='Private', type='thesis')
+        self.public = Project.objects.create(owner=self.owner, title='Public', type='thesis', visibility='public')
+
+    def memberships(self):
+        return set(ProjectMembership.objects.values_list('user__username', 'project__title', 'role'))
+
+    def test_memberships_follow_owner_and_collaborators(self):
+        self.project.collaborators.add(self.user, self.owner)
+        self.assertEqual(self.memberships(), {
+            ('owner', 'Private', 'owner'), ('owner', 'Public', 'owner'), ('user', 'Private', 'collaborator'),
+        })
+        self.project.owner = self.user
+        self.project.save()
+        self.assertEqual(self.memberships(), {
+            ('owner', 'Private', 'collaborator'), ('owner', 'Public', 'owner'), ('user', 'Private', 'owner'),
+        })
+        self.owner.collaborated_projects.clear()
+        self.project.collaborators.remove(self.user)
+        self.assertEqual(self.memberships(), {('owner', 'Public', 'owner'), ('user', 'Private', 'owner')})
+
+        Project.objects.bulk_create([Project(owner=self.user, title='Bulk', type='thesis')])
+        self.assertIn(('user', 'Bulk', 'owner'), self.memberships())
+
+    def test_migration_creates_the_memberships(self):
+        self.project.collaborators.add(self.user, self.owner)
+        memberships = self.memberships()
+        ProjectMembership.objects.all().delete()
+        import_module('Main.migrations.0013_project_membership').populate_memberships(apps, None)
+        self.assertEqual(self.memberships(), memberships)
+
+    def test_visibility_filters_need_no_distinct(self):
+        self.project.collaborators.add(self.user)
+        self.public.collaborators.add(self.user)
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        for queryset, titles in (
+            (Project.objects.member_of(self.user), {'Private', 'Public'}),
+            (Project.objects.visible_to(self.user), {'Private', 'Public'}),
+            (Project.objects.visible_to(other), {'Public'}),
+            (Project.objects.visible_to(AnonymousUser()), {'Public'}),
+        ):
+            titles_found = list(queryset.values_list('title', flat=True))
+            self.assertEqual(sorted(titles_found), sorted(titles))
+            self.assertNotIn('DISTINCT', str(queryset.query))
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        Project.objects.bulk_create([Project(owner=cls.user, title=f'Project {i}', type='thesis') for i in range(25)])
+        # Ties on created_at are broken by id
+        Project.objects.filter(title__in=['Project 3', 'Project 4', 'Project 5']).update(
+            created_at=Project.objects.get(title='Project 3').created_at
+        )
+
+    def test_pages_cover_every_row_once(self):
+        seen = []
+        cursor = None
+        queries_per_page = []
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                page = paginate_by_cursor(Project.objects.all(), ('-created_at', '-id'), cursor, per_page=4)
+            queries_per_page.append(len(queries))
+            seen += [project.pk for project in page]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, list(Project.objects.order_by('-created_at', '-id').values_list('pk', flat=True)))
+        self.assertEqual(set(queries_per_page), {1})
+
+    def test_json_list_with_capped_total(self):
+        view = ProjectListView.as_view(cursor_count_limit=20)
+        request = RequestFactory().get('/projects/', {'format': 'json'})
+        request.user = self.user
+        data = json.loads(view(request).content)
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual((data['total'], data['total_is_exact']), (20, False))
+
+        request = RequestFactory().get('/projects/', {'format': 'json', 'cursor': data['next_cursor']})
+        request.user = self.user
+        second = json.loads(view(request).content)
+        self.assertFalse({r['id'] for r in data['results']} & {r['id'] for r in second['results']})
+
+        request = RequestFactory().get('/projects/', {'cursor': 'not-a-cursor'})
+        request.user = self.user
+        with self.assertRaises(Http404):
+            view(request)
+
+
+class ListProjectionTests(TestCase):
+    """List pages must not fetch any HTMLField column"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        project = Project.objects.create(owner=cls.user, title='Project', type='research_project', description='Long')
+        research = ResearchProject.objects.create(project=project, title='Research', organization='Org')
+        ResearchProjectSection.objects.create(research_project=research, section_type='introduction', content='<p>x</p>')
+        article = Article.objects.create(project=project, title='Article', doi='10.1000/list')
+        ArticleSection.objects.create(article=article, section_type='introduction', content='<p>x</p>')
+
+    def html_columns(self):
+        return [
+            f'"{model._meta.db_table}"."{field.column}"'
+            for model in apps.get_app_config('Main').get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, HTMLField)
+        ]
+
+    def assertNoHTMLFetched(self, url, **params):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        fetched = [
+            column for query in queries if query['sql'].startswith('SELECT')
+            for column in self.html_columns() if column in query['sql']
+        ]
+        self.assertEqual(fetched, [], url)
+
+    def test_list_views(self):
+        for name in ('project_list', 'article_list', 'research_project_list'):
+            self.assertNoHTMLFetched(reverse(name), format='json')
+        self.assertNoHTMLFetched(reverse('dashboard'))
+
+    def test_admin_changelists(self):
+        for model in (Project, Article, ArticleSection, ResearchProject, ResearchProjectSection):
+            self.assertNoHTMLFetched(reverse(f'admin:Main_{model._meta.model_name}_changelist'))
+
+
+class SlugAllocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+
+    def create(self, title):
+        return Project.objects.create(owner=self.user, title=title, type='article_writing')
+
+    def slug_lookups(self, queries):
+        # Other SELECTs come from the ProjectMembership sync
+        return [q for q in queries if q['sql'].startswith('SELECT') and 'LIKE' in q['sql']]
+
+    def test_next_suffix_in_one_query(self):
+        for _ in range(12):
+            self.create('Article')
+        project = Project(owner=self.user, title='Article', type='article_writing')
+        with CaptureQueriesContext(connection) as queries:
+            project.save()
+        self.assertEqual(project.slug, 'article-12')
+        self.assertEqual(len(self.slug_lookups(queries)), 1)
+
+    def test_titles_without_latin_letters_get_a_fallback_base(self):
+        self.assertEqual(self.create('پایان‌نامه').slug, 'project')
+        self.assertEqual(self.create('پایان‌نامه').slug, 'project-1')
+
+    def test_similar_prefixes_do_not_collide(self):
+        self.create('Article')
+        self.create('Article 2')
+        self.assertEqual(self.create('Article').slug, 'article-3')
+        self.assertEqual(self.create('Articles').slug, 'articles')
+
+    def test_retries_when_a_concurrent_save_took_the_slug(self):
+        self.create('Article')
+        real_next_suffixes = slugs._next_suffixes
+        calls = []
+
+        def stale_next_suffixes(model, field, bases):
+            calls.append(bases)
+            # The first lookup misses the row a concurrent save just inserted
+            return {base: 0 for base in bases} if len(calls) == 1 else real_next_suffixes(model, field, bases)
+
+        with mock.patch('Main.slugs._next_suffixes', side_effect=stale_next_suffixes):
+            project = self.create('Article')
+        self.assertEqual(project.slug, 'article-1')
+        self.assertEqual(len(calls), 2)
+
+    def test_suffix_is_computed_by_the_database(self):
+        for _ in range(3):
+            self.create('پایان‌نامه')
+        self.create('Project manager')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.create('پایان‌نامه').slug, 'project-3')
+        # One row (the MAX) comes back, however many slugs share the prefix
+        self.assertEqual(len(self.slug_lookups(queries)), 1)
+        self.assertIn('MAX(', self.slug_lookups(queries)[0]['sql'])
+
+    def test_bulk_create_assigns_slugs_in_one_query(self):
+        self.create('Thesis')
+        projects = [Project(owner=self.user, title=title, type='thesis') for title in ['Thesis', 'Thesis', 'Book']]
+        with CaptureQueriesContext(connection) as queries:
+            Project.objects.bulk_create(projects)
+        self.assertEqual([project.slug for project in projects], ['thesis-1', 'thesis-2', 'book'])
+        self.assertEqual(len(self.slug_lookups(queries)), 1)
@@ -0,0 +1,76 @@
+"""
+Persian-aware text normalization and tokenization.
+
+Content is mostly Persian mixed with English, and the same word arrives
+with Arabic or Persian yeh/kaf, with or without diacritics, tatweel or
+stray zero-width characters, and with Persian, Arabic-Indic or ASCII
+digits. Everything that compares text (word counts, the search index,
+author name keys, translation cache keys) goes through normalize() or
+fold() so that equivalent text maps to one key.
+
+All character-level rewriting is done by one precompiled str.translate
+table; the regular expressions only run when the text needs them.
+"""
+import re
+import unicodedata
+
+
+ZWNJ = '\u200c'
+
+_CHARACTER_MAP = {
+    # Arabic letters -> Persian letters
+    '\u064a': '\u06cc',  # ARABIC LETTER YEH -> FARSI YEH
+    '\u0649': '\u06cc',  # ARABIC LETTER ALEF MAKSURA -> FARSI YEH
+    '\u0643': '\u06a9',  # ARABIC LETTER KAF -> KEHEH
+    # Persian and Arabic-Indic digits -> ASCII digits
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+}
+
+_DELETED = (
+    # Harakat, Quranic marks and superscript alef
+    [chr(code) for code in range(0x064b, 0x0660)]
+    + ['\u0670', '\u0640']  # superscript alef, tatweel
+    # Invisible formatting characters (ZWNJ is kept, it is part of the word)
+    + ['\u00ad', '\u061c', '\u200b', '\u200d', '\u200e', '\u200f', '\ufeff']
+    + [chr(code) for code in range(0x202a, 0x202f)]
+    + [chr(code) for code in range(0x2066, 0x206a)]
+)
+
+TRANSLATE_TABLE = str.maketrans({**_CHARACTER_MAP, **{char: None for char in _DELETED}})
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_ZWNJ_RUN_RE = re.compile(r'\u200c{2,}')
+# A ZWNJ only means something between two letters
+_STRAY_ZWNJ_RE = re.compile(r'(?<!\w)\u200c|\u200c(?!\w)')
+_TOKEN_RE = re.compile(r'\w+(?:\u200c\w+)*')
+
+
+def normalize(text):
+    """
+    Canonical form of text: NFKC (Arabic presentation forms become plain
+    letters), Persian yeh/kaf, ASCII digits, no diacritics, tatweel or
+    invisible marks, no stray ZWNJs, and single spaces.
+    """
+    if not text:
+        return ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKC', text).translate(TRANSLATE_TABLE)
+        if ZWNJ in text:
+            text = _STRAY_ZWNJ_RE.sub('', _ZWNJ_RUN_RE.sub(ZWNJ, text))
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+def fold(text):
+    """normalize() plus case folding and Latin accent stripping, for identity keys"""
+    if not text:
+        return ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+    return normalize(text).casefold()
+
+
+def tokenize(text):
+    """Words of normalized text; a ZWNJ joins the parts of one word"""
+    return _TOKEN_RE.findall(normalize(text))
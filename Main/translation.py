@@ -0,0 +1,405 @@
+"""
+Translation memory for the translate_text endpoint.
+
+Every chunk is looked up in an in-process LRU first and then in the
+TranslationMemory table; only chunks missing from both reach the external
+provider, and their results are written back for the next request.
+Misses are translated concurrently on a bounded thread pool, paced by a
+process-wide token bucket instead of fixed sleeps between calls. Hits
+served by the LRU are counted in memory and written to the table in
+batches, so the hit statistics and the LRU eviction of the table see them.
+
+Text is split on paragraph and sentence boundaries (Persian punctuation
+included) and never inside a word or an HTML tag, so the same paragraph
+always produces the same chunks and the same cache keys.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from Main.models import TranslationMemory
+from Main.text import normalize
+
+
+CHUNK_LIMIT = 500
+
+Chunk = namedtuple('Chunk', ['text', 'separator'])
+
+_TAG_RE = re.compile(r'(<[^>]*>)')
+_BLOCK_OPEN_RE = re.compile(
+    r'<(p|div|li|ul|ol|h[1-6]|blockquote|table|thead|tbody|tr|td|th|pre|figure|section)\b',
+    re.IGNORECASE,
+)
+_BLOCK_CLOSE_RE = re.compile(
+    r'</(p|div|li|ul|ol|h[1-6]|blockquote|table|thead|tbody|tr|td|th|pre|figure|section)\s*>|<(br|hr)\b',
+    re.IGNORECASE,
+)
+_PARAGRAPH_RE = re.compile(r'(\n\s*\n)')
+_SENTENCE_RE = re.compile(r'(?<=[.!?\u061f\u06d4\u2026])(\s+)')
+_WORD_RE = re.compile(r'(\s+)')
+
+
+def text_hash(text):
+    """Returns the cache key digest of the normalized text (see Main.text.normalize)"""
+    return hashlib.sha256(normalize(text).encode('utf-8')).hexdigest()
+
+
+def _has_text(tokens):
+    return any(token.strip() and not _TAG_RE.fullmatch(token) for token in tokens)
+
+
+def _paragraphs(text):
+    """Splits text into paragraphs (lists of tokens) at blank lines and block tags"""
+    paragraphs = []
+    current = []
+
+    def flush():
+        # Paragraphs without any text (e.g. a lone <br>) are kept for the next one
+        if _has_text(current):
+            paragraphs.append(current[:])
+            current.clear()
+
+    for token in _TAG_RE.split(text):
+        if not token:
+            continue
+        if _TAG_RE.fullmatch(token):
+            if _BLOCK_OPEN_RE.match(token):
+                flush()
+                current.append(token)
+            elif _BLOCK_CLOSE_RE.match(token):
+                current.append(token)
+                flush()
+            else:
+                current.append(token)
+            continue
+        for part in _PARAGRAPH_RE.split(token):
+            if not part:
+                continue
+            current.append(part)
+            if _PARAGRAPH_RE.fullmatch(part):
+                flush()
+
+    if current:
+        if paragraphs and not _has_text(current):
+            paragraphs[-1].extend(current)
+        else:
+            paragraphs.append(current)
+    return paragraphs
+
+
+def _sentences(tokens):
+    """Splits a paragraph into sentences; tags always stay in one piece"""
+    sentences = ['']
+    for token in tokens:
+        if _TAG_RE.fullmatch(token):
+            sentences[-1] += token
+            continue
+        # Odd items of the split are the whitespace after a sentence end
+        for index, part in enumerate(_SENTENCE_RE.split(token)):
+            sentences[-1] += part
+            if index % 2:
+                sentences.append('')
+    return [sentence for sentence in sentences if sentence]
+
+
+def _words(piece):
+    words = ['']
+    for token in _TAG_RE.split(piece):
+        if _TAG_RE.fullmatch(token):
+            words[-1] += token
+            continue
+        for part in _WORD_RE.split(token):
+            words[-1] += part
+            if part and part.isspace():
+                words.append('')
+    return [word for word in words if word]
+
+
+def _pack(pieces, limit):
+    """Greedily packs pieces into strings of at most limit characters"""
+    packed = []
+    current = ''
+    for piece in pieces:
+        if len(current) + len(piece.rstrip()) <= limit:
+            current += piece
+            continue
+        if current:
+            packed.append(current)
+            current = ''
+        if len(piece.rstrip()) <= limit:
+            current = piece
+            continue
+        words = _words(piece)
+        if len(words) > 1:
+            packed.extend(_pack(words, limit))
+        elif _TAG_RE.search(piece):
+            # A single over-long tag is sent as is rather than cut in half
+            packed.append(piece)
+        else:
+            packed.extend(piece[i:i + limit] for i in range(0, len(piece), limit))
+    if current:
+        packed.append(current)
+    return packed
+
+
+def split_into_chunks(text, limit=CHUNK_LIMIT):
+    """
+    Splits text into Chunk(text, separator) tuples of at most limit characters.
+
+    Chunks never start a new paragraph mid-way, so an edit only changes the
+    chunks of the paragraph it touches. ''.join(text + separator) rebuilds
+    the input up to surrounding whitespace.
+    """
+    chunks = []
+    for paragraph in _paragraphs(text):
+        for piece in _pack(_sentences(paragraph), limit):
+            body = piece.rstrip()
+            chunks.append(Chunk(body.lstrip(), piece[len(body):]))
+    return chunks
+
+
+class TranslationCache:
+    """
+    Two-level (process LRU + database) cache of chunk translations
+    """
+
+    def __init__(self, ttl=None, max_entries=None, lru_size=None, prune_interval=None, hit_flush_interval=None):
+        self.ttl = ttl or getattr(settings, 'TRANSLATION_CACHE_TTL', 60 * 60 * 24 * 30)
+        self.max_entries = max_entries or getattr(settings, 'TRANSLATION_CACHE_MAX_ENTRIES', 100000)
+        self.lru_size = lru_size or getattr(settings, 'TRANSLATION_CACHE_LRU_SIZE', 2048)
+        self.prune_interval = prune_interval or getattr(settings, 'TRANSLATION_CACHE_PRUNE_INTERVAL', 500)
+        self.hit_flush_interval = hit_flush_interval or getattr(settings, 'TRANSLATION_CACHE_HIT_FLUSH_INTERVAL', 60)
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._hits = Counter()
+        self._hits_flushed_at = time.monotonic()
+
+    def _lru_get(self, key):
+        with self._lock:
+            item = self._lru.get(key)
+            if item is None:
+                return None
+            translation, stored_at = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            self._hits[key] += 1
+            return translation
+
+    def _lru_set(self, key, translation):
+        with self._lock:
+            self._lru[key] = (translation, time.monotonic())
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def clear_local(self):
+        """Drops the in-process LRU (the database table is kept)"""
+        with self._lock:
+            self._lru.clear()
+
+    def flush_hits(self):
+        """Adds the hits served by the LRU since the last flush to their rows"""
+        with self._lock:
+            hits, self._hits = self._hits, Counter()
+            self._hits_flushed_at = time.monotonic()
+        # One UPDATE per language pair and hit count, usually a handful
+        groups = defaultdict(list)
+        for (digest, source, target), count in hits.items():
+            groups[(source, target, count)].append(digest)
+        now = timezone.now()
+        for (source, target, count), digests in groups.items():
+            TranslationMemory.objects.filter(
+                text_hash__in=digests, source_lang=source, target_lang=target,
+            ).update(hit_count=F('hit_count') + count, last_used_at=now)
+
+    def get_many(self, chunks, source, target):
+        """Returns {index: translation} for every chunk found in the cache"""
+        found = {}
+        pending = {}
+        for index, chunk in enumerate(chunks):
+            digest = text_hash(chunk)
+            translation = self._lru_get((digest, source, target))
+            if translation is not None:
+                found[index] = translation
+            else:
+                pending.setdefault(digest, []).append(index)
+
+        if pending:
+            cutoff = timezone.now() - timedelta(seconds=self.ttl)
+            rows = TranslationMemory.objects.filter(
+                text_hash__in=list(pending),
+                source_lang=source,
+                target_lang=target,
+                created_at__gte=cutoff,
+            ).values_list('id', 'text_hash', 'translation')
+
+            hit_ids = []
+            for pk, digest, translation in rows:
+                hit_ids.append(pk)
+                self._lru_set((digest, source, target), translation)
+                for index in pending[digest]:
+                    found[index] = translation
+
+            if hit_ids:
+                TranslationMemory.objects.filter(id__in=hit_ids).update(
+                    hit_count=F('hit_count') + 1,
+                    last_used_at=timezone.now(),
+                )
+
+        # LRU hits ride along when the table is queried anyway, or wait for the interval
+        if self._hits and (pending or time.monotonic() - self._hits_flushed_at >= self.hit_flush_interval):
+            self.flush_hits()
+        return found
+
+    def set_many(self, items, source, target):
+        """Stores (chunk, translation) pairs in both cache levels"""
+        now = timezone.now()
+        rows = {}
+        for chunk, translation in items:
+            digest = text_hash(chunk)
+            self._lru_set((digest, source, target), translation)
+            rows[digest] = TranslationMemory(
+                text_hash=digest,
+                source_lang=source,
+                target_lang=target,
+                source_text=normalize(chunk),
+                translation=translation,
+                created_at=now,
+                last_used_at=now,
+            )
+        if not rows:
+            return
+
+        TranslationMemory.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=['text_hash', 'source_lang', 'target_lang'],
+            update_fields=['translation', 'created_at', 'last_used_at'],
+        )
+
+        self._writes += len(rows)
+        if self._writes >= self.prune_interval:
+            self._writes = 0
+            self.prune()
+
+    def prune(self):
+        """Deletes expired rows and keeps the table under max_entries"""
+        self.flush_hits()
+        cutoff = timezone.now() - timedelta(seconds=self.ttl)
+        deleted, _ = TranslationMemory.objects.filter(created_at__lt=cutoff).delete()
+
+        # last_used_at of the oldest row kept; rows used before it are evicted
+        boundary = (
+            TranslationMemory.objects.order_by('-last_used_at')
+            .values_list('last_used_at', flat=True)[self.max_entries - 1:self.max_entries]
+        )
+        boundary = list(boundary)
+        if boundary:
+            evicted, _ = TranslationMemory.objects.filter(last_used_at__lt=boundary[0]).delete()
+            deleted += evicted
+        return deleted
+
+
+translation_cache = TranslationCache()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting calls to the translation provider
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available and consumes it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+provider_bucket = TokenBucket(
+    rate=getattr(settings, 'TRANSLATION_RATE_LIMIT', 5),
+    capacity=getattr(settings, 'TRANSLATION_RATE_BURST', 5),
+)
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'TRANSLATION_MAX_WORKERS', 4),
+    thread_name_prefix='translate',
+)
+
+
+def _timed_call(translate_chunk, chunk):
+    provider_bucket.acquire()
+    started = time.perf_counter()
+    translation = translate_chunk(chunk)
+    return translation, (time.perf_counter() - started) * 1000
+
+
+def translate_chunks(chunks, target, translate_chunk, source='auto'):
+    """
+    Translates chunks through the cache; only distinct misses call translate_chunk.
+
+    Misses run concurrently and the results come back in the order of
+    chunks: one dict per chunk with the translation, its cache status
+    ('hit' or 'miss') and the time spent producing it in milliseconds. If
+    a miss fails, the other translations are still cached and the first
+    error is raised.
+    """
+    started = time.perf_counter()
+    cached = translation_cache.get_many(chunks, source, target)
+    lookup_ms = (time.perf_counter() - started) * 1000
+
+    results = [None] * len(chunks)
+    for index, translation in cached.items():
+        results[index] = {'translation': translation, 'cache': 'hit', 'ms': round(lookup_ms, 2)}
+
+    misses = {}
+    for index, chunk in enumerate(chunks):
+        if results[index] is None:
+            misses.setdefault(text_hash(chunk), []).append(index)
+
+    futures = [
+        (indexes, _executor.submit(_timed_call, translate_chunk, chunks[indexes[0]]))
+        for indexes in misses.values()
+    ]
+
+    fresh = []
+    error = None
+    for indexes, future in futures:
+        try:
+            translation, elapsed_ms = future.result()
+        except Exception as e:
+            # Keep collecting, so the chunks that did translate are still cached
+            error = error or e
+            continue
+        if translation:
+            fresh.append((chunks[indexes[0]], translation))
+        for index in indexes:
+            results[index] = {'translation': translation, 'cache': 'miss', 'ms': round(elapsed_ms, 2)}
+
+    translation_cache.set_many(fresh, source, target)
+    if error is not None:
+        raise error
+    return results
@@ -1,14 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from Main.models import *
 from Main.forms import *
 from django.views.decorators.csrf import csrf_exempt
 from translate import Translator
-from habanero import Crossref
+from Main.crossref import clean_doi, extract_dois, import_dois
+from Main.jobs import enqueue
+from Main.fragments import cached_fragment, fragment_key
+from Main.pagination import CursorPaginationMixin
+from Main.projections import ListProjectionMixin, list_projection
+from Main.references import load_references
+from Main.search import search
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.db.models import Prefetch
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth import views as auth_views
@@ -50,12 +57,26 @@ def login_view(request):
         }
     )(request)
 
+# Child model relation of each project type
+PROJECT_TYPE_RELATIONS = {
+    'article_writing': ('articles', Article),
+    'book_writing': ('books', Book),
+    'book_translation': ('translatebooks', TranslatedBook),
+    'research_proposal': ('researchproposal', ResearchProposal),
+    'research_project': ('researchproject', ResearchProject),
+    'thesis': ('thesis', Thesis),
+}
+
 def dashboard(request):
     """
     Display the user's dashboard with categorized projects.
     """
-    # Get all owned projects of the current user
-    user_projects = request.user.owned_projects.all()
+    # Get all owned projects of the current user, with the child objects of
+    # every project type prefetched (one query per type, not per project)
+    user_projects = list_projection(request.user.owned_projects.all()).prefetch_related(*[
+        Prefetch(relation, queryset=list_projection(model.objects.order_by('pk')))
+        for relation, model in PROJECT_TYPE_RELATIONS.values()
+    ])
 
     # Define a dictionary to categorize projects based on their type
     project_dict = {
@@ -80,10 +101,11 @@ def dashboard(request):
     # Categorize projects based on their type
     for project in user_projects:
         key = type_to_key.get(project.type)  # Get the corresponding key from the type
-        if key and hasattr(project, 'researchproject') and project.researchproject.exists():
-            project_dict[key].append(project.researchproject.first())
-        elif key:
-            project_dict[key].append(project)
+        if not key:
+            continue
+        relation, _ = PROJECT_TYPE_RELATIONS[project.type]
+        children = getattr(project, relation).all()
+        project_dict[key].append(children[0] if children else project)
 
     # Pass the categorized projects to the template
     return render(request, 'dashboard/dashboard.html', {
@@ -91,18 +113,16 @@ def dashboard(request):
     })
 
 # Project View
-class ProjectListView(LoginRequiredMixin, ListView):
+class ProjectListView(LoginRequiredMixin, CursorPaginationMixin, ListProjectionMixin, ListView):
     model = Project
     template_name = 'projects/project/project_list.html'
     context_object_name = 'projects'
     paginate_by = 10
+    cursor_count_limit = 1000
+    json_fields = ('id', 'title', 'slug', 'type', 'status', 'progress', 'created_at')
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        return queryset.filter(
-            Q(owner=self.request.user) | 
-            Q(collaborators=self.request.user)
-        ).distinct().order_by('-created_at')
+        return super().get_queryset().member_of(self.request.user)
     
 class ProjectCreateView(LoginRequiredMixin, CreateView):
     model = Project
@@ -127,12 +147,7 @@ class ProjectDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'project'
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        return queryset.filter(
-            Q(owner=self.request.user) | 
-            Q(collaborators=self.request.user) |
-            Q(visibility='public')
-        ).distinct()
+        return Project.objects.visible_to(self.request.user)
 
 
 class ProjectUpdateView(LoginRequiredMixin, UpdateView):
@@ -222,10 +237,13 @@ class ProjectCommentDeleteView(DeleteView):
     success_url = reverse_lazy('comment_list')
 
 # Article View
-class ArticleListView(ListView):
+class ArticleListView(CursorPaginationMixin, ListProjectionMixin, ListView):
     model = Article
     template_name = 'article_list.html'
     context_object_name = 'articles'
+    # Articles have no created_at; ids follow insertion order
+    cursor_ordering = ('-id',)
+    json_fields = ('id', 'title', 'article_type', 'journal', 'doi', 'citation_count')
 
 class ArticleDetailView(DetailView):
     model = Article
@@ -339,17 +357,22 @@ class ArticleDeleteView(DeleteView):
 #     success_url = reverse_lazy('translated_book_list')
 
 # Research Project Views
-class ResearchProjectListView(ListView):
+class ResearchProjectListView(CursorPaginationMixin, ListProjectionMixin, ListView):
     model = ResearchProject
     template_name = 'projects/ResearchProject/researchproject_list.html'
     context_object_name = 'research_projects'
+    # Research projects have no created_at; ids follow insertion order
+    cursor_ordering = ('-id',)
+    json_fields = ('id', 'title', 'organization', 'research_project_status', 'citation_count')
+    list_related = ('project',)
 
     def get_queryset(self):
-        return ResearchProject.objects.select_related('project__owner').all()
+        return super().get_queryset().select_related('project__owner')
     
 
 class ResearchProjectDetailView(DetailView):
     model = ResearchProject
+    queryset = ResearchProject.objects.select_related('project')
     template_name = 'projects/researchproject/researchproject_detail.html'
     context_object_name = 'research_project'
 
@@ -359,42 +382,39 @@ class ResearchProjectDetailView(DetailView):
         # Current research project
         research_project = self.object
         
+        research_project_type = ContentType.objects.get_for_model(ResearchProject)
+
         # 1. Get citing references
-        citing_references = Reference.objects.filter(
-            citing_content_type=ContentType.objects.get_for_model(ResearchProject),
+        citing_references = list(Reference.objects.filter(
+            citing_content_type=research_project_type,
             citing_object_id=research_project.id
-        ).select_related('cited_content_type')
+        ))
 
         # 2. Get cited references
         cited_references = Reference.objects.filter(
-            cited_content_type=ContentType.objects.get_for_model(ResearchProject),
+            cited_content_type=research_project_type,
             cited_object_id=research_project.id
-        ).select_related('citing_content_type')
-
-        # Convert to list for better display in template
-        citing_refs_list = []
-        for ref in citing_references:
-            cited_obj = ref.cited_object
-            citing_refs_list.append({
-                'id': ref.id,
-                'object': cited_obj,
-                'type': cited_obj._meta.verbose_name,
-                'created_at': ref.created_at,
-                'sections': cited_obj.get_sections()  # Get sections of the cited object
-            })
-
-        cited_refs_list = []
-        for ref in cited_references:
-            citing_obj = ref.citing_object
-            cited_refs_list.append({
-                'id': ref.id,
-                'object': citing_obj,
-                'type': citing_obj._meta.verbose_name,
-                'created_at': ref.created_at,
-            })
-        
+        )
+
+        # Resolve the referenced objects in bulk (one query per content type)
+        citing_refs_list = load_references(citing_references, 'cited')
+        cited_refs_list = load_references(cited_references, 'citing')
+
+        # The sections with the cited documents' sections are rendered once
+        # per updated_at of the documents shown (see Main.fragments)
+        sections_key = fragment_key(
+            'research-project-sections', [research_project] + [ref['object'] for ref in citing_refs_list]
+        )
+        sections_html = cached_fragment(sections_key, lambda: render_to_string(
+            'Projects/ResearchProject/ResearchProject_sections.html',
+            {
+                'sections': research_project.sections.all(),
+                'citing_references': load_references(citing_references, 'cited', with_sections=True),
+            },
+        ))
+
         context.update({
-            'sections': research_project.sections.all(),
+            'sections_html': sections_html,
             'citing_references': citing_refs_list,
             'cited_references': cited_refs_list,
         })
@@ -500,102 +520,15 @@ class ResearchProjectDeleteView(DeleteView):
 #     success_url = reverse_lazy('thesis_list')
 
 logger = logging.getLogger(__name__)
-def clean_doi(doi):
-    """حذف پیشوندهای غیرضروری از DOI"""
-    match = re.search(r'(10\.\d{4,9}/.+)', doi)
-    if match:
-        return match.group(1).strip()
-    return doi.strip()
-
-def create_article_from_doi(doi):
-    """ایجاد یا بازیابی مقاله بر اساس DOI"""
-    doi = clean_doi(doi)
-    
-    # بررسی وجود مقاله در دیتابیس
-    existing_article = Article.objects.filter(doi__iexact=doi).first()
-    if existing_article:
-        return existing_article
-
-    # دریافت داده از Crossref
-    cr = Crossref()
-    work = cr.works(ids=doi, timeout=30)
-    if not work or 'message' not in work:
-        raise ValidationError("پاسخ نامعتبر از Crossref دریافت شد")
-    
-    data = work['message']
-    
-    # پردازش اطلاعات مقاله
-    title = str(data.get('title', [''])[0]) or 'بدون عنوان'
-    abstract = str(data.get('abstract', '')) or 'چکیده موجود نیست'
-    
-    # پردازش تاریخ انتشار
-    pub_date = data.get('published', {}).get('date-parts', [[None]])[0]
-    publish_date = None
-    if pub_date and len(pub_date) >= 1:
-        try:
-            year = int(pub_date[0])
-            publish_date = datetime(year, 1, 1).date()
-        except (ValueError, TypeError):
-            pass
-
-    # ایجاد مقاله جدید
-    article = Article.objects.create(
-        title=title[:500],
-        journal=data.get('container-title', [''])[0][:200] or '',
-        volume=data.get('volume', '')[:50],
-        issue=data.get('issue', '')[:50],
-        pages=data.get('page', '')[:50],
-        doi=doi.lower().strip(),
-        publish_date=publish_date,
-        aricale_status='published'
-    )
-
-    # پردازش و افزودن نویسندگان
-    for order, author_data in enumerate(data.get('author', []), start=1):
-        try:
-            given_name = author_data.get('given', '').strip()[:100]
-            family_name = author_data.get('family', '').strip()[:100]
-            
-            if not given_name or not family_name:
-                continue
-
-            # پردازش ORCID
-            orcid = author_data.get('ORCID', '')
-            if orcid:
-                orcid = orcid.split('/')[-1][:19]
-
-            # ایجاد یا بازیابی نویسنده
-            author, created = Author.objects.get_or_create(
-                first_name=given_name,
-                last_name=family_name,
-                defaults={
-                    'orcid_id': orcid,
-                    'affiliation': ', '.join(
-                        aff.get('name', '')[:100] 
-                        for aff in author_data.get('affiliation', [])
-                    )[:200]
-                }
-            )
-
-            # ایجاد رابطه نویسندگی
-            ArticleAuthorship.objects.create(
-                article=article,
-                author=author,
-                authorship_order=order,
-                is_corresponding=order == 1
-            )
-
-        except Exception as e:
-            logger.warning(f"خطا در پردازش نویسنده {order}: {str(e)}")
-            continue
-
-    return article
-    
-
 CONTENT_TYPE_MAPPING = { 'article': Article, 'book': Book, 'thesis': Thesis, 'researchproject': ResearchProject, 'researchproposal': ResearchProposal, 'translatedbook': TranslatedBook }
 @require_POST
-@transaction.atomic
 def add_reference_with_doi(request, content_type, object_id):
+    """
+    ثبت درخواست افزودن منبع از روی DOI.
+
+    دریافت اطلاعات از Crossref در صف کارهای پس‌زمینه (دستور run_jobs) انجام
+    می‌شود و پاسخ 202 به همراه شناسه کار برگردانده می‌شود.
+    """
     try:
         # اعتبارسنجی کاربر
         if not request.user.is_authenticated:
@@ -624,56 +557,102 @@ def add_reference_with_doi(request, content_type, object_id):
         if hasattr(citing_obj, 'owner') and citing_obj.owner != request.user:
             raise PermissionDenied("شما مجوز دسترسی به این منبع را ندارید")
 
-        # ایجاد یا دریافت مقاله مربوط به DOI (cited object)
-        try:
-            cited_article = create_article_from_doi(doi)
-        except Exception as e:
-            logger.error(f"خطا در ایجاد مقاله از DOI {doi}: {str(e)}")
+        # ثبت کار در صف
+        job = enqueue('resolve_doi', {
+            'doi': clean_doi(doi),
+            'citing_content_type_id': ContentType.objects.get_for_model(citing_model).id,
+            'citing_object_id': citing_obj.id,
+        }, user=request.user)
+
+        return JsonResponse({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': reverse('job_status', kwargs={'job_id': job.id})
+        }, status=202)
+
+    except PermissionDenied as e:
+        logger.warning(f"دسترسی غیرمجاز: {str(e)}")
+        return JsonResponse(
+            {'success': False, 'error': str(e)},
+            status=403
+        )
+    except Http404:
+        raise
+    except Exception as e:
+        logger.error(f"خطای غیرمنتظره: {str(e)}", exc_info=True)
+        return JsonResponse(
+            {'success': False, 'error': 'خطای سرور داخلی'},
+            status=500
+        )
+
+@login_required
+def job_status(request, job_id):
+    """وضعیت یک کار پس‌زمینه و نتیجه آن"""
+    job = get_object_or_404(Job, id=job_id, created_by=request.user)
+    return JsonResponse({
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': job.result,
+        'error': job.error,
+    })
+
+MAX_BATCH_DOIS = 200
+@require_POST
+def add_references_with_dois(request, content_type, object_id):
+    """
+    افزودن گروهی منابع از روی فهرست DOI یا فهرست منابع کپی‌شده.
+
+    دریافت اطلاعات از Crossref خارج از تراکنش و به‌صورت همزمان انجام می‌شود.
+    """
+    try:
+        # اعتبارسنجی کاربر
+        if not request.user.is_authenticated:
+            raise PermissionDenied("دسترسی غیرمجاز")
+
+        # استخراج DOIها از فهرست ارسال‌شده
+        dois = extract_dois('\n'.join(request.POST.getlist('dois')))
+        if not dois:
             return JsonResponse(
-                {'success': False, 'error': f'خطا در پردازش DOI: {str(e)}'},
+                {'success': False, 'error': 'هیچ DOI معتبری یافت نشد'},
+                status=400
+            )
+        if len(dois) > MAX_BATCH_DOIS:
+            return JsonResponse(
+                {'success': False, 'error': f'حداکثر {MAX_BATCH_DOIS} DOI در هر درخواست مجاز است'},
                 status=400
             )
 
-        # بررسی وجود مرجع قبلی
-        existing_reference = Reference.objects.filter(
-            citing_content_type=ContentType.objects.get_for_model(citing_model),
-            citing_object_id=object_id,
-            cited_content_type=ContentType.objects.get_for_model(Article),
-            cited_object_id=cited_article.id
-        ).first()
-
-        if existing_reference:
-            return JsonResponse({
-                'success': False,
-                'error': 'این منبع قبلاً به پروژه اضافه شده است.'
-            }, status=400)
-
-        # ایجاد رکورد مرجع
-        reference = Reference.objects.create(
-            citing_content_type=ContentType.objects.get_for_model(citing_model),
-            citing_object_id=object_id,
-            cited_content_type=ContentType.objects.get_for_model(Article),
-            cited_object_id=cited_article.id,
-            created_at=timezone.now()
-        )
+        # تشخیص مدل citing از روی content_type
+        citing_model = CONTENT_TYPE_MAPPING.get(content_type.lower())
+        if not citing_model:
+            return JsonResponse(
+                {'success': False, 'error': 'نوع محتوای درخواست شده معتبر نیست'},
+                status=404
+            )
+
+        # دریافت آبجکت citing و بررسی دسترسی کاربر
+        citing_obj = get_object_or_404(citing_model, id=object_id)
+        if hasattr(citing_obj, 'owner') and citing_obj.owner != request.user:
+            raise PermissionDenied("شما مجوز دسترسی به این منبع را ندارید")
+
+        results = import_dois(dois, citing_obj=citing_obj)
 
         logger.info(
-            f"ارجاع جدید ایجاد شد: {content_type} {object_id} به مقاله {cited_article.id}"
+            f"افزودن گروهی منابع: {content_type} {object_id}، {len(dois)} DOI"
         )
 
         return JsonResponse({
             'success': True,
-            'reference_id': reference.id,
-            'cited_article': {
-                'id': cited_article.id,
-                'title': cited_article.title,
-                'authors': cited_article.get_authors_display(),
-                'doi': cited_article.doi
-            },
-            'citing_object': {
-                'type': content_type,
-                'id': object_id,
-                'title': str(citing_obj)
+            'results': results,
+            'summary': {
+                'total': len(results),
+                'created': sum(r['status'] == 'created' for r in results),
+                'existing': sum(r['status'] == 'existing' for r in results),
+                'failed': sum(r['status'] == 'error' for r in results),
+                'referenced': sum(bool(r.get('referenced')) for r in results),
             }
         })
 
@@ -683,6 +662,8 @@ def add_reference_with_doi(request, content_type, object_id):
             {'success': False, 'error': str(e)},
             status=403
         )
+    except Http404:
+        raise
     except Exception as e:
         logger.error(f"خطای غیرمنتظره: {str(e)}", exc_info=True)
         return JsonResponse(
@@ -698,9 +679,8 @@ def generate_citation_key(model_type, object_id, doi):
     return f"ref_{model_type[:3]}_{object_id}_{doi_part}"
     
 
-import time
-import random
 from deep_translator import GoogleTranslator
+from Main.translation import split_into_chunks, translate_chunks
 def translate_text(request):
     if request.method != 'POST':
         return JsonResponse(
@@ -734,29 +714,46 @@ def translate_text(request):
             raise Exception(f'Translation failed: {str(e)}')
 
     try:
-        # اگر متن کوتاه است مستقیماً ترجمه شود
-        if len(text) <= 500:
-            translation = translate_chunk(text)
-            return JsonResponse({'translation': translation})
+        # متن در مرز پاراگراف‌ها و جمله‌ها تقسیم می‌شود (بدون شکستن کلمات و تگ‌ها)
+        # تا بخش‌ها پایدار و قابل ذخیره در حافظه ترجمه باشند
+        chunks = split_into_chunks(text)
         
-        # برای متن‌های طولانی:
-        chunks = [text[i:i+500] for i in range(0, len(text), 500)]
-        translations = []
-        
-        for i, chunk in enumerate(chunks):
-            # تاخیر تصادفی برای جلوگیری از محدودیت
-            if i > 0:
-                time.sleep(random.uniform(0.5, 1.5))
-            
-            translations.append(translate_chunk(chunk))
+        # بخش‌هایی که در حافظه ترجمه نیستند به‌صورت همزمان ترجمه می‌شوند
+        # (محدودیت نرخ درخواست‌ها در Main.translation اعمال می‌شود)
+        results = translate_chunks([chunk.text for chunk in chunks], target_lang, translate_chunk)
         
         return JsonResponse({
-            'translation': ' '.join(translations),
-            'chunks': len(chunks)
+            'translation': ''.join(
+                (result['translation'] or '') + chunk.separator
+                for chunk, result in zip(chunks, results)
+            ).strip(),
+            'chunks': len(chunks),
+            'cache': [{'cache': r['cache'], 'ms': r['ms']} for r in results]
         })
 
     except Exception as e:
         return JsonResponse(
             {'error': str(e)},
             status=500
-        )
\ No newline at end of file
+        )
+
+# Search
+MAX_SEARCH_RESULTS = 50
+
+@login_required
+def search_view(request):
+    """
+    جستجوی متن کامل در عنوان اسناد و متن بخش‌ها
+
+    نتایج بر اساس امتیاز مرتب می‌شوند و عبارت‌های یافت‌شده با <mark> مشخص می‌شوند.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(int(request.GET.get('limit', 20)), MAX_SEARCH_RESULTS)
+    except ValueError:
+        limit = 20
+
+    return JsonResponse({
+        'query': query,
+        'results': search(query, request.user, limit=max(limit, 1)),
+    })
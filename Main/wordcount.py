@@ -0,0 +1,147 @@
+"""
+Word-count totals maintained incrementally.
+
+A section computes its own word_count on save; the difference from the
+stored value is then added with F() updates to every container above it
+(chapter, book or thesis, project), so totals are plain column reads and
+editing one paragraph never reloads its siblings. recompute_word_counts()
+rebuilds every total with one UPDATE per level when the deltas drift.
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
+
+
+# Models using SectionWordCountMixin; delete receivers are connected per
+# model, since one without a sender disables fast deletes of every model
+SECTION_MODELS = ('ArticleSection', 'BookSection', 'ResearchProjectSection', 'ResearchProposalSection', 'ThesisSection')
+
+
+def add_word_count(queryset, delta):
+    """Adds delta to word_count of every row of queryset without going below zero"""
+    if delta > 0:
+        queryset.update(word_count=F('word_count') + delta)
+    elif delta < 0:
+        queryset.update(word_count=Case(
+            When(word_count__gte=-delta, then=F('word_count') + delta),
+            default=Value(0),
+        ))
+
+
+class WordCountTotalMixin:
+    """
+    For containers whose word_count is a total kept by F() deltas: a plain
+    save() never writes word_count (or the other delta_fields) back, so a
+    stale instance cannot overwrite the deltas applied since it was loaded.
+    """
+    delta_fields = ('word_count',)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # Deferred fields are left out, as Model.save() does, so they are not loaded just to be written back
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.delta_fields and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class SectionWordCountMixin:
+    """
+    For sections: after a save, the change of word_count is added to each
+    container listed in word_count_containers, given as
+    (model name, lookup from that model to the section's parent) pairs.
+    """
+    word_count_parent = None
+    word_count_containers = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_word_count = (
+            instance.__dict__.get('word_count'),
+            instance.__dict__.get(f'{cls.word_count_parent}_id'),
+        )
+        return instance
+
+    def _word_count_targets(self, parent_id):
+        return [
+            apps.get_model('Main', model_name)._default_manager.filter(**{lookup: parent_id})
+            for model_name, lookup in self.word_count_containers
+        ]
+
+    def propagate_word_count(self, old_count, old_parent_id):
+        """Applies the change from (old_count, old_parent_id) to the containers"""
+        parent_id = getattr(self, f'{self.word_count_parent}_id')
+        if old_parent_id is not None and old_parent_id != parent_id:
+            for queryset in self._word_count_targets(old_parent_id):
+                add_word_count(queryset, -old_count)
+            old_count = 0
+        for queryset in self._word_count_targets(parent_id):
+            add_word_count(queryset, self.word_count - old_count)
+
+    def save(self, *args, **kwargs):
+        old_count, old_parent_id = getattr(self, '_stored_word_count', (0, None))
+        if old_count is None:
+            # word_count was deferred when the section was loaded
+            old_count = type(self)._default_manager.filter(pk=self.pk).values_list('word_count', flat=True).first() or 0
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.propagate_word_count(old_count, old_parent_id)
+        self._stored_word_count = (self.word_count, getattr(self, f'{self.word_count_parent}_id'))
+
+
+def subtract_deleted_section(sender, instance, **kwargs):
+    old_count, _ = getattr(instance, '_stored_word_count', (instance.word_count, None))
+    parent_id = getattr(instance, f'{instance.word_count_parent}_id')
+    for queryset in instance._word_count_targets(parent_id):
+        add_word_count(queryset, -(old_count or 0))
+
+
+for _name in SECTION_MODELS:
+    post_delete.connect(subtract_deleted_section, sender=f'Main.{_name}', dispatch_uid=f'word_count_subtract_{_name}')
+
+
+def _total(model, parent_field, value_field='word_count'):
+    return Coalesce(
+        Subquery(
+            model._default_manager.filter(**{parent_field: OuterRef('pk')})
+            .order_by()
+            .values(parent_field)
+            .annotate(total=Sum(value_field))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recompute_word_counts():
+    """
+    Recomputes every container total from the section word counts, one
+    UPDATE per container model.
+    """
+    def model(name):
+        return apps.get_model('Main', name)
+
+    # Section -> chapter -> book
+    model('BookChapter')._default_manager.update(word_count=_total(model('BookSection'), 'chapter'))
+    model('Book')._default_manager.update(word_count=_total(model('BookChapter'), 'book'))
+    model('TranslatedBook')._default_manager.update(word_count=_total(model('BookChapter'), 'translated_book'))
+
+    # Section -> document
+    model('Article')._default_manager.update(word_count=_total(model('ArticleSection'), 'article'))
+    model('ResearchProject')._default_manager.update(
+        word_count=_total(model('ResearchProjectSection'), 'research_project')
+    )
+    model('ResearchProposal')._default_manager.update(word_count=_total(model('ResearchProposalSection'), 'proposal'))
+    model('Thesis')._default_manager.update(word_count=_total(model('ThesisSection'), 'thesis'))
+
+    # Document -> project
+    total = Value(0)
+    for name in ('Article', 'Book', 'TranslatedBook', 'ResearchProject', 'ResearchProposal', 'Thesis'):
+        total = total + _total(model(name), 'project')
+    model('Project')._default_manager.update(word_count=total)
@@ -155,4 +155,34 @@ TINYMCE_DEFAULT_CONFIG = {
 }
 TINYMCE_JS_URL = '/static/js/tinymce/tinymce.min.js'  # مسیر نسبی به فایل JS
 LOGIN_REDIRECT_URL = 'dashboard'
-LOGOUT_REDIRECT_URL = 'home'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'home'
+
+# Translation memory and engine (see Main/translation.py)
+TRANSLATION_CACHE_TTL = 60 * 60 * 24 * 30  # seconds a cached chunk stays valid
+TRANSLATION_CACHE_MAX_ENTRIES = 100000  # rows kept in the TranslationMemory table
+TRANSLATION_CACHE_LRU_SIZE = 2048  # chunks kept in process memory
+TRANSLATION_CACHE_PRUNE_INTERVAL = 500  # writes between table prunes
+TRANSLATION_CACHE_HIT_FLUSH_INTERVAL = 60  # seconds between writes of in-process cache hits to the table
+TRANSLATION_MAX_WORKERS = 4  # concurrent calls to the translation provider
+TRANSLATION_RATE_LIMIT = 5  # provider calls per second (token bucket refill rate)
+TRANSLATION_RATE_BURST = 5  # token bucket capacity
+
+# Crossref imports (see Main/crossref.py)
+CROSSREF_MAX_WORKERS = 8  # concurrent Crossref requests in a batch DOI import
+CROSSREF_CACHE_TTL = 60 * 60 * 24 * 30  # seconds before a cached work record is revalidated
+CROSSREF_NEGATIVE_CACHE_TTL = 60 * 60 * 24  # seconds a cached 404 is trusted
+CROSSREF_MEMORY_SIZE = 1024  # work records kept in process memory
+CROSSREF_MAILTO = ''  # contact address for the Crossref polite pool
+
+# Background jobs (see Main/jobs.py, run with `manage.py run_jobs`)
+JOB_RUNNING_TIMEOUT = 600  # seconds before a running job is considered abandoned
+
+# Section text extraction (see Main/extraction.py)
+TEXT_EXTRACTION_CACHE_SIZE = 1024  # parsed contents kept in process memory
+READING_WORDS_PER_MINUTE = 200  # reading speed used for reading-time estimates
+
+# Document templates (see Main/instantiation.py)
+TEMPLATE_SECTIONS_CACHE_TTL = 60 * 60  # seconds a template's section list stays cached
+
+# Rendered section fragments (see Main/fragments.py)
+FRAGMENT_CACHE_TTL = 60 * 60 * 24  # seconds a rendered fragment stays cached
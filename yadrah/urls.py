@@ -68,6 +68,8 @@ urlpatterns = [
 
     # References
     path('<str:content_type>/<int:object_id>/references/add-with-doi/', views.add_reference_with_doi, name='add_reference_with_doi'),
+    path('<str:content_type>/<int:object_id>/references/add-with-dois/', views.add_references_with_dois, name='add_references_with_dois'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
 
     # # Tasks
     # path('tasks/', views.TaskListView.as_view(), name='task_list'),
@@ -89,4 +91,7 @@ urlpatterns = [
 
     # Translation API
     path('translate/', views.translate_text, name='translate_text'),
+
+    # Search
+    path('search/', views.search_view, name='search'),
 ]
\ No newline at end of file